@@ -0,0 +1,270 @@
+"""Command line of the simulation, without the interface
+
+    python -m cae run grid.cg --steps 1000 --out result.cg --every 100
+    python -m cae bench --out bench.json --baseline old.json
+    python -m cae generate soup soup.cg --width 1000 --height 1000
+
+It imports only the simulation modules, no wx, OpenGL or PIL, so the
+grids can be run on machines without a display.
+"""
+from __future__ import print_function
+import argparse
+import sys
+import time
+from . import ca_bench, ca_generate
+from .ca_grid import CellularGrid, BACKENDS, ENGINES
+
+
+def count(text):
+    """Type of the arguments that are a number of generations
+    """
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError("%s is negative" % (text,))
+    return value
+
+
+def positive(text):
+    """Type of the arguments that are a positive number
+    """
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError("%s is not positive" % (text,))
+    return value
+
+
+def load_grid(filename, backend="dict", engine="entity"):
+    """Returns the grid of a file with its linked grids, or None after
+    printing why it can't be loaded
+    """
+    grid = CellularGrid(backend=backend, engine=engine)
+    try:
+        grid.load(filename)
+    except (IOError, OSError, ValueError, KeyError) as err:
+        print("Cannot load %s: %s" % (filename, err), file=sys.stderr)
+        return None
+    return grid
+
+
+def run(args):
+    """Advances a grid of args.steps generations and prints the speed
+    """
+    grid = load_grid(args.grid, args.backend, args.engine)
+    if grid is None:
+        return 1
+    if args.rule is not None:
+        try:
+            grid.set_rule(args.rule)
+        except ValueError as err:
+            print(err, file=sys.stderr)
+            return 1
+    if args.freeze:
+        grid.freeze_regions()
+    # The population is a pass on the arrays of the array backends, so
+    # the peak is only of the generations sampled by --every
+    peak = [grid.population()]
+    start = time.time()
+
+    def sample(done, grid):
+        population = grid.population()
+        peak[0] = max(peak[0], population)
+        elapsed = time.time() - start
+        print("generation %d: %d cells, %.1f steps/s" % (
+            done, population, done / elapsed if elapsed else 0.))
+        if args.out is not None:
+            grid.store(args.out)
+
+    done = grid.run(args.steps, sample_every=args.every, callback=sample)
+    wall = time.time() - start
+    if args.out is not None and not (args.every and done % args.every == 0):
+        grid.store(args.out)
+    population = grid.population()
+    print("generations: %d" % done)
+    print("wall time: %.3f s" % wall)
+    print("steps/sec: %.1f" % (done / wall if wall else 0.))
+    if args.every:
+        print("peak cells (every %d): %d" % (args.every,
+                                             max(peak[0], population)))
+    print("final cells: %d" % population)
+    return 0
+
+
+def counts(text):
+    """Type of the arguments that are a list of numbers like "10,100"
+    """
+    try:
+        values = [int(item) for item in text.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("%s is not a list of numbers" %
+                                         (text,))
+    if any(value <= 0 for value in values):
+        raise argparse.ArgumentTypeError("%s has a number not positive" %
+                                         (text,))
+    return values
+
+
+def bench(args):
+    """Measures the grids, saves the results and compares them with a
+    baseline
+    """
+    if args.results is not None:
+        results = ca_bench.load(args.results)
+    else:
+        def report(name, result):
+            if result is None:
+                print("%s: failed" % (name,))
+                return
+            speeds = ", ".join(
+                "%s: %.1f" % (steps, value or 0.) for steps, value in
+                sorted(result["steps_per_sec"].items(),
+                       key=lambda item: int(item[0])))
+            print("%s: %d cells, steps/s {%s}, load %.4fs" % (
+                name, result["cells"], speeds, result["load_s"]))
+
+        results = ca_bench.run_benchmarks(
+            args.grids or None, args.steps, args.backend, args.engine,
+            args.repeat, not args.no_isolate, report)
+        for name, error in sorted(results["errors"].items()):
+            print("%s: %s" % (name, error), file=sys.stderr)
+    if args.out is not None:
+        ca_bench.save(results, args.out)
+    if args.baseline is None:
+        return 0
+    baseline = ca_bench.load(args.baseline)
+    changes = ca_bench.compare(baseline, results, args.threshold)
+    for name, metric, old, new, ratio, better in changes:
+        print("%s %s: %.4g -> %.4g (%s x%.2f)" % (
+            name, metric, old, new, "better" if better else "WORSE", ratio))
+    mean = ca_bench.speedup(baseline, results)
+    if mean is not None:
+        print("steps/s speedup (geometric mean): x%.3f" % mean)
+    # A worse metric fails the command, to stop a change in a script
+    return 1 if any(not better for _, _, _, _, _, better in changes) else 0
+
+
+def generate(args):
+    """Writes the grid files of a generator
+    """
+    if args.kind == "soup":
+        files = {args.out: ca_generate.life_soup(
+            args.width, args.height, args.density, args.seed, args.rule)}
+    elif args.kind == "mesh":
+        files = {args.out: ca_generate.arrow_mesh(
+            args.columns, args.rows, args.side, args.density, args.seed)}
+    elif args.kind == "seed":
+        files = {args.out: ca_generate.automaton_seed(
+            args.width, args.density, args.seed)}
+    else:
+        files = ca_generate.hierarchy(
+            args.out, args.instances, args.depth, args.length, args.density,
+            args.seed)
+    for filename, content in files.items():
+        ca_generate.write(content, filename)
+        print("%s: %d cells" % (filename, ca_generate.count_cells(content)))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cae",
+        description="Runs the cellular automata without the interface")
+    commands = parser.add_subparsers(dest="command")
+
+    run_parser = commands.add_parser(
+        "run", help="advance a grid and print its speed")
+    run_parser.add_argument("grid", help="grid file (.cg)")
+    run_parser.add_argument("--steps", type=count, required=True,
+                            help="generations to run")
+    run_parser.add_argument("--out", default=None,
+                            help="file where the grid is stored at the end")
+    run_parser.add_argument("--every", type=positive, default=None,
+                            help="print the progress, and store the grid "
+                            "if --out is given, every EVERY generations, "
+                            "and the peak of the cells printed")
+    run_parser.add_argument("--backend", choices=sorted(BACKENDS),
+                            default="dict", help="storage of the entities")
+    run_parser.add_argument("--engine", choices=ENGINES, default="entity",
+                            help="how the entities are stepped")
+    run_parser.add_argument("--rule", default=None,
+                            help="rule of the life cells, like B36/S23, "
+                            "instead of the one of the file")
+    run_parser.add_argument("--freeze", action="store_true",
+                            help="replay the periodic regions")
+    run_parser.set_defaults(func=run)
+
+    bench_parser = commands.add_parser(
+        "bench", help="measure the grids of the examples")
+    bench_parser.add_argument("grids", nargs="*",
+                              help="grid files, the examples if none")
+    bench_parser.add_argument("--steps", type=counts,
+                              default=list(ca_bench.STEPS),
+                              help="comma separated numbers of generations "
+                              "(default %(default)s)")
+    bench_parser.add_argument("--backend", choices=sorted(BACKENDS),
+                              default="dict", help="storage of the entities")
+    bench_parser.add_argument("--engine", choices=ENGINES, default="entity",
+                              help="how the entities are stepped")
+    bench_parser.add_argument("--repeat", type=positive,
+                              default=ca_bench.REPEAT,
+                              help="times each latency is measured")
+    bench_parser.add_argument("--out", default=None,
+                              help="JSON file where the results are saved")
+    bench_parser.add_argument("--baseline", default=None,
+                              help="JSON file of the results to compare with")
+    bench_parser.add_argument("--results", default=None,
+                              help="JSON file of results to compare instead "
+                              "of running the benchmarks")
+    bench_parser.add_argument("--threshold", type=float,
+                              default=ca_bench.THRESHOLD,
+                              help="change of a metric that is reported, "
+                              "as a fraction (default %(default)s)")
+    bench_parser.add_argument("--no-isolate", action="store_true",
+                              help="measure all the files in this process, "
+                              "the peak memory is the one of all of them")
+    bench_parser.set_defaults(func=bench)
+
+    generate_parser = commands.add_parser(
+        "generate", help="write a large grid for the benchmarks")
+    kinds = generate_parser.add_subparsers(dest="kind")
+    soup_parser = kinds.add_parser("soup", help="random life cells")
+    soup_parser.add_argument("--width", type=positive, default=256)
+    soup_parser.add_argument("--height", type=positive, default=256)
+    soup_parser.add_argument("--density", type=float, default=0.35)
+    soup_parser.add_argument("--rule", default=ca_generate.CONWAY.string,
+                             help="rule of the life cells")
+    mesh_parser = kinds.add_parser(
+        "mesh", help="rings of arrows carrying sparks")
+    mesh_parser.add_argument("--columns", type=positive, default=16)
+    mesh_parser.add_argument("--rows", type=positive, default=16)
+    mesh_parser.add_argument("--side", type=positive, default=8,
+                             help="arrows on each side of a ring")
+    mesh_parser.add_argument("--density", type=float, default=0.5,
+                             help="probability of a spark between arrows")
+    seed_parser = kinds.add_parser(
+        "seed", help="a row of mono entities for the 1D automata")
+    seed_parser.add_argument("--width", type=positive, default=1024)
+    seed_parser.add_argument("--density", type=float, default=0.5,
+                             help="probability of a MonoOne")
+    hierarchy_parser = kinds.add_parser(
+        "hierarchy", help="a grid linking many module instances")
+    hierarchy_parser.add_argument("--instances", type=positive, default=8)
+    hierarchy_parser.add_argument("--depth", type=positive, default=1,
+                                  help="levels of modules")
+    hierarchy_parser.add_argument("--length", type=positive, default=8,
+                                  help="arrows of each wire")
+    hierarchy_parser.add_argument("--density", type=float, default=0.5,
+                                  help="probability of a spark between "
+                                  "arrows")
+    for kind_parser in (soup_parser, mesh_parser, seed_parser,
+                        hierarchy_parser):
+        kind_parser.add_argument("out", help="grid file to write (.cg)")
+        kind_parser.add_argument("--seed", type=int, default=0,
+                                 help="seed of the random numbers")
+    generate_parser.set_defaults(func=generate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Ways to solve the conflicts between the actions on the same cell
+POLICIES = ("ordered", "insert", "delete", "priority")
+
+
+class ActionBuffer(object):
+
+    """Actions queued by the entities during a generation
+
+    The deletes are positions and the inserts (position, type), each one
+    kept once in the order it was queued, with sets to find the repeated
+    ones in O(1): like the lists the grid kept, inserts A, B, A on a
+    cell leave B. When the actions are applied, the conflicts between
+    the actions on the same cell are solved by the policy:
+    "ordered" (default) applies all the deletes and then all the inserts
+    in their order, as the grid always did; "insert" drops the deletes
+    of the cells with an insert; "delete" drops the inserts on the cells
+    with a delete; "priority" applies for each cell only the action with
+    the highest priority, priorities maps the types inserted, and None
+    for the delete, to numbers (0 if missing) and the ties go to the
+    delete and then to the first insert queued.
+    """
+
+    def __init__(self, policy="ordered", priorities=None):
+        self._dels = list()
+        self._del_set = set()
+        self._ins = list()
+        self._ins_set = set()
+        self.set_policy(policy, priorities)
+
+    def set_policy(self, policy, priorities=None):
+        """Sets the policy of the conflicts
+        """
+        if policy not in POLICIES:
+            raise ValueError("Unknown action policy %r" % (policy,))
+        self.policy = policy
+        self.priorities = dict(priorities or ())
+
+    def add(self, action):
+        """Queues an action, (command, position) for a delete or
+        (command, (position, type)) for an insert
+        """
+        com, pos = action
+        if com == "del":
+            if pos not in self._del_set:
+                self._del_set.add(pos)
+                self._dels.append(pos)
+        elif com == "ins":
+            if pos not in self._ins_set:
+                self._ins_set.add(pos)
+                self._ins.append(pos)
+
+    def __len__(self):
+        return len(self._dels) + len(self._ins)
+
+    def resolve(self):
+        """Returns the lists of the deletes and of the inserts to apply,
+        in this order
+        """
+        if self.policy == "ordered":
+            return self._dels, self._ins
+        if self.policy == "insert":
+            inserted = set(pos for pos, _ in self._ins)
+            return [pos for pos in self._dels if pos not in inserted],\
+                self._ins
+        if self.policy == "delete":
+            return self._dels, [(pos, type_) for pos, type_ in self._ins
+                                if pos not in self._del_set]
+        priorities = self.priorities
+        del_priority = priorities.get(None, 0)
+        best = dict((pos, (del_priority, None)) for pos in self._dels)
+        for pos, type_ in self._ins:
+            priority = priorities.get(type_, 0)
+            if pos not in best or priority > best[pos][0]:
+                best[pos] = (priority, type_)
+        return [pos for pos in self._dels if best[pos][1] is None],\
+            [(pos, type_) for pos, type_ in self._ins
+             if best[pos][1] == type_]
+
+    def clear(self):
+        del self._dels[:]
+        del self._ins[:]
+        self._del_set.clear()
+        self._ins_set.clear()
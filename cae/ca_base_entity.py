@@ -1,4 +1,4 @@
-from .utils import Point, Singleton
+from .utils import Singleton, key_offset
 from six import add_metaclass
 
 ENTITIES_IDS = {
@@ -24,12 +24,20 @@ NEIGHBORHOOD_IDS = {
 NEIGHBORHOOD_TYPES = dict([(value, key)
                            for key, value in NEIGHBORHOOD_IDS.items()])
 
+# Relative positions (x, y) of the cells in each neighborhood
+NEIGHBORHOOD_OFFSETS = {
+    NEIGHBORHOOD_TYPES["moore"]: tuple((x, y) for x in range(-1, 2)
+                                       for y in range(-1, 2)),
+    NEIGHBORHOOD_TYPES["1D"]: ((-1, 0), (1, 0))
+}
+
 
 @add_metaclass(Singleton)
 class VoidEntity():
 
     """Represents void cells
     """
+    drawable = False
 
     def __init__(self):
         self._type = ENTITIES_NAMES['void']
@@ -42,7 +50,14 @@ class VoidEntity():
 class BaseEntity(object):
 
     """Base class for all entities
+
+    The entities with batch True are stepped all together by step_all,
+    that reads the cells at the offsets in reads, instead of one by one
+    by step. The interface draws only the drawable entities.
     """
+    batch = False
+    drawable = True
+    reads = NEIGHBORHOOD_OFFSETS[NEIGHBORHOOD_TYPES["moore"]]
     neighborhood_pos = {
         'N': (0, -1),
         'S': (0, 1),
@@ -57,6 +72,9 @@ class BaseEntity(object):
         'EE': (2, 0),
         'WW': (-2, 0),
     }
+    # What is added to the key of a cell to reach each direction
+    neighborhood_keys = dict((dir_, key_offset(dif_x, dif_y))
+                             for dir_, (dif_x, dif_y) in neighborhood_pos.items())
 
     def __init__(self, type_=-1, neighborhood=None, neighbors=None):
         self._type = type_
@@ -79,9 +97,24 @@ class BaseEntity(object):
 
     def step(self, grid, pos):
         """Virtual method for the progress of the entity
+
+        pos is the key of the cell (see utils.pack), grid is read with
+        grid.cell(key) and queues the actions on keys with insert_action.
         """
         pass
 
+    def step_all(self, positions, around):
+        """Virtual method for the progress of all the entities of a type
+
+        positions is an (n, 2) int64 array with the x and y of each
+        entity and around an (n, len(reads)) uint8 array with the types
+        of the cells at each offset of reads from it. Returns (deletes,
+        inserts): an (m, 2) array of the positions to delete and a
+        (k, 3) array of the x, y and type to insert. The batch entities
+        have to define it, register_entity refuses them otherwise.
+        """
+        raise NotImplementedError
+
     def rotate(self, deg):
         """Rotate the entity respect a pivot by deg degrees
         """
@@ -97,12 +130,15 @@ class BaseEntity(object):
         """
         return self._type
 
+    def neighbor(self, pos, dir_):
+        """Returns the key of the cell in the direction from pos
+        """
+        return pos + self.neighborhood_keys[dir_]
+
     def get_neighbor(self, grid, pos, dir_=None):
         """Returns the type of the cell in base to the direction
         """
         if dir_:
-            my_x, my_y = pos
-            dif_x, dif_y = self.neighborhood_pos[dir_]
-            return grid[Point(my_x + dif_x, my_y + dif_y)]
+            return grid.cell(pos + self.neighborhood_keys[dir_])
         else:
-            return grid[pos]
+            return grid.cell(pos)
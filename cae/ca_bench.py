@@ -0,0 +1,314 @@
+"""Benchmarks of the grids on the example files
+
+For each file the benchmark measures the load and the store of the
+grid, the generations per second of update() for some numbers of steps,
+the time of select_entities() on the cells of the grid, of undo() and of
+redo(), and the peak memory of the process. Every file is measured in a
+process of its own, so its peak memory doesn't include the other ones.
+The results are a dict that can be saved as JSON and compared with the
+results of another run.
+"""
+import json
+import platform
+import shutil
+import sys
+import tempfile
+from glob import glob
+from multiprocessing import Process, Queue
+from os import path
+from timeit import default_timer as timer
+from six.moves.queue import Empty
+from .ca_grid import CellularGrid
+from .utils import Point, __version__
+
+try:
+    import resource
+except ImportError:  # Not on Windows
+    resource = None
+
+# Directories of the example grids, from the package
+EXAMPLES = ("../examples", "../examples/old_examples")
+# Numbers of generations measured by default
+STEPS = (10, 100)
+# Times each latency is measured, the best one is kept
+REPEAT = 3
+# Side of the square selected at most by the selection benchmark
+SELECTION_SIDE = 128
+# Actions pushed in the history for the undo and redo benchmark
+HISTORY_ACTIONS = 10
+# Change of a metric that is reported by compare, as a fraction
+THRESHOLD = 0.1
+# Seconds waited for the result of the process of a file
+TIMEOUT = 3600
+
+# Metrics of a grid, True when a higher value is better
+METRICS = {
+    "load_s": False,
+    "store_s": False,
+    "select_s": False,
+    "undo_s": False,
+    "redo_s": False,
+    "peak_bytes": False,
+}
+
+
+def example_files(directories=EXAMPLES):
+    """Returns the sorted list of the grid files in directories, relative
+    to the package if they are not absolute
+    """
+    base = path.dirname(path.abspath(__file__))
+    files = list()
+    for directory in directories:
+        files.extend(sorted(glob(path.join(base, directory, "*.cg"))))
+    return [path.normpath(filename) for filename in files]
+
+
+def peak_memory():
+    """Returns the peak resident memory of the process in bytes, or None
+    where it is unknown
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gives kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def best(function, repeat=REPEAT):
+    """Returns the shortest time of repeat calls of function
+    """
+    times = list()
+    for _ in range(repeat):
+        start = timer()
+        function()
+        times.append(timer() - start)
+    return min(times)
+
+
+def bench_file(filename, steps=STEPS, backend="dict", engine="entity",
+               repeat=REPEAT):
+    """Returns the dict with the metrics of a grid file
+    """
+    def load(**kwargs):
+        grid = CellularGrid(backend=backend, engine=engine, **kwargs)
+        grid.load(filename)
+        return grid
+
+    result = dict()
+    result["load_s"] = best(load, repeat)
+    grid = load()
+    result["cells"] = grid.population()
+
+    directory = tempfile.mkdtemp()
+    try:
+        stored = path.join(directory, path.basename(filename))
+        result["store_s"] = best(lambda: grid.store(stored), repeat)
+    finally:
+        shutil.rmtree(directory)
+
+    result["steps_per_sec"] = dict()
+    for count in steps:
+        grid = load()
+        start = timer()
+        for _ in range(count):
+            grid.update()
+        elapsed = timer() - start
+        result["steps_per_sec"][str(count)] =\
+            count / elapsed if elapsed else None
+
+    # The selection covers the grid, up to a square of SELECTION_SIDE
+    grid = load()
+    box = grid.bounds()
+    if box is None:
+        result["select_s"] = None
+    else:
+        min_x, min_y, max_x, max_y = box
+        points = [Point(x, y)
+                  for x in range(min_x, min(max_x + 1, min_x + SELECTION_SIDE))
+                  for y in range(min_y, min(max_y + 1, min_y + SELECTION_SIDE))]
+
+        def select():
+            grid.clear_selection()
+            grid.select_entities(points)
+        result["select_s"] = best(select, repeat)
+
+    # Every action pushed is a generation
+    grid = load(history=True)
+    grid.push_actions()
+    for _ in range(HISTORY_ACTIONS):
+        grid.update()
+        grid.push_actions()
+
+    def undo():
+        for _ in range(HISTORY_ACTIONS):
+            grid.undo()
+
+    def redo():
+        for _ in range(HISTORY_ACTIONS):
+            grid.redo()
+    undos = list()
+    redos = list()
+    for _ in range(repeat):
+        undos.append(best(undo, 1))
+        redos.append(best(redo, 1))
+    result["undo_s"] = min(undos) / HISTORY_ACTIONS
+    result["redo_s"] = min(redos) / HISTORY_ACTIONS
+
+    result["peak_bytes"] = peak_memory()
+    return result
+
+
+def _bench_child(queue, args):
+    """Target of the process of a file, puts (error, result) in queue
+    """
+    try:
+        queue.put((None, bench_file(*args)))
+    except Exception as err:
+        queue.put(("%s: %s" % (type(err).__name__, err), None))
+
+
+def bench_isolated(*args, **kwargs):
+    """bench_file in a new process, raises RuntimeError if it fails, if
+    the process ends without a result or if it takes more than timeout
+    seconds (TIMEOUT by default)
+    """
+    timeout = kwargs.pop("timeout", TIMEOUT)
+    queue = Queue()
+    # Not a pool: the parallel backend needs a process that can start
+    # its own workers
+    process = Process(target=_bench_child, args=(queue, args))
+    process.start()
+    deadline = timer() + timeout
+    while True:
+        try:
+            # Short waits, to see a process killed without a result
+            error, result = queue.get(timeout=min(1., timeout))
+            break
+        except Empty:
+            if not process.is_alive():
+                # The result can be put just before the process ends
+                try:
+                    error, result = queue.get(timeout=1.)
+                    break
+                except Empty:
+                    process.join()
+                    raise RuntimeError("the process ended without a "
+                                       "result, exit code %s" %
+                                       (process.exitcode,))
+            if timer() > deadline:
+                process.terminate()
+                process.join()
+                raise RuntimeError("no result after %s s" % (timeout,))
+    process.join()
+    if error is not None:
+        raise RuntimeError(error)
+    if process.exitcode != 0:
+        raise RuntimeError("the process ended with exit code %s" %
+                           (process.exitcode,))
+    return result
+
+
+def run_benchmarks(files=None, steps=STEPS, backend="dict", engine="entity",
+                   repeat=REPEAT, isolate=True, report=None):
+    """Returns the results of the benchmark of files, the examples if
+    None
+
+    The grids are keyed by their path relative to the common directory.
+    report(name, result) is called after each file, with result None if
+    the file failed.
+    """
+    if files is None:
+        files = example_files()
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": backend,
+        "engine": engine,
+        "steps": list(steps),
+        "grids": dict(),
+        "errors": dict(),
+    }
+    if len(files) == 0:
+        return results
+    root = path.dirname(path.commonprefix(
+        [path.abspath(filename) for filename in files]))
+    for filename in files:
+        name = path.relpath(path.abspath(filename), root)
+        args = (filename, tuple(steps), backend, engine, repeat)
+        try:
+            if isolate:
+                result = bench_isolated(*args)
+            else:
+                result = bench_file(*args)
+        except (RuntimeError, IOError, OSError, ValueError, KeyError) as err:
+            results["errors"][name] = str(err)
+            result = None
+        else:
+            results["grids"][name] = result
+        if report is not None:
+            report(name, result)
+    return results
+
+
+def save(results, filename):
+    with open(filename, "w") as fp:
+        json.dump(results, fp, indent=2, sort_keys=True)
+
+
+def load(filename):
+    with open(filename, "r") as fp:
+        return json.load(fp)
+
+
+def _metrics(result):
+    """Generates (metric, value, higher is better) of a grid result
+    """
+    for metric, higher in sorted(METRICS.items()):
+        yield metric, result.get(metric), higher
+    for count, value in sorted(result.get("steps_per_sec", dict()).items(),
+                               key=lambda item: int(item[0])):
+        yield "steps_per_sec[%s]" % count, value, True
+
+
+def compare(baseline, results, threshold=THRESHOLD):
+    """Returns the list of the changes of the metrics from baseline to
+    results, as (grid, metric, old, new, ratio, better), with ratio
+    new / old oriented so that above 1 is better. Only the grids and
+    the metrics in both and changed more than threshold are given.
+    """
+    changes = list()
+    for name, result in sorted(results.get("grids", dict()).items()):
+        old_result = baseline.get("grids", dict()).get(name)
+        if old_result is None:
+            continue
+        old_metrics = dict((metric, value)
+                           for metric, value, _ in _metrics(old_result))
+        for metric, new, higher in _metrics(result):
+            old = old_metrics.get(metric)
+            if not old or not new:
+                continue
+            ratio = float(new) / old if higher else float(old) / new
+            if abs(ratio - 1) > threshold:
+                changes.append((name, metric, old, new, ratio, ratio > 1))
+    return changes
+
+
+def speedup(baseline, results):
+    """Returns the geometric mean of the ratios of the steps per second
+    of results over baseline, or None if they have none in common
+    """
+    ratios = list()
+    for name, result in results.get("grids", dict()).items():
+        old_steps = baseline.get("grids", dict()).get(
+            name, dict()).get("steps_per_sec", dict())
+        for count, new in result.get("steps_per_sec", dict()).items():
+            old = old_steps.get(count)
+            if old and new:
+                ratios.append(float(new) / old)
+    if len(ratios) == 0:
+        return None
+    product = 1.
+    for ratio in ratios:
+        product *= ratio
+    return product ** (1. / len(ratios))
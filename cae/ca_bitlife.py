@@ -0,0 +1,272 @@
+import numpy as np
+from .ca_base_entity import ENTITIES_NAMES
+from .ca_dense import ArrayStorage, keys_list
+from .ca_rules import CONWAY
+from .utils import Point, coordinates, key_offset
+
+VOID = ENTITIES_NAMES['void']
+LIVING = ENTITIES_NAMES['livingcell']
+DEAD = ENTITIES_NAMES['deadcell']
+
+# Cells in a word of the bitboards
+WORD = 64
+# Minimum number of words (and rows) added on a side when the boards grow
+GROW_WORDS = 1
+GROW_ROWS = 16
+
+ONE = np.uint64(1)
+LAST = np.uint64(WORD - 1)
+
+
+def west(board):
+    """Returns the board b where b[y, x] = board[y, x - 1]
+    """
+    out = board << ONE
+    out[:, 1:] |= board[:, :-1] >> LAST
+    return out
+
+
+def east(board):
+    """Returns the board b where b[y, x] = board[y, x + 1]
+    """
+    out = board >> ONE
+    out[:, :-1] |= board[:, 1:] << LAST
+    return out
+
+
+def north(board):
+    """Returns the board b where b[y, x] = board[y - 1, x]
+    """
+    out = np.zeros_like(board)
+    out[1:] = board[:-1]
+    return out
+
+
+def south(board):
+    """Returns the board b where b[y, x] = board[y + 1, x]
+    """
+    out = np.zeros_like(board)
+    out[:-1] = board[1:]
+    return out
+
+
+def life_step(living, dead, rule=CONWAY):
+    """Returns the next (living, dead) bitboards of a Life-like rule
+
+    rule is a LifeRule, by default the one of LivingCell and DeadCell:
+    a living cell survives with a number of living neighbors in the S
+    digits, otherwise it becomes dead, and a dead cell with a number in
+    the B digits is born and surrounds itself with dead cells. Void
+    cells can't be born. The neighbors are counted with bitwise adders
+    on four bit planes, 64 cells at a time.
+    """
+    row_w, row_e = west(living), east(living)
+    neighbors = (row_w, row_e,
+                 north(living), north(row_w), north(row_e),
+                 south(living), south(row_w), south(row_e))
+    # Bits 1, 2, 4 and 8 of the count: after n boards the count is at
+    # most n, so a plane is added only when n is a power of 2
+    planes = [neighbors[0]]
+    for number, board in enumerate(neighbors[1:], 2):
+        carry = board
+        for bit, plane in enumerate(planes):
+            planes[bit], carry = plane ^ carry, plane & carry
+        if number & (number - 1) == 0:
+            planes.append(carry)
+    inverted = [~plane for plane in planes]
+    born = dead & count_in(planes, inverted, rule.births)
+    next_living = (living & count_in(planes, inverted, rule.survivals)) |\
+        born
+    halo = born | west(born) | east(born)
+    halo |= north(halo) | south(halo)
+    next_dead = (dead | (living & ~next_living) | halo) & ~next_living
+    return next_living, next_dead
+
+
+def count_in(planes, inverted, table):
+    """Returns the bitboard of the cells whose count, on the bit planes
+    and on their inverted copies, is true in table
+    """
+    result = np.zeros_like(planes[0])
+    for count, value in enumerate(table):
+        if not value:
+            continue
+        match = planes[0] if count & 1 else inverted[0]
+        for bit in range(1, len(planes)):
+            match = match & (planes[bit] if count >> bit & 1 else
+                             inverted[bit])
+        result |= match
+    return result
+
+
+def unpack(board):
+    """Returns the (rows, columns) of the bits set in a bitboard
+    """
+    height, width = board.shape
+    bits = np.unpackbits(
+        board.astype('<u8').view(np.uint8).reshape(height, width * 8), axis=1)
+    # unpackbits starts from the most significant bit of each byte
+    bits = bits.reshape(height, width * 8, 8)[:, :, ::-1]
+    return np.nonzero(bits.reshape(height, width * WORD))
+
+
+class BitLifeGrid(ArrayStorage):
+
+    """Entities storage with living and dead cells on bitboards
+
+    The rows are packed in uint64 words, 64 cells each, on one board for
+    the living cells and one for the dead cells. The other entities are
+    kept in a dict and step() works only when it is empty. Bit i of the
+    word [y, j] is the cell origin + (j * 64 + i, y). The cells are
+    given by their keys.
+    """
+
+    def __init__(self, data=None):
+        self._living = np.zeros((0, 0), dtype=np.uint64)
+        self._dead = np.zeros((0, 0), dtype=np.uint64)
+        self._origin = Point(0, 0)
+        self._others = dict()
+        if data is not None:
+            self.update(data)
+
+    ##
+    # Board management --------------------------------------------------------
+    def reserve(self, min_x, min_y, max_x, max_y):
+        """Grows the boards to contain the rectangle between the two points
+        """
+        height, width = self._living.shape
+        o_x, o_y = self._origin
+        if height == 0:
+            words = (max_x - min_x) // WORD + 1 + GROW_WORDS * 2
+            shape = (max_y - min_y + 1 + GROW_ROWS * 2, words)
+            self._living = np.zeros(shape, dtype=np.uint64)
+            self._dead = np.zeros(shape, dtype=np.uint64)
+            self._origin = Point(min_x - GROW_WORDS * WORD, min_y - GROW_ROWS)
+            return
+        if min_x >= o_x and min_y >= o_y and\
+                max_x < o_x + width * WORD and max_y < o_y + height:
+            return
+        grow_x = max(GROW_WORDS, width // 2)
+        grow_y = max(GROW_ROWS, height // 2)
+        left = (o_x - min_x - 1) // WORD + 1 + grow_x if min_x < o_x else 0
+        top = o_y - min_y + grow_y if min_y < o_y else 0
+        right = (max_x - (o_x + width * WORD)) // WORD + 1 + grow_x\
+            if max_x >= o_x + width * WORD else 0
+        bottom = max_y - (o_y + height) + 1 + grow_y\
+            if max_y >= o_y + height else 0
+        pad = ((top, bottom), (left, right))
+        self._living = np.pad(self._living, pad, 'constant')
+        self._dead = np.pad(self._dead, pad, 'constant')
+        self._origin = Point(o_x - left * WORD, o_y - top)
+
+    def ensure_margin(self):
+        """Grows the boards if the first or last row or word column has
+        cells, so the next step can't write outside of them
+        """
+        if self._living.size == 0:
+            return
+        for board in (self._living, self._dead):
+            if board[0].any() or board[-1].any() or\
+                    board[:, 0].any() or board[:, -1].any():
+                o_x, o_y = self._origin
+                height, width = board.shape
+                self.reserve(o_x - 1, o_y - 1,
+                             o_x + width * WORD, o_y + height)
+                return
+
+    def step(self, rule=CONWAY):
+        """Updates the boards with life_step and the rule of the life cells
+
+        Returns False, without doing anything, if there are entities
+        that need the per cell update.
+        """
+        if len(self._others) != 0:
+            return False
+        self.ensure_margin()
+        if self._living.size != 0:
+            self._living, self._dead = life_step(
+                self._living, self._dead, rule)
+        return True
+
+    ##
+    # Dict interface ----------------------------------------------------------
+    def __index(self, pos):
+        x, y = coordinates(pos)
+        x -= self._origin.x
+        y -= self._origin.y
+        height, width = self._living.shape
+        if 0 <= x < width * WORD and 0 <= y < height:
+            return (y, x // WORD), np.uint64(1 << (x % WORD))
+        return None, None
+
+    def __getitem__(self, pos):
+        type_ = self._others.get(pos)
+        if type_ is not None:
+            return type_
+        index, bit = self.__index(pos)
+        if index is None:
+            return VOID
+        if self._living[index] & bit:
+            return LIVING
+        if self._dead[index] & bit:
+            return DEAD
+        return VOID
+
+    def __setitem__(self, pos, type_):
+        index, bit = self.__index(pos)
+        if index is not None:
+            self._living[index] &= ~bit
+            self._dead[index] &= ~bit
+        if type_ != LIVING and type_ != DEAD:
+            if type_ == VOID:
+                self._others.pop(pos, None)
+            else:
+                self._others[pos] = type_
+            return
+        self._others.pop(pos, None)
+        if index is None:
+            x, y = coordinates(pos)
+            self.reserve(x, y, x, y)
+            index, bit = self.__index(pos)
+        if type_ == LIVING:
+            self._living[index] |= bit
+        else:
+            self._dead[index] |= bit
+
+    def __len__(self):
+        return len(self._others) + sum(
+            int(np.unpackbits(board.view(np.uint8)).sum())
+            for board in (self._living, self._dead))
+
+    def items(self):
+        o_x, o_y = self._origin
+        items = list(self._others.items())
+        if self._living.size == 0:
+            return items
+        for board, type_ in ((self._living, LIVING), (self._dead, DEAD)):
+            rows, columns = unpack(board)
+            items.extend((key, type_) for key in
+                         keys_list(columns + o_x, rows + o_y))
+        return items
+
+    def clear(self):
+        self._living = np.zeros((0, 0), dtype=np.uint64)
+        self._dead = np.zeros((0, 0), dtype=np.uint64)
+        self._origin = Point(0, 0)
+        self._others.clear()
+
+    def copy(self):
+        new = BitLifeGrid()
+        new._living = self._living.copy()
+        new._dead = self._dead.copy()
+        new._origin = self._origin
+        new._others = self._others.copy()
+        return new
+
+    def translate(self, x, y):
+        """Moves all the entities by (x, y)
+        """
+        self._origin = Point(self._origin.x + x, self._origin.y + y)
+        offset = key_offset(x, y)
+        self._others = dict((pos + offset, type_)
+                            for pos, type_ in self._others.items())
@@ -0,0 +1,201 @@
+import numpy as np
+from .ca_base_entity import ENTITIES_NAMES
+from .ca_dense import ArrayStorage, VECTOR_TYPES, keys_list, step_cells
+from .ca_rules import CONWAY
+from .utils import Point, coordinates, key_offset
+
+VOID = ENTITIES_NAMES['void']
+
+# Side of a chunk, in cells
+CHUNK = 64
+# Cells around a chunk needed to compute its next generation: a birth
+# writes its halo one cell away and it depends on the cells around it
+MARGIN = 2
+
+
+class ChunkedGrid(ArrayStorage):
+
+    """Entities storage on square uint8 chunks of CHUNK cells
+
+    The chunks are in a dict with the chunk coordinates as keys, the
+    chunk (c_x, c_y) has the cells from (c_x * CHUNK, c_y * CHUNK). The
+    chunks without entities are deleted. The cells are given by their
+    keys.
+    """
+
+    def __init__(self, data=None):
+        self._chunks = dict()
+        # Number of non void cells of every chunk
+        self._counts = dict()
+        # True when an entity that step_cells can't manage may be present
+        self._foreign = False
+        if data is not None:
+            self.update(data)
+
+    ##
+    # Chunk management --------------------------------------------------------
+    def reserve(self, min_x, min_y, max_x, max_y):
+        """Chunks are made when the first entity is written in them
+        """
+        pass
+
+    def chunks(self):
+        """Returns a list of (origin, array) for each chunk
+        """
+        return [(Point(c_x * CHUNK, c_y * CHUNK), chunk)
+                for (c_x, c_y), chunk in self._chunks.items()]
+
+    def chunks_in(self, min_x, min_y, max_x, max_y):
+        """Returns the chunks that intersect the rectangle between the
+        two points
+        """
+        return [(origin, chunk) for origin, chunk in self.chunks()
+                if origin.x <= max_x and origin.x + CHUNK > min_x and
+                origin.y <= max_y and origin.y + CHUNK > min_y]
+
+    def __region(self, c_x, c_y):
+        """Returns the chunk with MARGIN cells of the chunks around it
+        """
+        size = CHUNK + 2 * MARGIN
+        region = np.zeros((size, size), dtype=np.uint8)
+        for dif_y in (-1, 0, 1):
+            for dif_x in (-1, 0, 1):
+                chunk = self._chunks.get((c_x + dif_x, c_y + dif_y))
+                if chunk is None:
+                    continue
+                # Part of the chunk inside the region, in region coords
+                start_x = max(0, MARGIN + dif_x * CHUNK)
+                end_x = min(size, MARGIN + (dif_x + 1) * CHUNK)
+                start_y = max(0, MARGIN + dif_y * CHUNK)
+                end_y = min(size, MARGIN + (dif_y + 1) * CHUNK)
+                src_x = start_x - (MARGIN + dif_x * CHUNK)
+                src_y = start_y - (MARGIN + dif_y * CHUNK)
+                region[start_y:end_y, start_x:end_x] = chunk[
+                    src_y:src_y + end_y - start_y,
+                    src_x:src_x + end_x - start_x]
+        return region
+
+    def step(self, rule=CONWAY):
+        """Updates every chunk, and the chunks around them, with step_cells
+        and the rule of the life cells
+
+        Returns False, without doing anything, if there are entities
+        that need the per cell update.
+        """
+        if self._foreign:
+            for chunk in self._chunks.values():
+                present = np.nonzero(np.bincount(chunk.ravel()))[0]
+                if not VECTOR_TYPES.issuperset(present.tolist()):
+                    return False
+            self._foreign = False
+        candidates = set()
+        for c_x, c_y in self._chunks:
+            for dif_y in (-1, 0, 1):
+                for dif_x in (-1, 0, 1):
+                    candidates.add((c_x + dif_x, c_y + dif_y))
+        chunks = dict()
+        counts = dict()
+        for c_x, c_y in candidates:
+            region = self.__region(c_x, c_y)
+            if not region.any():
+                continue
+            # The errors at the border of the region don't reach the chunk
+            inner = step_cells(region, rule=rule)[MARGIN:-MARGIN, MARGIN:-MARGIN]
+            count = int(np.count_nonzero(inner))
+            if count != 0:
+                chunks[(c_x, c_y)] = inner.copy()
+                counts[(c_x, c_y)] = count
+        self._chunks = chunks
+        self._counts = counts
+        return True
+
+    ##
+    # Dict interface ----------------------------------------------------------
+    def __getitem__(self, pos):
+        x, y = coordinates(pos)
+        chunk = self._chunks.get((x // CHUNK, y // CHUNK))
+        if chunk is None:
+            return VOID
+        return int(chunk[y % CHUNK, x % CHUNK])
+
+    def __setitem__(self, pos, type_):
+        x, y = coordinates(pos)
+        key = (x // CHUNK, y // CHUNK)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            if type_ == VOID:
+                return
+            chunk = self._chunks[key] = np.zeros((CHUNK, CHUNK),
+                                                 dtype=np.uint8)
+            self._counts[key] = 0
+        index = (y % CHUNK, x % CHUNK)
+        old = chunk[index]
+        if old == VOID and type_ != VOID:
+            self._counts[key] += 1
+        elif old != VOID and type_ == VOID:
+            self._counts[key] -= 1
+            if self._counts[key] == 0:
+                del self._chunks[key]
+                del self._counts[key]
+                return
+        if type_ not in VECTOR_TYPES:
+            self._foreign = True
+        chunk[index] = type_
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def items(self):
+        items = list()
+        for (o_x, o_y), chunk in self.chunks():
+            rows, columns = np.nonzero(chunk)
+            types = chunk[rows, columns].tolist()
+            items.extend(zip(keys_list(columns + o_x, rows + o_y), types))
+        return items
+
+    def items_in(self, min_x, min_y, max_x, max_y):
+        """Returns the items in the rectangle between the two points,
+        reading only the chunks that intersect it
+        """
+        items = list()
+        for (o_x, o_y), chunk in self.chunks_in(min_x, min_y, max_x, max_y):
+            part = chunk[max(0, min_y - o_y):max(0, max_y - o_y + 1),
+                         max(0, min_x - o_x):max(0, max_x - o_x + 1)]
+            rows, columns = np.nonzero(part)
+            types = part[rows, columns].tolist()
+            o_x += max(0, min_x - o_x)
+            o_y += max(0, min_y - o_y)
+            items.extend(zip(keys_list(columns + o_x, rows + o_y), types))
+        return items
+
+    def clear(self):
+        self._chunks.clear()
+        self._counts.clear()
+        self._foreign = False
+
+    def copy(self):
+        new = ChunkedGrid()
+        new._chunks = dict((key, chunk.copy())
+                           for key, chunk in self._chunks.items())
+        new._counts = self._counts.copy()
+        new._foreign = self._foreign
+        return new
+
+    def translate(self, x, y):
+        """Moves all the entities by (x, y)
+        """
+        if x % CHUNK == 0 and y % CHUNK == 0:
+            self._chunks = dict(
+                ((c_x + x // CHUNK, c_y + y // CHUNK), chunk)
+                for (c_x, c_y), chunk in self._chunks.items())
+            self._counts = dict(
+                ((c_x + x // CHUNK, c_y + y // CHUNK), count)
+                for (c_x, c_y), count in self._counts.items())
+            return
+        items = self.items()
+        foreign = self._foreign
+        self.clear()
+        self._foreign = foreign
+        offset = key_offset(x, y)
+        for pos, type_ in items:
+            self[pos + offset] = type_
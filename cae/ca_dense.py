@@ -0,0 +1,437 @@
+import numpy as np
+from .ca_base_entity import ENTITIES_NAMES
+from .ca_rules import CONWAY
+from .utils import Point, KEY_BIAS, KEY_LOW, coordinates, key_offset
+
+VOID = ENTITIES_NAMES['void']
+SPARK = ENTITIES_NAMES['spark']
+ARROW_UP = ENTITIES_NAMES['arrowup']
+ARROW_DOWN = ENTITIES_NAMES['arrowdown']
+ARROW_RIGHT = ENTITIES_NAMES['arrowright']
+ARROW_LEFT = ENTITIES_NAMES['arrowleft']
+LIVING = ENTITIES_NAMES['livingcell']
+DEAD = ENTITIES_NAMES['deadcell']
+
+# Entities that step_cells can update with whole-array operations
+VECTOR_TYPES = frozenset([VOID, SPARK, ARROW_UP, ARROW_DOWN, ARROW_RIGHT,
+                          ARROW_LEFT, LIVING, DEAD])
+
+# Arrow type -> (input directions, output direction) as (dx, dy)
+ARROW_RULES = {
+    ARROW_UP: (((0, 1), (1, 0), (-1, 0)), (0, -1)),
+    ARROW_DOWN: (((0, -1), (1, 0), (-1, 0)), (0, 1)),
+    ARROW_RIGHT: (((0, -1), (0, 1), (-1, 0)), (1, 0)),
+    ARROW_LEFT: (((0, -1), (0, 1), (1, 0)), (-1, 0)),
+}
+
+# Minimum number of cells added on a side when the array grows
+GROW_STEP = 16
+
+
+def shifted(padded, dx, dy, radius=1):
+    """Returns the view b of a padded array where b[y, x] = a[y + dy, x + dx]
+    """
+    height = padded.shape[0] - 2 * radius
+    width = padded.shape[1] - 2 * radius
+    return padded[radius + dy:radius + dy + height,
+                  radius + dx:radius + dx + width]
+
+
+class Workspace(object):
+
+    """Temporary arrays reused by step_cells for arrays of the same shape
+
+    Allocating new big arrays at every step costs more than the
+    operations on them.
+    """
+
+    _cache = dict()
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.rows = np.empty(shape, dtype=np.uint8)
+        self.sums = np.empty(shape, dtype=np.uint8)
+        self.masks = [np.empty(shape, dtype=bool) for _ in range(3)]
+
+    @classmethod
+    def get(cls, shape):
+        """Returns the workspace for the shape
+        """
+        work = cls._cache.get(shape)
+        if work is None:
+            if len(cls._cache) >= 8:
+                cls._cache.clear()
+            work = cls._cache[shape] = cls(shape)
+        return work
+
+
+def box_sum(mask, rows=None, out=None):
+    """Returns the 3x3 box sum of a uint8 array of 0 and 1
+
+    The sums are made on the flat array, so the first and the last
+    column of the mask have to be zero.
+    """
+    if rows is None:
+        rows = np.empty_like(mask)
+    if out is None:
+        out = np.empty_like(mask)
+    width = mask.shape[1]
+    flat, f_rows, f_out = mask.ravel(), rows.ravel(), out.ravel()
+    np.add(flat[:-2], flat[1:-1], out=f_rows[1:-1])
+    np.add(f_rows[1:-1], flat[2:], out=f_rows[1:-1])
+    f_rows[0], f_rows[-1] = flat[0], flat[-1]
+    np.add(f_rows[:-2 * width], f_rows[width:-width], out=f_out[width:-width])
+    np.add(f_out[width:-width], f_rows[2 * width:], out=f_out[width:-width])
+    np.add(f_rows[:width], f_rows[width:2 * width], out=f_out[:width])
+    np.add(f_rows[-width:], f_rows[-2 * width:-width], out=f_out[-width:])
+    return out
+
+
+def put(array, mask, value, tmp):
+    """Sets array to value where mask is True (faster than array[mask])
+    """
+    np.subtract(np.uint8(value), array, out=tmp)
+    np.multiply(tmp, mask.view(np.uint8), out=tmp)
+    np.add(array, tmp, out=array)
+
+
+def lookup(bits, counts, out):
+    """Writes on the bool array out the bits of the mask bits for the
+    counts, a uint8 array of numbers below 16, and returns it
+    """
+    flags = out.view(np.uint8)
+    np.right_shift(bits, counts, out=flags, casting='unsafe')
+    np.bitwise_and(flags, 1, out=flags)
+    return out
+
+
+def step_cells(cells, out=None, rule=CONWAY):
+    """Returns the next generation of an array of entity ids
+
+    The border ring of the array has to be void. The result is the one
+    of the dict engine: deletions first, then births with their halo of
+    dead cells and last the sparks generated by the arrows. The life
+    cells follow rule, a LifeRule, with a lookup of its tables for each
+    cell.
+    """
+    work = Workspace.get(cells.shape)
+    first, second, third = work.masks
+    if out is None:
+        out = np.empty_like(cells)
+    np.copyto(out, cells)
+
+    # deadcell == livingcell + 1, so dying is +1 and being born is -1
+    living = np.equal(cells, LIVING, out=first)
+    born = None
+    # With B0 the dead cells are born also without living cells
+    if living.any() or rule.births[0]:
+        around = box_sum(living.view(np.uint8), work.rows, work.sums)
+        # around counts also the cell itself
+        dies = lookup(rule.box_deaths, around, second)
+        np.logical_and(dies, living, out=dies)
+        np.add(out, dies.view(np.uint8), out=out)
+        born = lookup(rule.box_births, around, third)
+        np.logical_and(born, np.equal(cells, DEAD, out=first), out=born)
+
+    sparks = np.equal(cells, SPARK, out=second)
+    if sparks.any():
+        put(out, sparks, VOID, work.rows)
+        padded_sparks = np.pad(sparks, 1, 'constant').view(np.uint8)
+        free = np.pad(sparks | (cells == VOID), 1, 'constant')
+        targets = np.zeros(cells.shape, dtype=bool)
+        for type_, (inputs, (out_x, out_y)) in ARROW_RULES.items():
+            arrows = cells == type_
+            if not arrows.any():
+                continue
+            count = sum(shifted(padded_sparks, in_x, in_y)
+                        for in_x, in_y in inputs)
+            fire = arrows & (count == 1) & shifted(free, out_x, out_y)
+            # The spark appears on the output cell of the arrow
+            targets |= shifted(np.pad(fire, 1, 'constant'), -out_x, -out_y)
+    else:
+        targets = None
+
+    if born is not None and born.any():
+        np.subtract(out, born.view(np.uint8), out=out)
+        halo = box_sum(born.view(np.uint8), work.rows, work.sums)
+        halo = np.not_equal(halo, 0, out=first)
+        np.logical_and(halo, np.not_equal(out, LIVING, out=third), out=halo)
+        put(out, halo, DEAD, work.rows)
+    if targets is not None:
+        put(out, targets, SPARK, work.rows)
+    return out
+
+
+def positions_array(keys):
+    """Returns the (n, 2) int64 array with the (x, y) of a list of n keys
+    """
+    keys = np.fromiter(keys, dtype=np.int64, count=len(keys))
+    return np.stack(((keys & KEY_LOW) - KEY_BIAS,
+                     (keys >> 32) - KEY_BIAS), axis=1)
+
+
+def keys_list(x, y):
+    """Returns the list of the keys of the int64 arrays of coordinates
+    """
+    return (((y + KEY_BIAS) << 32) + x + KEY_BIAS).tolist()
+
+
+def gather(get, keys, offsets):
+    """Returns an (n, len(offsets)) uint8 array with the types of the
+    cells at offsets (dif_x, dif_y) from each of the n keys, read with
+    the get of a storage
+    """
+    offsets = [key_offset(dif_x, dif_y) for dif_x, dif_y in offsets]
+    return np.array([[get(key + offset, VOID) for offset in offsets]
+                     for key in keys], dtype=np.uint8).reshape(
+                         len(keys), len(offsets))
+
+
+class ArrayStorage(object):
+
+    """Dict methods of the storages made by arrays
+
+    The subclasses give __getitem__, __setitem__, __len__, items and
+    reserve, that grows the arrays to contain a rectangle. The cells
+    are given by their keys.
+    """
+
+    def __contains__(self, pos):
+        return self[pos] != VOID
+
+    def __iter__(self):
+        for pos, _ in self.items():
+            yield pos
+
+    def get(self, pos, default=VOID):
+        type_ = self[pos]
+        return default if type_ == VOID else type_
+
+    def pop(self, pos, *default):
+        type_ = self[pos]
+        if type_ == VOID:
+            if default:
+                return default[0]
+            raise KeyError(pos)
+        self[pos] = VOID
+        return type_
+
+    def keys(self):
+        return [pos for pos, _ in self.items()]
+
+    def values(self):
+        return [type_ for _, type_ in self.items()]
+
+    def viewitems(self):
+        return self.items()
+
+    viewkeys = iterkeys = keys
+    viewvalues = itervalues = values
+    iteritems = viewitems
+
+    def gather(self, keys, offsets):
+        return gather(self.get, keys, offsets)
+
+    def update(self, other):
+        items = other.items()
+        if len(items) == 0:
+            return
+        points = positions_array([key for key, _ in items])
+        min_x, min_y = points.min(axis=0).tolist()
+        max_x, max_y = points.max(axis=0).tolist()
+        self.reserve(min_x, min_y, max_x, max_y)
+        for pos, type_ in items:
+            self[pos] = type_
+
+
+class DenseGrid(ArrayStorage):
+
+    """Entities storage on a dense uint8 NumPy array
+
+    It has the same interface of BaseGrid. The array grows when an entity
+    is inserted outside of it and origin is the position of the
+    element [0, 0].
+    """
+
+    def __init__(self, data=None):
+        self._cells = np.zeros((0, 0), dtype=np.uint8)
+        self._origin = Point(0, 0)
+        # True when an entity that step_cells can't manage may be present
+        self._foreign = False
+        self._next = None
+        if data is not None:
+            self.update(data)
+
+    ##
+    # Array management --------------------------------------------------------
+    def reserve(self, min_x, min_y, max_x, max_y):
+        """Grows the array to contain the rectangle between the two points
+        """
+        height, width = self._cells.shape
+        o_x, o_y = self._origin
+        if height == 0:
+            o_x, o_y = min_x - GROW_STEP, min_y - GROW_STEP
+            shape = (max_y - min_y + 1 + GROW_STEP * 2,
+                     max_x - min_x + 1 + GROW_STEP * 2)
+            self._cells = np.zeros(shape, dtype=np.uint8)
+            self._origin = Point(o_x, o_y)
+            return
+        if min_x >= o_x and min_y >= o_y and\
+                max_x < o_x + width and max_y < o_y + height:
+            return
+        grow_x = max(GROW_STEP, width // 2)
+        grow_y = max(GROW_STEP, height // 2)
+        left = o_x - min_x + grow_x if min_x < o_x else 0
+        top = o_y - min_y + grow_y if min_y < o_y else 0
+        right = max_x - (o_x + width) + 1 + grow_x\
+            if max_x >= o_x + width else 0
+        bottom = max_y - (o_y + height) + 1 + grow_y\
+            if max_y >= o_y + height else 0
+        self._cells = np.pad(
+            self._cells, ((top, bottom), (left, right)), 'constant')
+        self._origin = Point(o_x - left, o_y - top)
+
+    def gather(self, keys, offsets):
+        """gather() with array indexing
+        """
+        offsets = np.array(offsets, dtype=np.int64).reshape(-1, 2)
+        points = positions_array(keys) -\
+            np.array(self._origin, dtype=np.int64)
+        x = points[:, 0:1] + offsets[:, 0]
+        y = points[:, 1:2] + offsets[:, 1]
+        height, width = self._cells.shape
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        around = np.zeros(x.shape, dtype=np.uint8)
+        around[inside] = self._cells[y[inside], x[inside]]
+        return around
+
+    def insert_all(self, keys, type_, halo=None, offsets=()):
+        """Writes type_ on the cells of a list of keys and halo on the
+        cells at offsets (dif_x, dif_y) from them that aren't type_, the
+        same of an insert of each entity, with array indexing
+        """
+        if len(keys) == 0:
+            return
+        margin = max([max(abs(dif_x), abs(dif_y))
+                      for dif_x, dif_y in offsets] or [0])
+        points = positions_array(keys)
+        min_x, min_y = points.min(axis=0).tolist()
+        max_x, max_y = points.max(axis=0).tolist()
+        self.reserve(min_x - margin, min_y - margin,
+                     max_x + margin, max_y + margin)
+        points -= np.array(self._origin, dtype=np.int64)
+        x, y = points[:, 0], points[:, 1]
+        cells = self._cells
+        if halo is not None and len(offsets) != 0:
+            # Like insert, the entities already there write no halo
+            fresh = cells[y, x] != type_
+            padded = np.zeros((cells.shape[0] + 2 * margin,
+                               cells.shape[1] + 2 * margin), dtype=bool)
+            padded[y[fresh] + margin, x[fresh] + margin] = True
+            around = np.zeros(cells.shape, dtype=bool)
+            for dif_x, dif_y in offsets:
+                around |= shifted(padded, -dif_x, -dif_y, margin)
+            around &= cells != type_
+            cells[around] = halo
+            if halo not in VECTOR_TYPES:
+                self._foreign = True
+        cells[y, x] = type_
+        if type_ not in VECTOR_TYPES:
+            self._foreign = True
+
+    def ensure_margin(self):
+        """Grows the array if the border ring is not void, so the next step
+        can't write outside of it
+        """
+        cells = self._cells
+        if cells.size == 0:
+            return
+        if cells[0].any() or cells[-1].any() or\
+                cells[:, 0].any() or cells[:, -1].any():
+            o_x, o_y = self._origin
+            height, width = cells.shape
+            self.reserve(o_x - 1, o_y - 1, o_x + width, o_y + height)
+
+    def vectorizable(self):
+        """True if all the entities can be updated by step_cells
+        """
+        if self._foreign:
+            present = np.nonzero(np.bincount(self._cells.ravel()))[0]
+            if not VECTOR_TYPES.issuperset(present.tolist()):
+                return False
+            self._foreign = False
+        return True
+
+    def step(self, rule=CONWAY):
+        """Updates the whole array with step_cells and the rule of the
+        life cells
+
+        Returns False, without doing anything, if there are entities
+        that need the per cell update.
+        """
+        if not self.vectorizable():
+            return False
+        self.ensure_margin()
+        if self._cells.size != 0:
+            # Double buffering: the old array is the output of the next step
+            if self._next is None or self._next.shape != self._cells.shape:
+                self._next = np.empty_like(self._cells)
+            self._cells, self._next = step_cells(
+                self._cells, self._next, rule), self._cells
+        return True
+
+    ##
+    # Dict interface ----------------------------------------------------------
+    def __index(self, pos):
+        x, y = coordinates(pos)
+        x -= self._origin.x
+        y -= self._origin.y
+        height, width = self._cells.shape
+        if 0 <= x < width and 0 <= y < height:
+            return y, x
+        return None
+
+    def __getitem__(self, pos):
+        index = self.__index(pos)
+        if index is None:
+            return VOID
+        return int(self._cells[index])
+
+    def __setitem__(self, pos, type_):
+        index = self.__index(pos)
+        if index is None:
+            if type_ == VOID:
+                return
+            x, y = coordinates(pos)
+            self.reserve(x, y, x, y)
+            index = self.__index(pos)
+        if type_ not in VECTOR_TYPES:
+            self._foreign = True
+        self._cells[index] = type_
+
+    def __len__(self):
+        return int(np.count_nonzero(self._cells))
+
+    def items(self):
+        o_x, o_y = self._origin
+        rows, columns = np.nonzero(self._cells)
+        types = self._cells[rows, columns].tolist()
+        return list(zip(keys_list(columns + o_x, rows + o_y), types))
+
+    def clear(self):
+        self._cells = np.zeros((0, 0), dtype=np.uint8)
+        self._next = None
+        self._origin = Point(0, 0)
+        self._foreign = False
+
+    def copy(self):
+        new = type(self)()
+        new._cells = self._cells.copy()
+        new._origin = self._origin
+        new._foreign = self._foreign
+        return new
+
+    def translate(self, x, y):
+        """Moves all the entities by (x, y)
+        """
+        self._origin = Point(self._origin.x + x, self._origin.y + y)
@@ -1,5 +1,5 @@
-from .ca_base_entity import BaseEntity, VoidEntity, ENTITIES_NAMES, NEIGHBORHOOD_TYPES
-from .utils import Point
+from .ca_base_entity import BaseEntity, VoidEntity, ENTITIES_NAMES, ENTITIES_IDS, NEIGHBORHOOD_TYPES, NEIGHBORHOOD_OFFSETS
+from .ca_rules import CONWAY
 
 
 class MonoOne(BaseEntity):
@@ -29,9 +29,7 @@ class MonoOne(BaseEntity):
         elif right == ENTITIES_NAMES["monoone"] and\
                 left == ENTITIES_NAMES["monoone"]:  # 111
             out = False
-        my_x, my_y = pos
-        dif_x, dif_y = self.neighborhood_pos['S']
-        new_pos = Point(my_x + dif_x, my_y + dif_y)
+        new_pos = self.neighbor(pos, 'S')
         if out:
             grid.insert_action(("ins", (new_pos, ENTITIES_NAMES["monoone"])))
         else:
@@ -39,6 +37,8 @@ class MonoOne(BaseEntity):
 
 
 class MonoZero(BaseEntity):
+    # Drawn as the background
+    drawable = False
 
     def __init__(self, *args, **kwargs):
         super(MonoZero, self).__init__(ENTITIES_NAMES['monozero'])
@@ -65,9 +65,7 @@ class MonoZero(BaseEntity):
         elif right == ENTITIES_NAMES["monozero"] and\
                 left == ENTITIES_NAMES["monozero"]:  # 000
             out = False
-        my_x, my_y = pos
-        dif_x, dif_y = self.neighborhood_pos['S']
-        new_pos = Point(my_x + dif_x, my_y + dif_y)
+        new_pos = self.neighbor(pos, 'S')
         if out:
             grid.insert_action(("ins", (new_pos, ENTITIES_NAMES["monoone"])))
         else:
@@ -83,33 +81,36 @@ class LivingCell(BaseEntity):
             ENTITIES_NAMES["deadcell"])
 
     def step(self, grid, pos):
-        if [self.get_neighbor(grid, pos, 'N'),
-                self.get_neighbor(grid, pos, 'NE'),
-                self.get_neighbor(grid, pos, 'E'),
-                self.get_neighbor(grid, pos, 'SE'),
-                self.get_neighbor(grid, pos, 'S'),
-                self.get_neighbor(grid, pos, 'SW'),
-                self.get_neighbor(grid, pos, 'W'),
-                self.get_neighbor(grid, pos, 'NW')].count(ENTITIES_NAMES['livingcell']) in [2, 3]:
+        living = [self.get_neighbor(grid, pos, 'N'),
+                  self.get_neighbor(grid, pos, 'NE'),
+                  self.get_neighbor(grid, pos, 'E'),
+                  self.get_neighbor(grid, pos, 'SE'),
+                  self.get_neighbor(grid, pos, 'S'),
+                  self.get_neighbor(grid, pos, 'SW'),
+                  self.get_neighbor(grid, pos, 'W'),
+                  self.get_neighbor(grid, pos, 'NW')].count(ENTITIES_NAMES['livingcell'])
+        if CONWAY.survivals[living]:
             return
         else:
             grid.insert_action(("del", pos))
 
 
 class DeadCell(BaseEntity):
+    drawable = False
 
     def __init__(self, *args, **kwargs):
         super(DeadCell, self).__init__(ENTITIES_NAMES['deadcell'])
 
     def step(self, grid, pos):
-        if [self.get_neighbor(grid, pos, 'N'),
-                self.get_neighbor(grid, pos, 'NE'),
-                self.get_neighbor(grid, pos, 'E'),
-                self.get_neighbor(grid, pos, 'SE'),
-                self.get_neighbor(grid, pos, 'S'),
-                self.get_neighbor(grid, pos, 'SW'),
-                self.get_neighbor(grid, pos, 'W'),
-                self.get_neighbor(grid, pos, 'NW')].count(ENTITIES_NAMES['livingcell']) == 3:
+        living = [self.get_neighbor(grid, pos, 'N'),
+                  self.get_neighbor(grid, pos, 'NE'),
+                  self.get_neighbor(grid, pos, 'E'),
+                  self.get_neighbor(grid, pos, 'SE'),
+                  self.get_neighbor(grid, pos, 'S'),
+                  self.get_neighbor(grid, pos, 'SW'),
+                  self.get_neighbor(grid, pos, 'W'),
+                  self.get_neighbor(grid, pos, 'NW')].count(ENTITIES_NAMES['livingcell'])
+        if CONWAY.births[living]:
             grid.insert_action(("ins", (pos, ENTITIES_NAMES["livingcell"])))
 
 
@@ -159,9 +160,7 @@ class ArrowUp(BaseEntity):
         next_pos = self.get_neighbor(grid, pos, 'N') == ENTITIES_NAMES["spark"] or\
             self.get_neighbor(grid, pos, 'N') == ENTITIES_NAMES["void"]
         if results and next_pos:
-            my_x, my_y = pos
-            dif_x, dif_y = self.neighborhood_pos['N']
-            new_pos = Point(my_x + dif_x, my_y + dif_y)
+            new_pos = self.neighbor(pos, 'N')
             grid.insert_action(("ins", (new_pos, ENTITIES_NAMES["spark"])))
 
 
@@ -202,9 +201,7 @@ class ArrowDown(BaseEntity):
         next_pos = self.get_neighbor(grid, pos, 'S') == ENTITIES_NAMES["spark"] or\
             self.get_neighbor(grid, pos, 'S') == ENTITIES_NAMES["void"]
         if results and next_pos:
-            my_x, my_y = pos
-            dif_x, dif_y = self.neighborhood_pos['S']
-            new_pos = Point(my_x + dif_x, my_y + dif_y)
+            new_pos = self.neighbor(pos, 'S')
             grid.insert_action(("ins", (new_pos, ENTITIES_NAMES["spark"])))
 
 
@@ -245,9 +242,7 @@ class ArrowRight(BaseEntity):
         next_pos = self.get_neighbor(grid, pos, 'E') == ENTITIES_NAMES["spark"] or\
             self.get_neighbor(grid, pos, 'E') == ENTITIES_NAMES["void"]
         if results and next_pos:
-            my_x, my_y = pos
-            dif_x, dif_y = self.neighborhood_pos['E']
-            new_pos = Point(my_x + dif_x, my_y + dif_y)
+            new_pos = self.neighbor(pos, 'E')
             grid.insert_action(("ins", (new_pos, ENTITIES_NAMES["spark"])))
 
 
@@ -288,9 +283,7 @@ class ArrowLeft(BaseEntity):
         next_pos = self.get_neighbor(grid, pos, 'W') == ENTITIES_NAMES["spark"] or\
             self.get_neighbor(grid, pos, 'W') == ENTITIES_NAMES["void"]
         if results and next_pos:
-            my_x, my_y = pos
-            dif_x, dif_y = self.neighborhood_pos['W']
-            new_pos = Point(my_x + dif_x, my_y + dif_y)
+            new_pos = self.neighbor(pos, 'W')
             grid.insert_action(("ins", (new_pos, ENTITIES_NAMES["spark"])))
 
 #####
@@ -307,3 +300,87 @@ ALL_ENTITIES = {
     ENTITIES_NAMES['monoone']: MonoOne(),
     ENTITIES_NAMES['monozero']: MonoZero()
 }
+
+# Types of the entities stepped by step_all
+BATCH_TYPES = set(entity_t for entity_t, entity in ALL_ENTITIES.items()
+                  if isinstance(entity, BaseEntity) and entity.batch)
+
+# Name -> image file of the entities added by register_entity
+ENTITY_SPRITES = dict()
+
+# Static properties of the entities in flat lists indexed by type id,
+# read on every insert, transformation and draw instead of asking the
+# entities: the type itself (None for the free ids), the neighborhood
+# and the halo type written around it on insert, the types after the
+# rotations and the flips and if the interface draws it
+MAX_TYPES = 256
+ENTITY_TYPES = [None] * MAX_TYPES
+ENTITY_NEIGHBORHOODS = [None] * MAX_TYPES
+ENTITY_HALOS = [None] * MAX_TYPES
+ENTITY_ROTATIONS = dict((deg, [None] * MAX_TYPES) for deg in (0, 90, 180, 270))
+ENTITY_FLIPS_H = [None] * MAX_TYPES
+ENTITY_FLIPS_V = [None] * MAX_TYPES
+ENTITY_DRAWABLE = [False] * MAX_TYPES
+
+
+def _tabulate(type_, entity, drawable):
+    """Writes the static properties of an entity in the lists
+    """
+    ENTITY_TYPES[type_] = type_
+    ENTITY_ROTATIONS[0][type_] = type_
+    if isinstance(entity, BaseEntity):
+        ENTITY_NEIGHBORHOODS[type_] = entity.neighborhood
+        ENTITY_HALOS[type_] = entity.neighbors
+        for deg in (90, 180, 270):
+            ENTITY_ROTATIONS[deg][type_] = entity.rotate(deg)
+        ENTITY_FLIPS_H[type_] = entity.flip_h()
+        ENTITY_FLIPS_V[type_] = entity.flip_v()
+    else:
+        for deg in (90, 180, 270):
+            ENTITY_ROTATIONS[deg][type_] = type_
+        ENTITY_FLIPS_H[type_] = ENTITY_FLIPS_V[type_] = type_
+    ENTITY_DRAWABLE[type_] = bool(drawable)
+
+
+for entity_t, entity in ALL_ENTITIES.items():
+    _tabulate(entity_t, entity, entity.drawable)
+
+
+def register_entity(name, entity, sprite=None):
+    """Adds a new type of entity, an instance of a BaseEntity subclass
+    with its id as type, under name
+
+    The entity gives its neighborhood and halo, its rotate and flip
+    rules and step, or batch and step_all, reading only the cells of its
+    Moore neighborhood. sprite is the path of the image drawn by the
+    interface, without it the entity is not drawn. The grids store the
+    entities by name, so register them before loading the files that
+    use them. Raises ValueError if the id or the name is taken or
+    invalid, or if the entity is batch without its own step_all.
+    """
+    type_ = entity.type
+    if not isinstance(type_, int) or not 0 < type_ < MAX_TYPES:
+        # The array storages keep the types in uint8 arrays
+        raise ValueError("Entity id %r is not in 1-255" % (type_,))
+    if type_ in ENTITIES_IDS:
+        raise ValueError("Entity id %d is taken by %s" %
+                         (type_, ENTITIES_IDS[type_]))
+    if name in ENTITIES_NAMES:
+        raise ValueError("Entity name %r is taken" % (name,))
+    if entity.neighborhood is not None and\
+            entity.neighborhood not in NEIGHBORHOOD_OFFSETS:
+        raise ValueError("Unknown neighborhood %r" % (entity.neighborhood,))
+    if any(abs(dif_x) > 1 or abs(dif_y) > 1 for dif_x, dif_y in entity.reads):
+        # The grid steps only the cells near the ones written
+        raise ValueError("The reads of %s are out of the Moore neighborhood"
+                         % (name,))
+    if entity.batch and type(entity).step_all == BaseEntity.step_all:
+        raise ValueError("%s is batch but doesn't define step_all" % (name,))
+    ENTITIES_IDS[type_] = name
+    ENTITIES_NAMES[name] = type_
+    ALL_ENTITIES[type_] = entity
+    if entity.batch:
+        BATCH_TYPES.add(type_)
+    if sprite is not None:
+        ENTITY_SPRITES[name] = sprite
+    _tabulate(type_, entity, entity.drawable and sprite is not None)
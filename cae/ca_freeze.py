@@ -0,0 +1,364 @@
+import numpy as np
+from collections import deque
+from .ca_hash import mix, mix_array, GOLDEN, MASK
+from .utils import KEY_BIAS
+
+# Side of a region, in cells, a power of two
+TILE = 16
+# Longest period of the regions that can be frozen
+MAX_PERIOD = 4
+# Periods a region has to repeat before it is frozen
+REPEATS = 3
+# Distance of the cells an entity can write: the neighbor of its action
+# and the halo around it
+REACH = 2
+# Distance of the cells that decide the next state of a cell: the ones
+# read by the entities that reach it
+MARGIN = REACH + 1
+# Changes of a generation from which their hashes are computed with NumPy
+BATCH = 64
+
+
+def cell_key(pos, type_):
+    """Returns the key of an entity in the hash of a tile, like the
+    Zobrist keys but with one mix: it is computed for every change
+    """
+    if type_ == 0:
+        return 0
+    return mix((pos * GOLDEN + type_) & MASK)
+
+
+def cell_keys(positions, types):
+    """cell_key on arrays of uint64
+    """
+    with np.errstate(over='ignore'):
+        keys = mix_array(positions * np.uint64(GOLDEN) + types)
+    keys[types == 0] = 0
+    return keys
+
+
+class RegionFreezer(object):
+
+    """Finds the periodic regions of a grid and writes them in bulk
+
+    The grid is split in tiles of TILE cells. Each tile keeps the hash of
+    its cells and of the MARGIN cells around it: they are all that its
+    next state depends on. When the hash of a tile repeats with a period
+    up to MAX_PERIOD for REPEATS periods, the changes of its cells are
+    recorded for one period, then the tile is frozen. Its neighbors can
+    oscillate too, as long as they stay in phase.
+
+    The cells of the frozen tiles that reach only frozen tiles are not
+    stepped, and each generation the grid writes the changes of the
+    phase of the frozen tiles, see phases. A tile whose hash leaves its
+    phase thaws after the generation, an edit thaws the tiles around it
+    at once.
+
+    The changes written in a generation are kept and hashed together at
+    its end. The cells are given by their keys and a tile by the key of
+    its cells shifted by log2(tile), without the low bits of the row:
+    the tile on the right of one is the next integer, the one below is
+    1 << 32 after it.
+    """
+
+    def __init__(self, items=(), tile=TILE, max_period=MAX_PERIOD):
+        if tile & (tile - 1) or tile <= 2 * MARGIN:
+            raise ValueError("The tile side %r is not a power of two "
+                             "larger than %d" % (tile, 2 * MARGIN))
+        self.tile = tile
+        self.max_period = max_period
+        self.__shift = tile.bit_length() - 1
+        # Mask of the shifted key of a cell that gives its tile
+        self.__mask = ~((tile - 1) << (32 - self.__shift))
+        # What is added to a tile to go down by one tile
+        self.__row = 1 << 32
+        self.__around = tuple(dif_x + dif_y * self.__row
+                              for dif_x in (-1, 0, 1) for dif_y in (-1, 0, 1)
+                              if dif_x != 0 or dif_y != 0)
+        self.reset(items)
+
+    def reset(self, items):
+        """Forgets everything and computes the hashes of the tiles
+        """
+        self.hashes = dict()
+        # Tiles whose hash changed in the current generation
+        self._changed = set()
+        self._histories = dict()
+        self._recording = dict()
+        self._frozen = dict()
+        # Cells written in bulk by the tiles thawed, that have to be
+        # stepped again
+        self._woken = list()
+        # Changes (key, type before, type after) of the generation, not
+        # hashed yet
+        self.writes = [(pos, 0, type_) for pos, type_ in items]
+        self.__hash_writes()
+        self._changed = set()
+
+    def invalidate(self):
+        """Marks the hashes as unknown, after the change of many cells
+        """
+        self.hashes = None
+        self.writes = list()
+
+    @property
+    def stale(self):
+        return self.hashes is None
+
+    def frozen_tiles(self):
+        """Returns the list of the frozen tiles as (tile_x, tile_y)
+        """
+        low = (1 << (32 - self.__shift)) - 1
+        bias = KEY_BIAS >> self.__shift
+        return [((key & low) - bias, (key >> 32) - bias)
+                for key in self._frozen]
+
+    def __tiles(self, pos, distance):
+        """Returns the tiles with a cell at most distance from the key
+        pos, its own first
+        """
+        tile = self.tile
+        key = (pos >> self.__shift) & self.__mask
+        dif_x = pos & (tile - 1)
+        dif_y = (pos >> 32) & (tile - 1)
+        if dif_x < distance:
+            near_x = -1
+        elif dif_x >= tile - distance:
+            near_x = 1
+        else:
+            near_x = 0
+        if dif_y < distance:
+            near_y = -self.__row
+        elif dif_y >= tile - distance:
+            near_y = self.__row
+        else:
+            near_y = 0
+        if near_x == 0:
+            if near_y == 0:
+                return (key,)
+            return (key, key + near_y)
+        if near_y == 0:
+            return (key, key + near_x)
+        return (key, key + near_x, key + near_y, key + near_x + near_y)
+
+    def __hash_writes(self):
+        """Adds the changes kept to the hashes of the tiles, and to the
+        tiles recorded
+        """
+        writes = self.writes
+        if len(writes) == 0:
+            return
+        self.writes = list()
+        hashes = self.hashes
+        changed = self._changed
+        if self._recording:
+            recording = self._recording
+            shift = self.__shift
+            mask = self.__mask
+            for pos, old_t, type_ in writes:
+                tile_recording = recording.get((pos >> shift) & mask)
+                if tile_recording is not None:
+                    tile_recording['writes'][-1].setdefault(
+                        pos, [old_t, type_])[1] = type_
+        if len(writes) < BATCH:
+            tiles = self.__tiles
+            for pos, old_t, type_ in writes:
+                # cell_key inlined, it is the hot loop of small grids
+                base = pos * GOLDEN
+                delta = (old_t and mix((base + old_t) & MASK)) ^\
+                    (type_ and mix((base + type_) & MASK))
+                keys = tiles(pos, MARGIN)
+                for key in keys:
+                    hashes[key] = hashes.get(key, 0) ^ delta
+                changed.update(keys)
+            return
+        tile = self.tile
+        array = np.array(writes, dtype=np.int64)
+        positions = array[:, 0]
+        unsigned = positions.view(np.uint64)
+        deltas = cell_keys(unsigned, array[:, 1].view(np.uint64)) ^\
+            cell_keys(unsigned, array[:, 2].view(np.uint64))
+        keys = (positions >> self.__shift) & self.__mask
+        dif_x = positions & (tile - 1)
+        dif_y = (positions >> 32) & (tile - 1)
+        near_x = np.where(dif_x < MARGIN, -1,
+                          np.where(dif_x >= tile - MARGIN, 1, 0))
+        near_y = np.where(dif_y < MARGIN, -self.__row,
+                          np.where(dif_y >= tile - MARGIN, self.__row, 0))
+        has_x = near_x != 0
+        has_y = near_y != 0
+        both = has_x & has_y
+        keys = np.concatenate((keys, keys[has_x] + near_x[has_x],
+                               keys[has_y] + near_y[has_y],
+                               keys[both] + near_x[both] + near_y[both]))
+        deltas = np.concatenate((deltas, deltas[has_x], deltas[has_y],
+                                 deltas[both]))
+        order = np.argsort(keys, kind="mergesort")
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate(([True],
+                                                keys[1:] != keys[:-1])))
+        deltas = np.bitwise_xor.reduceat(deltas[order], starts)
+        keys = keys[starts].tolist()
+        for key, delta in zip(keys, deltas.tolist()):
+            hashes[key] = hashes.get(key, 0) ^ delta
+        changed.update(keys)
+
+    ##
+    # Hooks of the grid -------------------------------------------------------
+    def edited(self, pos, old_t, type_):
+        """Hashes a cell changed out of a generation, like an edit, and
+        thaws the tiles around it: their next states are unknown
+
+        The changes of a generation are appended by the grid to writes.
+        """
+        if self.hashes is None:
+            return
+        self.writes.append((pos, old_t, type_))
+        self.__hash_writes()
+        for key in self.__tiles(pos, MARGIN):
+            self.thaw(key)
+
+    def thaw(self, key):
+        """Stops the freezing of a tile and of its recording
+        """
+        self._recording.pop(key, None)
+        frozen = self._frozen.pop(key, None)
+        if frozen is None:
+            return
+        self._histories.pop(key, None)
+        last = frozen['phases'][frozen['phase'] - 1]
+        self._woken.extend(change[0] for change in last)
+        # The frozen tiles around didn't mark their borders, see phases
+        for dif in self.__around:
+            near = self._frozen.get(key + dif)
+            if near is not None:
+                last = near['phases'][near['phase'] - 1]
+                self._woken.extend(change[0] for change in last
+                                   if change[5])
+
+    def thaw_cells(self, positions):
+        """Thaws the tiles whose next state depends on positions, that
+        are written with something out of the grid, like a link
+        """
+        for pos in positions:
+            for key in self.__tiles(pos, MARGIN):
+                self.thaw(key)
+
+    def woken(self):
+        """Returns the cells written in bulk by the tiles thawed since the
+        last call: their neighbors have to be stepped
+        """
+        woken, self._woken = self._woken, list()
+        return woken
+
+    def split(self, cells):
+        """Returns the cells (key, type) without the ones of the frozen
+        tiles whose actions reach only frozen tiles
+        """
+        frozen = self._frozen
+        if len(frozen) == 0:
+            return cells
+        shift = self.__shift
+        mask = self.__mask
+        tiles = self.__tiles
+        stepped = list()
+        for cell in cells:
+            pos = cell[0]
+            if (pos >> shift) & mask in frozen:
+                for key in tiles(pos, REACH):
+                    if key not in frozen:
+                        stepped.append(cell)
+                        break
+            else:
+                stepped.append(cell)
+        return stepped
+
+    def phases(self):
+        """Returns the changes of the frozen tiles for this generation,
+        and moves them to their next phase
+
+        They are a list of (changes, border), with a change as (key, type
+        before, type after, delta of the hashes, tiles whose hash has
+        the cell, if it is near the border of its tile). border is False
+        when the tiles around are all frozen: no cell near the border is
+        stepped, so they don't have to be marked.
+        """
+        phases = list()
+        changed = self._changed
+        all_frozen = self._frozen
+        around = self.__around
+        for key, frozen in all_frozen.items():
+            phase = frozen['phase']
+            border = any(key + dif not in all_frozen for dif in around)
+            phases.append((frozen['phases'][phase], border))
+            changed.update(frozen['tiles'][phase])
+            frozen['phase'] = (phase + 1) % len(frozen['phases'])
+        return phases
+
+    def __freeze(self, key, recording):
+        """Turns the changes recorded in a tile into its phases
+        """
+        phases = list()
+        tiles = list()
+        for writes in recording['writes']:
+            phase = list()
+            touched = set()
+            for pos, (before, after) in writes.items():
+                keys = self.__tiles(pos, MARGIN)
+                touched.update(keys)
+                # The cells near the border can be read by cells that
+                # are stepped
+                phase.append((pos, before, after,
+                              cell_key(pos, before) ^ cell_key(pos, after),
+                              keys, len(keys) > 1))
+            phases.append(phase)
+            tiles.append(touched)
+        self._frozen[key] = {'phases': phases, 'tiles': tiles,
+                             'hashes': recording['hashes'], 'phase': 0}
+
+    def end_generation(self, generation):
+        """Thaws, records and freezes the tiles after a generation
+        """
+        self.__hash_writes()
+        changed = self._changed
+        self._changed = set()
+        hashes = self.hashes
+        for key, frozen in list(self._frozen.items()):
+            if hashes.get(key, 0) != frozen['hashes'][frozen['phase']]:
+                self.thaw(key)
+        for key, recording in list(self._recording.items()):
+            done = len(recording['writes'])
+            period = recording['period']
+            if hashes.get(key, 0) != recording['hashes'][done % period]:
+                del self._recording[key]
+                self._histories.pop(key, None)
+            elif done == period:
+                del self._recording[key]
+                self.__freeze(key, recording)
+            else:
+                recording['writes'].append(dict())
+        window = self.max_period * REPEATS
+        for key in changed:
+            if key not in self._histories:
+                self._histories[key] = deque(maxlen=window + 1)
+        for key, history in list(self._histories.items()):
+            if key in self._frozen or key in self._recording:
+                continue
+            value = hashes.get(key, 0)
+            history.append(value)
+            if len(history) <= window:
+                continue
+            if history[0] == value and len(set(history)) == 1:
+                # Still tiles already cost nothing
+                del self._histories[key]
+                continue
+            for period in range(2, self.max_period + 1):
+                if history[-1 - period] == value and\
+                        all(history[index] == history[index - period]
+                            for index in range(period, len(history))):
+                    # Hashes of the phases, the current one is the first
+                    last = list(history)[-period:]
+                    self._recording[key] = {
+                        'period': period, 'hashes': last[-1:] + last[:-1],
+                        'writes': [dict()]}
+                    break
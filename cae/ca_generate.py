@@ -0,0 +1,160 @@
+"""Generators of large grids for the benchmarks
+
+Each generator returns the content of a grid file, the dict saved as
+JSON by CellularGrid.store, made with a NumPy RandomState of the seed:
+the same arguments always give the same grid. hierarchy returns the
+files of a grid and of the modules it links.
+"""
+import json
+import numpy as np
+from collections import OrderedDict
+from os import path
+from .ca_link import LINK_TYPE_NAMES, LINK_TYPE_IDS
+from .ca_rules import CONWAY
+
+# Rows of the random numbers made at once by life_soup
+BAND = 256
+
+
+def _points(columns, rows):
+    """Returns the list of [x, y] of the arrays of coordinates
+    """
+    return np.column_stack((columns, rows)).tolist()
+
+
+def life_soup(width, height, density=0.35, seed=0, rule=CONWAY.string):
+    """Returns a rectangle of width x height cells from (0, 0) with a
+    living cell in each one with probability density
+
+    The dead cells around them are made by the grid when it is loaded.
+    """
+    random = np.random.RandomState(seed)
+    living = list()
+    for top in range(0, height, BAND):
+        rows, columns = np.nonzero(
+            random.random_sample((min(BAND, height - top), width)) < density)
+        living.extend(_points(columns, rows + top))
+    return {"rule": rule, "livingcell": living, "my_links": dict()}
+
+
+def arrow_mesh(columns, rows, side=8, density=0.5, seed=0):
+    """Returns columns x rows square rings of arrows with side arrows on
+    each side, carrying sparks that go around them forever
+
+    The arrows of a ring are one cell apart and the sparks are in the
+    cells between them, one in each of those cells with probability
+    density. The ring (i, j) starts at (i * (2 * side + 2),
+    j * (2 * side + 2)).
+    """
+    random = np.random.RandomState(seed)
+    end = 2 * side
+    odd = np.arange(1, end, 2)
+    even = np.arange(0, end, 2)
+    # Arrows and spark cells of the ring at (0, 0), clockwise
+    arrows = {
+        "arrowright": (odd, np.zeros_like(odd)),
+        "arrowdown": (np.full_like(odd, end), odd),
+        "arrowleft": (odd, np.full_like(odd, end)),
+        "arrowup": (np.zeros_like(odd), odd),
+    }
+    gaps = (np.concatenate((even, np.full_like(even, end), even + 2,
+                            np.zeros_like(even))),
+            np.concatenate((np.zeros_like(even), even, np.full_like(even, end),
+                            even + 2)))
+    pitch = end + 2
+    grid_x, grid_y = np.meshgrid(np.arange(columns) * pitch,
+                                 np.arange(rows) * pitch)
+    grid_x, grid_y = grid_x.reshape(-1, 1), grid_y.reshape(-1, 1)
+    content = {"my_links": dict()}
+    for name, (xs, ys) in arrows.items():
+        content[name] = _points((grid_x + xs).ravel(), (grid_y + ys).ravel())
+    sparks_x, sparks_y = grid_x + gaps[0], grid_y + gaps[1]
+    chosen = random.random_sample(sparks_x.shape) < density
+    content["spark"] = _points(sparks_x[chosen], sparks_y[chosen])
+    return content
+
+
+def automaton_seed(width, density=0.5, seed=0):
+    """Returns a row of width mono entities from (0, 0) for the 1D
+    automata, a MonoOne with probability density, else a MonoZero
+    """
+    random = np.random.RandomState(seed)
+    ones = random.random_sample(width) < density
+    columns = np.arange(width)
+    zeros = np.zeros(width, dtype=np.int64)
+    return {"monoone": _points(columns[ones], zeros[ones]),
+            "monozero": _points(columns[~ones], zeros[~ones]),
+            "my_links": dict()}
+
+
+def _wire(content, y, length, sparks):
+    """Adds a row of length right arrows from (1, y), one cell apart,
+    and sparks in the cells between them where sparks is True
+    """
+    content.setdefault("arrowright", list()).extend(
+        [x, y] for x in range(1, 2 * length, 2))
+    content.setdefault("spark", list()).extend(
+        [x, y] for x, spark in zip(range(2, 2 * length, 2), sparks) if spark)
+
+
+def _ring(content, y, length, id_, sparks):
+    """Adds a wire at row y that loops through the linked grid id_: the
+    cell after its last arrow goes to the input of the linked grid and
+    the output of the linked grid comes back in the cell before the
+    first arrow
+    """
+    _wire(content, y, length, sparks)
+    links = content.setdefault("links", dict())
+    links["%d,%d" % (0, y)] = [LINK_TYPE_NAMES["OUT"], id_, [2 * length, 0]]
+    links["%d,%d" % (2 * length, y)] = [LINK_TYPE_NAMES["IN"], id_, [0, 0]]
+
+
+def hierarchy(name, instances, depth=1, length=8, density=0.5, seed=0):
+    """Returns an OrderedDict {file name: content} with the grid name,
+    that links instances modules, and the depth levels of the modules
+
+    A module passes what enters from its input link, at (0, 0), along a
+    wire of length arrows to its output link at (2 * length, 0). The
+    modules above the lowest level also have a ring through a module of
+    the level below, so the grid has instances * depth linked grids.
+    The sparks are on the rings, in each cell between two arrows with
+    probability density. The files of the modules are named after name
+    and have to be in its directory.
+    """
+    random = np.random.RandomState(seed)
+    stem = path.splitext(path.basename(name))[0]
+    modules = ["%s_module_%d.cg" % (stem, level) for level in range(depth)]
+    files = OrderedDict()
+    top = {"my_links": dict(), "linked_names": dict()}
+    for index in range(instances):
+        id_ = index + 1
+        _ring(top, 2 * index, length, id_,
+              random.random_sample(length - 1) < density)
+        top["linked_names"][str(id_)] = modules[-1]
+    files[name] = top
+    for level, module in enumerate(modules):
+        content = {"my_links": {
+            LINK_TYPE_IDS[LINK_TYPE_NAMES["IN"]]: [[0, 0]],
+            LINK_TYPE_IDS[LINK_TYPE_NAMES["OUT"]]: [[2 * length, 0]]}}
+        _wire(content, 0, length, [False] * (length - 1))
+        if level > 0:
+            _ring(content, 2, length, 1,
+                  random.random_sample(length - 1) < density)
+            content["linked_names"] = {"1": modules[level - 1]}
+        files[path.join(path.dirname(name), module)] = content
+    return files
+
+
+def count_cells(content):
+    """Returns the number of entities of the content of a grid file
+    """
+    return sum(len(points) for key, points in content.items()
+               if key not in ("rule", "my_links", "links", "linked_names"))
+
+
+def write(content, filename):
+    """Writes the content of a grid file, like CellularGrid.store
+    """
+    # dumps encodes in one shot with the C encoder, dump doesn't
+    with open(filename, "w") as fp:
+        fp.write(json.dumps(content))
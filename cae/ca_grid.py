@@ -1,13 +1,57 @@
 import json
-from collections import deque
-from ca_entities import ALL_ENTITIES
-from ca_base_entity import VoidEntity, ENTITIES_NAMES, ENTITIES_IDS, Point, NEIGHBORHOOD_TYPES
+import numpy as np
+from fractions import Fraction
+from collections import deque, OrderedDict
+from ca_entities import ALL_ENTITIES, BATCH_TYPES, ENTITY_TYPES, ENTITY_NEIGHBORHOODS, ENTITY_HALOS, ENTITY_ROTATIONS, ENTITY_FLIPS_H, ENTITY_FLIPS_V
+from ca_base_entity import ENTITIES_NAMES, ENTITIES_IDS, NEIGHBORHOOD_TYPES, NEIGHBORHOOD_OFFSETS
 from ca_link import LINK_TYPE_NAMES, LINK_TYPE_IDS
-from utils import rotate_point, debug, Point
+from ca_dense import DenseGrid, gather, keys_list, positions_array
+from ca_bitlife import BitLifeGrid
+from ca_chunked import ChunkedGrid
+from ca_parallel import ParallelGrid
+from ca_hashlife import HashLife, LIFE_TYPES
+from ca_tables import step_cells
+from ca_wolfram import evolve, ENTITY_CODES, CODE_ENTITIES
+from ca_hash import mix, zobrist, items_hash
+from ca_freeze import RegionFreezer
+from ca_actions import ActionBuffer
+from ca_index import SpatialIndex, Extents
+from ca_rules import LifeRule, CONWAY
+from utils import rotate_point, debug, Point, pack, unpack, coordinates, key_offset
 from collections import defaultdict
 
 from six import add_metaclass
 from os import path
+from sys import getsizeof
+
+
+VOID = ENTITIES_NAMES['void']
+LIVING = ENTITIES_NAMES['livingcell']
+DEAD = ENTITIES_NAMES['deadcell']
+SPARK = ENTITIES_NAMES['spark']
+# Key offsets of the cells of each neighborhood
+NEIGHBORHOOD_KEYS = dict(
+    (neighborhood, tuple(key_offset(dif_x, dif_y) for dif_x, dif_y in offsets))
+    for neighborhood, offsets in NEIGHBORHOOD_OFFSETS.items())
+MOORE_KEYS = NEIGHBORHOOD_KEYS[NEIGHBORHOOD_TYPES["moore"]]
+# Key offsets of the eight neighbors of a cell
+NEIGHBORS = tuple(offset for offset in MOORE_KEYS if offset != 0)
+
+# Largest denominator of the speeds given as floats
+SPEED_DENOMINATOR = 1000
+
+
+def schedule(rate, generation):
+    """Returns the generations of a linked grid that does rate (a
+    Fraction) generations for each generation of its parent, in the
+    generation n of the parent: floor((n + 1) * rate) - floor(n * rate)
+
+    It is computed with integers, so the grids never drift, even in
+    nested links. The counts repeat every rate.denominator generations.
+    """
+    num, den = rate.numerator, rate.denominator
+    n = generation % den
+    return (n + 1) * num // den - n * num // den
 
 
 class BaseGrid(defaultdict):
@@ -19,64 +63,204 @@ class BaseGrid(defaultdict):
         if self.default_factory is None:
             raise KeyError(key)
         else:
-            # Factory of a Void entity
-            ret = self[key] = self.default_factory(VoidEntity().type)
-            return ret
+            # Factory of a Void entity, not stored: reading a cell
+            # doesn't make it exist
+            return self.default_factory(VOID)
+
+    def gather(self, keys, offsets):
+        """Returns the types of the cells at offsets from each key, see
+        ca_dense.gather
+        """
+        return gather(self.get, keys, offsets)
+
+    def compact(self):
+        """Deletes the void entries, returns how many they were
+        """
+        voids = [pos for pos, entity_t in self.viewitems() if entity_t == VOID]
+        for pos in voids:
+            del self[pos]
+        return len(voids)
+
+    def translate(self, x, y):
+        """Moves all the entities by (x, y)
+        """
+        offset = key_offset(x, y)
+        new_dict = dict()
+        for pos, entity_t in self.viewitems():
+            new_dict[pos + offset] = entity_t
+        self.clear()
+        self.update(new_dict)
+
+
+class PendingGrid(object):
+
+    """Placeholder for the storage of a grid whose entities are held
+    by another engine, like HashLife
+
+    The first access calls build, that has to return the real storage.
+    """
+
+    def __init__(self, build):
+        self.__build = build
+
+    def __getattr__(self, attr):
+        return getattr(self.__build(), attr)
+
+    def __getitem__(self, pos):
+        return self.__build()[pos]
+
+    def __setitem__(self, pos, type_):
+        self.__build()[pos] = type_
+
+    def __contains__(self, pos):
+        return pos in self.__build()
+
+    def __len__(self):
+        return len(self.__build())
+
+    def __iter__(self):
+        return iter(self.__build())
+
+
+def diff_bytes(before, after):
+    """Returns an estimate of the memory taken by the diff of an action
+    """
+    return getsizeof(before) + getsizeof(after) + len(before) * CELL_BYTES
+
+
+def action_bytes(action):
+    """Returns an estimate of the memory taken by the steps of an action
+    """
+    size = getsizeof(action)
+    for step in action:
+        if step[0] == "cells":
+            size += diff_bytes(step[1], step[2])
+        else:
+            size += getsizeof(step)
+    return size
 
 
 class HistoryExtension(object):
 
     """Extension for CellularGrid to manage history of actions
+
+    An action is stored as a list of steps: ("cells", before, after),
+    the cells it changed with their entities before and after it, so
+    undo and redo write only those cells, and ("move", x, y) for the
+    move_all done in it, that are undone by the opposite move. The
+    oldest actions are forgotten when they take more than _max_bytes.
     """
 
+    def __close_cells(self):
+        """Adds the cells changed since the last step to the action
+        recorded
+        """
+        void_id = ENTITIES_NAMES['void']
+        changes = self._changes
+        if self._changes_all:
+            for pos in self._grid.viewkeys():
+                if pos not in changes:
+                    changes[pos] = void_id
+        before = dict()
+        after = dict()
+        for pos, entity_t in changes.viewitems():
+            current = self._grid.get(pos, void_id)
+            if current != entity_t:
+                before[pos] = entity_t
+                after[pos] = current
+        self._changes = dict()
+        self._changes_all = False
+        if len(before) != 0:
+            self._action.append(("cells", before, after))
+
+    def _record_move(self, x, y):
+        """Records a move_all(x, y) in the action, the cells changed
+        before it are on the positions before the move
+        """
+        self.__close_cells()
+        self._action.append(("move", x, y))
+
+    def __pop_changes(self):
+        """Returns the steps of the action since the last one pushed, and
+        starts to record the next action
+        """
+        self.__close_cells()
+        action = self._action
+        self._action = list()
+        return action
+
+    def __apply(self, action, backward):
+        """Does the steps of an action, or undoes them if backward,
+        without recording them
+        """
+        self._changes = None
+        steps = reversed(action) if backward else action
+        for step in steps:
+            if step[0] == "cells":
+                self._write_cells(step[1] if backward else step[2])
+            elif backward:
+                self.move_all(-step[1], -step[2])
+            else:
+                self.move_all(step[1], step[2])
+        self._changes = dict()
+
     def undo(self):
         """Undo last action
         """
         # DEBUG
-        #debug("undo", ("actions", self._actions_dicts))
+        #debug("undo", ("actions", self._actions_diffs))
         if self._actions_index > 0:
-            # DEBUG
-            #debug("undo before clear", ("dict", self._grid))
-            self.clear()
-            # DEBUG
-            #debug("undo after clear", ("dict", self._grid))
-            for point, entity in self._actions_dicts[self._actions_index - 1].viewitems():
-                self.insert(point, entity)
+            # The changes not pushed are lost, like the action
+            self.__apply(self.__pop_changes(), True)
+            self.__apply(self._actions_diffs[self._actions_index - 1][0],
+                         True)
             self._actions_index -= 1
-        # DEBUG
-        #debug("undo exit", ("dict", self._grid))
 
     def redo(self):
         """Redo previous action
         """
         # DEBUG
-        #debug("redo", ("actions", self._actions_dicts))
-        if self._actions_index + 1 < len(self._actions_dicts):
-            self.clear()
-            for point, entity in self._actions_dicts[self._actions_index + 1].viewitems():
-                self.insert(point, entity)
+        #debug("redo", ("actions", self._actions_diffs))
+        if self._actions_index < len(self._actions_diffs):
+            self.__apply(self.__pop_changes(), True)
+            self.__apply(self._actions_diffs[self._actions_index][0], False)
             self._actions_index += 1
 
     def push_actions(self):
         """Add last action to the history
         """
         # DEBUG
-        #debug("push_actions", ("actions", self._actions_dicts))
-        while len(self._actions_dicts) != self._actions_index + 1:
-            self._actions_dicts.pop()
-        if len(self._actions_dicts) <= self._max_actions:
-            self._actions_dicts.append(dict((point, entity_t) for point, entity_t in self._grid.viewitems(
-            ) if entity_t != ENTITIES_NAMES['void']))
-            self._actions_index += 1
-        else:
-            self._actions_dicts.popleft()
-            self._actions_dicts.append(dict((point, entity_t) for point, entity_t in self._grid.viewitems(
-            ) if entity_t != ENTITIES_NAMES['void']))
+        #debug("push_actions", ("actions", self._actions_diffs))
+        action = self.__pop_changes()
+        if len(action) == 0:
+            return
+        while len(self._actions_diffs) != self._actions_index:
+            self._actions_bytes -= self._actions_diffs.pop()[1]
+        size = action_bytes(action)
+        self._actions_diffs.append((action, size))
+        self._actions_bytes += size
+        self._actions_index += 1
+        self.__forget_actions()
+
+    def set_history_bytes(self, max_bytes):
+        """Sets the memory the history can take, in bytes
+        """
+        self._max_bytes = max_bytes
+        self.__forget_actions()
+
+    def __forget_actions(self):
+        """Forgets the oldest actions until the history fits _max_bytes,
+        the last one is always kept
+        """
+        while self._actions_bytes > self._max_bytes and\
+                len(self._actions_diffs) > 1:
+            self._actions_bytes -= self._actions_diffs.popleft()[1]
+            self._actions_index -= 1
 
     def actions_status(self):
         """Return the current len of history action and the current index
         """
-        return (len(self._actions_dicts), self._actions_index)
+        return (len(self._actions_diffs) + 1, self._actions_index)
 
 
 class HistoryMetaclass(type):
@@ -87,41 +271,136 @@ class HistoryMetaclass(type):
     def __call__(cls, *args, **kwargs):
         if kwargs and kwargs.get('history', False):
             kwargs.pop('history')
+            max_bytes = kwargs.pop('history_bytes', HISTORY_BYTES)
             instance = type(
                 cls.__name__, (HistoryExtension,), cls.__dict__.copy())
-            setattr(instance, "_actions_dicts", deque())
+            setattr(instance, "_actions_diffs", deque())
             setattr(instance, "_actions_index", 0)
-            setattr(instance, "_max_actions", 10)
-            instance._actions_dicts.append(BaseGrid(int).copy())
+            setattr(instance, "_actions_bytes", 0)
+            setattr(instance, "_max_bytes", max_bytes)
+            setattr(instance, "_changes", dict())
+            setattr(instance, "_action", list())
             return instance.__call__(*args, **kwargs)
+        kwargs.pop('history', None)
         instance = type(cls.__name__, (object,), cls.__dict__.copy())
         return instance.__call__(*args, **kwargs)
 
 
+# Storage factories for the entities of a CellularGrid
+BACKENDS = {
+    "dict": lambda: BaseGrid(int),
+    "dense": DenseGrid,
+    "bitlife": BitLifeGrid,
+    "chunked": ChunkedGrid,
+    "parallel": ParallelGrid
+}
+
+# Ways to step the entities that the grid updates one by one
+ENGINES = ("entity", "table")
+
+# Entities of a type inserted at once by load() on the dense backends
+BULK_CELLS = 256
+
+# Default number of states remembered to detect cycles
+CYCLE_STATES = 4096
+
+# Void entries written in the dict storage before it is compacted, if
+# they are at least half of it
+COMPACT_VOIDS = 4096
+
+# Default memory of the history of actions and estimate of the memory of
+# a cell in a diff, with its key
+HISTORY_BYTES = 64 * 2 ** 20
+CELL_BYTES = getsizeof(pack((0, 0))) + 2 * getsizeof(0)
+
+
 @add_metaclass(HistoryMetaclass)
 class CellularGrid(object):
 
     """Object that manage the grid and his entities
+
+    backend selects the storage of the entities: "dict" (default),
+    "dense", a NumPy array updated with whole-array operations, or
+    "bitlife", bitboards of living and dead cells updated 64 at a time,
+    "chunked", NumPy tiles for large sparse worlds, or "parallel", the
+    dense array updated in bands by a pool of processes.
+    engine selects how the entities are stepped: "entity" (default)
+    calls their step methods, "table" uses their transition tables.
+    workers is the number of processes of the "parallel" backend, the
+    number of CPUs if None, the linked grids use the same options.
+    The storage, the entities and the structures kept by the grid use
+    the packed keys of the positions (see utils.pack), the methods for
+    the editor take and return Points.
     """
 
-    def __init__(self):
-        self._grid = BaseGrid(int)
+    # Entities before the changes since the last action pushed, for the
+    # history: None if the grid has no history (see HistoryMetaclass),
+    # _changes_all when cells were changed without insert and delete
+    _changes = None
+    _changes_all = False
+
+    def __init__(self, backend="dict", engine="entity", workers=None):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown backend %r" % (backend,))
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine %r" % (engine,))
+        if workers is not None:
+            if backend != "parallel":
+                raise ValueError("workers is an option of the parallel "
+                                 "backend, not of %r" % (backend,))
+            if workers < 1:
+                raise ValueError("Workers %r are not positive" % (workers,))
+        self.__backend = backend
+        self.__engine = engine
+        self.__workers = workers
+        if backend == "parallel":
+            self._grid = ParallelGrid(workers=workers)
+        else:
+            self._grid = BACKENDS[backend]()
         self._grid_sel = BaseGrid(int)
         self._linked_grids = dict()
         self._linked_names = dict()
         self._links = dict()
         self._my_links = dict()
-        self.__actions = {
-            'del': list(),
-            'ins': list()
-        }
+        self.__actions = ActionBuffer()
         self.__selection_list = list()
         self.__selected_my_links = list()
         self.__selected_links = list()
         self.__all_selection = list()
-        self.__speed = 1
-        self.__step = -1
+        self.__speed = Fraction(1)
+        self.__rule = CONWAY
         self.__filename = None
+        # Positions written since the last step, None means everything
+        self.__dirty = set()
+        # Zobrist hash of the entities, None when it has to be computed.
+        # It is kept only after state_hash() is used
+        self.__hash = None
+        self.__generations = 0
+        # Hash of the states -> generation, None if cycles aren't detected
+        self.__states = None
+        self.__states_size = 0
+        self.__states_start = 0
+        self.__cycle = None
+        self.__simulating = False
+        # HashLife universe and, when the entities are held by it, the
+        # storage to update when the grid is used again
+        self.__hashlife = None
+        self.__hashlife_base = None
+        # Periodic regions replayed instead of stepped, None if disabled
+        self.__freezer = None
+        # Positions of the non void entities, None when it has to be
+        # built. It is kept only after query_rect() is used
+        self.__index = None
+        # Bounding boxes of the entities, like the index after bounds()
+        self.__extents = None
+        # Void entries written since the last compaction
+        self.__voids = 0
+        # Number of living neighbors of the cells that have some, None
+        # when it has to be counted again
+        self.__neighbors = None
+        # Number of non void entities of the dict storage, like the hash
+        # after population()
+        self.__population = None
 
     ##
     # Speed section -----------------------------------------------------------
@@ -132,7 +411,17 @@ class CellularGrid(object):
 
     def set_speed(self, speed):
         """Sets the speed multiplicator for the current grid
+
+        speed can be an int, a Fraction, a string like "3/2" or a float,
+        made the closest fraction with a denominator up to
+        SPEED_DENOMINATOR. A linked grid does speed / parent speed
+        generations for each generation of its parent.
         """
+        if isinstance(speed, float):
+            speed = Fraction(speed).limit_denominator(SPEED_DENOMINATOR)
+        speed = Fraction(speed)
+        if speed <= 0:
+            raise ValueError("Speed %s is not positive" % (speed,))
         self.__speed = speed
 
     def set_grid_speed(self, id_, speed):
@@ -140,6 +429,32 @@ class CellularGrid(object):
         """
         self._linked_grids[id_].set_speed(speed)
 
+    ##
+    # Rule section ------------------------------------------------------------
+    def get_rule(self):
+        """Returns the rule of the life cells in B/S notation
+        """
+        return self.__rule.string
+
+    def set_rule(self, rule):
+        """Sets the Life-like rule of the life cells, a string in B/S
+        notation like "B36/S23", B3/S23 by default
+
+        Raises ValueError if the string is not a rule.
+        """
+        rule = LifeRule(rule)
+        if rule == self.__rule:
+            return
+        if self.__hashlife_base is not None:
+            self.__build_from_hashlife()
+        self.__rule = rule
+        # Every cell can change with the new rule, and the regions and
+        # the states found followed the old one
+        self.__dirty = None
+        if self.__freezer is not None:
+            self.__freezer.invalidate()
+        self.__reset_states()
+
     ##
     # Link section ------------------------------------------------------------
     def insert_link(self, pos, type_, mylink, id_=None, id_pos=None):
@@ -193,7 +508,9 @@ class CellularGrid(object):
         """Returns the id and filename attribute for each linked grid
         """
         for id_, grid in self._linked_grids.viewitems():
-            new_grid = CellularGrid()
+            new_grid = CellularGrid(backend=self.__backend,
+                                    engine=self.__engine,
+                                    workers=self.__workers)
             new_grid.load(grid.filename)
             old_grid = self._linked_grids.pop(id_)
             del old_grid
@@ -226,7 +543,9 @@ class CellularGrid(object):
     def insert_grid(self, filename):
         """Inserts a linked grid
         """
-        link_grid = CellularGrid()
+        link_grid = CellularGrid(backend=self.__backend,
+                                 engine=self.__engine,
+                                 workers=self.__workers)
         link_grid.load(filename=filename)
         self._linked_grids[id(link_grid)] = link_grid
         self._linked_names[id(link_grid)] = path.split(filename)[-1]
@@ -264,10 +583,15 @@ class CellularGrid(object):
         new_dict = BaseGrid(int)
         new_selection = list()
         new_all = list()
-        for point in self.__selection_list:
-            new_pos = rotate_point(point, pivot, deg)
+        rotations = ENTITY_ROTATIONS[deg % 360]
+        targets = [rotate_point(point, pivot, deg)
+                   for point in self.__selection_list]
+        # Only the cells selected and the ones they go to change
+        self.__changing_all(pack(point) for point in
+                            self.__selection_list + targets)
+        for point, new_pos in zip(self.__selection_list, targets):
             new_selection.append(new_pos)
-            new_dict[new_pos] = ALL_ENTITIES[self._grid[point]].rotate(deg)
+            new_dict[pack(new_pos)] = rotations[self._grid[pack(point)]]
             self.delete(point)
         self.__selection_list = new_selection
         self.__all_selection = list()
@@ -279,6 +603,7 @@ class CellularGrid(object):
                 new_dict[pos] = entity
         self._grid.clear()
         self._grid.update(new_dict)
+        self.__changed_all()
         self.__update_selection()
 
     def flip_h(self):
@@ -291,20 +616,25 @@ class CellularGrid(object):
         min_x = min(self.__all_selection)[0]
         mid_x = (max_x - min_x) / 2
         new_dict = BaseGrid(int)
-        for point in self.__selection_list:
-            my_x, my_y = point
+        selected = set(pack(point) for point in self.__selection_list)
+        targets = list()
+        for my_x, my_y in self.__selection_list:
             if my_x > mid_x:
                 new_x = min_x + (max_x - my_x)
             else:
                 new_x = max_x - (my_x - min_x)
-            new_pos = Point(new_x, my_y)
-            new_dict[new_pos] = ALL_ENTITIES[self._grid[point]].flip_h()
+            targets.append(pack((new_x, my_y)))
+        # Only the cells selected and the ones they go to change
+        self.__changing_all(selected.union(targets))
+        for point, new_pos in zip(self.__selection_list, targets):
+            new_dict[new_pos] = ENTITY_FLIPS_H[self._grid[pack(point)]]
             self.delete(point)
         for pos, entity in self._grid.viewitems():
-            if pos not in new_dict and pos not in self.__selection_list:
+            if pos not in new_dict and pos not in selected:
                 new_dict[pos] = entity
         self._grid.clear()
         self._grid.update(new_dict)
+        self.__changed_all()
         self.__update_selection()
 
     def flip_v(self):
@@ -315,20 +645,25 @@ class CellularGrid(object):
         min_y = min(self.__all_selection)[1]
         mid_y = (max_y - min_y) / 2
         new_dict = BaseGrid(int)
-        for point in self.__selection_list:
-            my_x, my_y = point
+        targets = list()
+        for my_x, my_y in self.__selection_list:
             if my_y > mid_y:
                 new_y = min_y + (max_y - my_y)
             else:
                 new_y = max_y - (my_y - min_y)
-            new_pos = Point(my_x, new_y)
-            new_dict[new_pos] = ALL_ENTITIES[self._grid[point]].flip_v()
+            targets.append(pack((my_x, new_y)))
+        # Only the cells selected and the ones they go to change
+        self.__changing_all(
+            [pack(point) for point in self.__selection_list] + targets)
+        for point, new_pos in zip(self.__selection_list, targets):
+            new_dict[new_pos] = ENTITY_FLIPS_V[self._grid[pack(point)]]
             self.delete(point)
         for pos, entity in self._grid.viewitems():
             if pos not in new_dict:
                 new_dict[pos] = entity
         self._grid.clear()
         self._grid.update(new_dict)
+        self.__changed_all()
         self.__update_selection()
 
     ##
@@ -365,7 +700,6 @@ class CellularGrid(object):
             else:
                 return
         self._grid_sel = new_dict
-        self.__all_selection = list()
         for point in self.__all_selection:
             new_all.append(Point(point.x - x, point.y - y))
         self.__all_selection = new_all
@@ -389,11 +723,11 @@ class CellularGrid(object):
             new_dict[new_pos] = self._links[pos]
         self._links.clear()
         self._links = new_dict
-        new_dict = BaseGrid(int)
-        for pos, entity_t in self._grid.viewitems():
-            new_pos = Point(pos.x - x, pos.y - y)
-            new_dict[new_pos] = entity_t
-        self._grid = new_dict
+        if self._changes is not None:
+            # The history keeps the move, not the cells
+            self._record_move(x, y)
+        self._grid.translate(-x, -y)
+        self.__changed_all()
         new_dict = BaseGrid(int)
         for pos, entity_t in self._grid_sel.viewitems():
             new_pos = Point(pos.x - x, pos.y - y)
@@ -409,7 +743,11 @@ class CellularGrid(object):
         for point in self.__selection_list:
             # DEBUG
             #debug("load_selection", ("dict point", self._grid[point]))
-            self._grid_sel[point] = self._grid.pop(point)
+            key = pack(point)
+            entity_t = self._grid[key]
+            self._grid_sel[point] = entity_t
+            # Like delete, so the history and the caches see the change
+            self.__write(key, entity_t, VOID)
 
     def store_selection(self):
         """Stores the clipboard entities on the grid
@@ -425,7 +763,7 @@ class CellularGrid(object):
             try:
                 entities_to_ins.append((point, self._grid_sel.pop(point)))
             except KeyError:
-                self.insert(point, VoidEntity().type)
+                self.insert(point, VOID)
         for point, entity_t in entities_to_ins:
             self.insert(point, entity_t)
         # self.update_neighbors()
@@ -458,23 +796,90 @@ class CellularGrid(object):
         sel_list_mylinks_app = self.__selected_my_links.append
         # Speedup append method
         sel_list_links_app = self.__selected_links.append
-        entities_points = [point for point, entity_t in self._grid.viewitems(
-        ) if entity_t != ENTITIES_NAMES["void"] and entity_t != ENTITIES_NAMES["deadcell"]]
+        selected = set(self.__selection_list)
+        entities_points = set()
+        if len(item_list) != 0:
+            dead_id = ENTITIES_NAMES["deadcell"]
+            entities_points = set(
+                pos for pos, entity_t in self.query_rect(
+                    min(x for x, _ in item_list), min(y for _, y in item_list),
+                    max(x for x, _ in item_list), max(y for _, y in item_list))
+                if entity_t != dead_id)
         # if len(self._grid_sel) == 0:
         # DEBUG
         #debug("select_entities", ("item_list", item_list))
         for point in item_list:
             # DEBUG
             #debug("select_entities", ("POINT IN SELECTION", point not in self.__selection_list))
-            if point in entities_points and point not in self.__selection_list:
+            if point in entities_points and point not in selected:
                 # DEBUG
                 #debug("select_entities", ("POINT IN SELECTION", point))
+                selected.add(point)
                 sel_list_app(point)
             elif point in self._my_links:
                 sel_list_mylinks_app(point)
             elif point in self._links:
                 sel_list_links_app(point)
 
+    def bounds(self, types=None):
+        """Returns (min_x, min_y, max_x, max_y) of the non void entities
+        of types, of all of them if None, or None if there are none
+
+        The boxes of each type are computed on the first call and then
+        grown by insert and delete in O(1). A delete on the border of a
+        box marks it, and the box shrinks on the next call.
+        """
+        void_id = ENTITIES_NAMES["void"]
+        if self.__extents is None:
+            self.__extents = Extents(
+                (pos, entity_t) for pos, entity_t in self._grid.viewitems()
+                if entity_t != void_id)
+        if self.__extents.stale():
+            self.__extents.shrink(self._grid.viewitems())
+        return self.__extents.box(types)
+
+    def population(self):
+        """Returns the number of non void entities
+
+        The array backends count them on their arrays. The dict storage
+        keeps the void entries of the deletes, so the entities are
+        counted on the first call and then kept by insert and delete.
+        """
+        if self.__backend != "dict":
+            return len(self._grid)
+        if self.__population is None:
+            void_id = ENTITIES_NAMES["void"]
+            self.__population = sum(1 for entity_t in self._grid.viewvalues()
+                                    if entity_t != void_id)
+        return self.__population
+
+    def query_rect(self, min_x, min_y, max_x, max_y, types=None):
+        """Returns the list of (pos, type) of the non void entities in the
+        rectangle between the two points, borders included
+
+        types is a collection of the entity types to return, all of them
+        if None. The positions come from a spatial index built on the
+        first query and then kept by insert and delete.
+        """
+        items = self.__query_keys(min_x, min_y, max_x, max_y)
+        if types is not None:
+            items = [(pos, entity_t) for pos, entity_t in items
+                     if entity_t in types]
+        return [(unpack(pos), entity_t) for pos, entity_t in items]
+
+    def __query_keys(self, min_x, min_y, max_x, max_y):
+        """Returns the list of (key, type) of the non void entities in the
+        rectangle, read from the spatial index
+        """
+        if self.__index is None:
+            void_id = ENTITIES_NAMES["void"]
+            self.__index = SpatialIndex(
+                pos for pos, entity_t in self._grid.viewitems()
+                if entity_t != void_id)
+        grid = self._grid
+        return [(pos, grid[pos]) for pos in
+                self.__index.query(min_x, min_y, max_x, max_y)]
+
     ##
     # Get section -------------------------------------------------------------
     def __getattr__(self, attr):
@@ -482,28 +887,67 @@ class CellularGrid(object):
             return self.__filename
         elif attr == "speed":
             return self.__speed
+        elif attr == "rule":
+            return self.__rule.string
+        elif attr == "backend":
+            return self.__backend
+        elif attr == "engine":
+            return self.__engine
+        elif attr == "generation":
+            return self.__generations
 
     def __getitem__(self, pos):
-        """Access to the grid like a container (readonly)
+        """Access to the grid like a container (readonly), by the Point
+        or the tuple (x, y) of the position
+        """
+        if not isinstance(pos, tuple):
+            raise TypeError("The grid is read by (x, y), not %r: cell() "
+                            "reads it by key" % (pos,))
+        return self._grid[pack(pos)]
+
+    def cell(self, key):
+        """Returns the type of the entity at the key of a position, it is
+        what the entities read
         """
-        return self._grid[pos]
+        return self._grid[key]
 
     def get_entities_to_copy(self):
         """Return a list of (pos, type) for each entity selected
         """
-        return [(pos, self._grid[pos]) for pos in self.__selection_list]
+        return [(pos, self._grid[pack(pos)]) for pos in self.__selection_list]
 
-    def get_entities(self):
+    def get_entities(self, area=None):
         """Generates a list of non void entities and their position
+
+        area = (min_x, min_y, max_x, max_y) gives only the entities in
+        that rectangle. The chunked backend reads only the chunks in it,
+        the others the buckets of the spatial index of query_rect().
         """
-        for position, entity_t in self._grid.viewitems():
+        if area is None:
+            items = self._grid.viewitems()
+        elif self.__backend == "chunked":
+            items = self._grid.items_in(*area)
+        else:
+            items = self.__query_keys(*area)
+        for position, entity_t in items:
             if entity_t != ENTITIES_NAMES["void"]:
-                yield (position, entity_t)
+                yield (unpack(position), entity_t)
 
-        for position, entity_t in self._grid_sel.viewitems():
+        items = self._grid_sel.viewitems()
+        if area is not None:
+            items = self.__items_in(self._grid_sel, area)
+        for position, entity_t in items:
             if entity_t != ENTITIES_NAMES["void"]:
                 yield (position, entity_t)
 
+    @staticmethod
+    def __items_in(grid, area):
+        """Returns the items of grid in the rectangle area
+        """
+        min_x, min_y, max_x, max_y = area
+        return [(pos, entity_t) for pos, entity_t in grid.viewitems()
+                if min_x <= pos[0] <= max_x and min_y <= pos[1] <= max_y]
+
     def get_selection_entities_points(self):
         """Return a list of points for non void entities
         """
@@ -514,128 +958,693 @@ class CellularGrid(object):
     def update(self):
         """Updates the entities on the grid with their specific actions
         """
-        self.__step += 1
+        self.__generation()
+        self.__update_selection()
+
+    def run(self, steps, sample_every=None, callback=None,
+            skip_cycles=False):
+        """Advances the grid of steps generations in a tight loop
+
+        The selection is updated only at the end and the links are read
+        once. If sample_every is given, callback(generation, grid) is
+        called every sample_every generations, and the run stops if it
+        returns False. With skip_cycles and detect_cycles() active, when
+        the state repeats the whole periods left are skipped, only
+        moving the generation counter. Returns the number of generations
+        done.
+        """
+        links = self.__split_links()
+        done = 0
+        while done < steps:
+            self.__generation(links)
+            done += 1
+            if skip_cycles and self.__cycle is not None:
+                period = self.__cycle[1]
+                skip = (steps - done) // period * period
+                done += skip
+                self.__generations += skip
+            if sample_every and callback is not None and\
+                    done % sample_every == 0:
+                if callback(done, self) is False:
+                    break
+        self.__update_selection()
+        return done
+
+    def __split_links(self):
+        """Returns the lists of the IN and OUT links as (key, id, key on
+        the linked grid)
+        """
+        in_id = LINK_TYPE_NAMES["IN"]
+        out_id = LINK_TYPE_NAMES["OUT"]
+        in_links = list()
+        out_links = list()
+        for pos, (type_, id_, id_pos) in self._links.viewitems():
+            if type_ == in_id:
+                in_links.append((pack(pos), id_, pack(id_pos)))
+            elif type_ == out_id:
+                out_links.append((pack(pos), id_, pack(id_pos)))
+        return in_links, out_links
+
+    def __generation(self, links=None):
+        """Does a generation of the grid and of its linked grids, without
+        updating the selection
+        """
+        self.__simulating = True
+        self.__generations += 1
+        in_links, out_links = links or self.__split_links()
 
         # LINK UPDATE ----- count_step
         #self._links[pos] = (LINK_TYPE_NAMES["OUT"], id_, id_pos)
         # Check links IN
-        in_id = LINK_TYPE_NAMES["IN"]
-        for pos, data in self._links.viewitems():
-            type_, id_, id_pos = data
-            if type_ == in_id:
-                self._linked_grids[id_].insert(id_pos, self._grid[pos])
+        for pos, id_, id_pos in in_links:
+            self._linked_grids[id_].__insert(id_pos, self._grid[pos])
 
         # Steps of linked grids
         for grid in self._linked_grids.viewvalues():
-            if self.speed == grid.speed:
-                grid.update()
-            elif self.speed < grid.speed:
-                step = float(self.speed) / float(grid.speed)
-                cond = step
-                while cond <= float(self.speed):
-                    # DEBUG
-                    #debug("UPDATE sub ===")
-                    grid.update()
-                    cond += step
-            # self.speed > grid.speed:
-            elif self.speed == grid.speed + self.__step:
-                    # DEBUG
-                    #debug("UPDATE sub")
-                grid.update()
+            counts = schedule(grid.speed / self.__speed,
+                              self.__generations - 1)
+            for _ in range(counts):
+                # DEBUG
+                #debug("UPDATE sub ===")
+                grid.__generation()
 
         # Step of the grid
         # DEBUG
         #debug("=== UPDATE" + self.filename)
-        void_id = ENTITIES_NAMES['void']
-        for pos, entity_t in self._grid.items():
-            if entity_t != void_id:
-                ALL_ENTITIES[entity_t].step(self, pos)
+        # The array backends update all the cells at once when they
+        # contain only entities they know
+        if self.__backend != "dict":
+            self.__changing_all()
+        if self.__backend != "dict" and self._grid.step(self.__rule):
+            self.__changed_all()
+        else:
+            freezer = self.__freezer
+            if freezer is None:
+                self.__step_cells(self.__active_cells(), self)
+            else:
+                if freezer.stale:
+                    freezer.reset(self._grid.viewitems())
+                self.__step_cells(freezer.split(self.__active_cells()), self)
 
         # DEBUG
         #debug("update", ("id", id(self)), ("list", self.__actions))
-        for pos in self.__actions['del']:
-            self.delete(pos)
+        dels, inss = self.__actions.resolve()
+        for pos in dels:
+            self.__delete(pos)
 
-        for pos, type_ in self.__actions['ins']:
-            self.insert(pos, type_)
+        for pos, type_ in inss:
+            self.__insert(pos, type_)
 
-        if self.__step == self.speed - 1:
-            self.__step = -1
+        if self.__freezer is not None and not self.__freezer.stale:
+            self.__write_frozen(self.__freezer.phases())
+            # The links write what the freezer can't know
+            self.__freezer.thaw_cells(pos for pos, _, _ in out_links)
 
         # Update link out
-        out_id = LINK_TYPE_NAMES["OUT"]
-        for pos, data in self._links.viewitems():
-            type_, id_, id_pos = data
-            if type_ == out_id:
-                self.insert(pos, self._linked_grids[id_][id_pos])
+        for pos, id_, id_pos in out_links:
+            self.__insert(pos, self._linked_grids[id_].cell(id_pos))
+
+        self.__actions.clear()
+        if self.__voids > COMPACT_VOIDS and self.__voids * 2 > len(self._grid):
+            self.compact()
+        self.__simulating = False
+        if self.__freezer is not None and not self.__freezer.stale:
+            self.__freezer.end_generation(self.__generations)
+        if self.__states is not None and self.__cycle is None:
+            self.__record_state()
 
+    ##
+    # Cycles section ----------------------------------------------------------
+    def state_hash(self):
+        """Returns the hash of the state of the grid and of its linked
+        grids
+
+        The hash of the entities is kept by insert and delete, with a
+        Zobrist key for each change. It is computed again only after the
+        changes of many cells at once.
+        """
+        if self.__hash is None:
+            self.__hash = items_hash(self._grid.viewitems())
+        state = self.__hash
+        # The phase in the schedule of the linked grids is part of the state
+        for id_, grid in self._linked_grids.viewitems():
+            phase = self.__generations %\
+                (grid.speed / self.__speed).denominator
+            state ^= mix(grid.state_hash() ^ mix(id_) ^ mix(phase + 1))
+        return state
+
+    def detect_cycles(self, size=CYCLE_STATES):
+        """Remembers the hashes of the last size states after each
+        generation, to find when the grid repeats a state
+
+        A size of 0 stops the detection. The states are forgotten when
+        the grid is edited.
+        """
+        self.__states_size = size
+        self.__reset_states()
+        if not size:
+            self.__hash = None
+
+    def cycle(self):
+        """Returns (pre-period, period) of the cycle found, or None
+
+        The pre-period is counted from the first state remembered.
+        """
+        return self.__cycle
+
+    def __reset_states(self):
+        """Forgets the states remembered and the cycle found
+        """
+        self.__states = OrderedDict() if self.__states_size else None
+        self.__cycle = None
+
+    def __record_state(self):
+        """Remembers the current state or finds the cycle it closes
+        """
+        state = self.state_hash()
+        if len(self.__states) == 0:
+            self.__states_start = self.__generations
+        first = self.__states.get(state)
+        if first is not None:
+            self.__cycle = (first - self.__states_start,
+                            self.__generations - first)
+            return
+        self.__states[state] = self.__generations
+        if len(self.__states) > self.__states_size:
+            self.__states.popitem(last=False)
+
+    def __step_cells(self, cells, grid):
+        """Steps the cells (pos, type), grid is given to the entities
+
+        The life cells read their number of living neighbors from the
+        counts kept by insert and delete, with a single lookup instead
+        of eight reads, and follow the tables of the rule. The table
+        engine is used only with B3/S23, the rule of its transition
+        tables. The entities with a batch kernel are gathered by type
+        and stepped at the end, with a call for each type.
+        """
+        batches = defaultdict(list)
+        if self.__engine == "table" and self.__rule.default:
+            def fallback(pos, entity_t):
+                if entity_t in BATCH_TYPES:
+                    batches[entity_t].append(pos)
+                else:
+                    ALL_ENTITIES[entity_t].step(grid, pos)
+            step_cells(cells, self._grid.get, grid.insert_action, fallback)
+        else:
+            if self.__neighbors is None:
+                self.__count_neighbors()
+            neighbors = self.__neighbors
+            births, survivals = self.__rule.births, self.__rule.survivals
+            batch_types = BATCH_TYPES
+            for pos, entity_t in cells:
+                if entity_t == LIVING:
+                    if not survivals[neighbors.get(pos, 0)]:
+                        grid.insert_action(("del", pos))
+                elif entity_t == DEAD:
+                    if births[neighbors.get(pos, 0)]:
+                        grid.insert_action(("ins", (pos, LIVING)))
+                elif entity_t in batch_types:
+                    batches[entity_t].append(pos)
+                elif entity_t != VOID:
+                    ALL_ENTITIES[entity_t].step(grid, pos)
+        for entity_t, positions in batches.items():
+            self.__step_batch(entity_t, positions, grid)
+
+    def __step_batch(self, entity_t, positions, grid):
+        """Steps with the kernel of their type the entities in positions,
+        a list of keys: the kernel works on the (x, y) arrays
+        """
+        entity = ALL_ENTITIES[entity_t]
+        deletes, inserts = entity.step_all(
+            positions_array(positions),
+            self._grid.gather(positions, entity.reads))
+        deletes = np.asarray(deletes, dtype=np.int64).reshape(-1, 2)
+        for pos in keys_list(deletes[:, 0], deletes[:, 1]):
+            grid.insert_action(("del", pos))
+        inserts = np.asarray(inserts, dtype=np.int64).reshape(-1, 3)
+        for pos, type_ in zip(keys_list(inserts[:, 0], inserts[:, 1]),
+                              inserts[:, 2].tolist()):
+            grid.insert_action(("ins", (pos, type_)))
+
+    def __count_neighbors(self):
+        """Counts the living neighbors of every cell
+        """
+        self.__neighbors = dict()
+        for pos, entity_t in self._grid.viewitems():
+            if entity_t == LIVING:
+                self.__add_neighbor(pos, 1)
+
+    def __add_neighbor(self, pos, dif):
+        """Adds dif to the count of the neighbors of pos
+        """
+        neighbors = self.__neighbors
+        for offset in NEIGHBORS:
+            near = pos + offset
+            count = neighbors.get(near, 0) + dif
+            if count:
+                neighbors[near] = count
+            else:
+                del neighbors[near]
+
+    def __active_cells(self):
+        """Returns the cells that can change in this step and resets the
+        positions written
+
+        Every entity reads only its Moore neighborhood, so a cell can
+        change only if something near it was written in the last step.
+        """
+        dirty = self.__dirty
+        self.__dirty = set()
+        if self.__freezer is not None:
+            woken = self.__freezer.woken()
+            if dirty is not None:
+                dirty.update(woken)
+        if dirty is None:
+            return self._grid.items()
+        void_id = ENTITIES_NAMES['void']
+        active = set()
+        for pos in dirty:
+            for offset in MOORE_KEYS:
+                active.add(pos + offset)
+        get = self._grid.get
+        return [(pos, get(pos, void_id)) for pos in active]
+
+    ##
+    # Freezing section --------------------------------------------------------
+    def freeze_regions(self, enabled=True):
+        """Enables, or disables, the freezing of the periodic regions
+
+        The grid is split in tiles and a tile that repeats with a short
+        period, with the cells around it, isn't stepped anymore: the
+        changes of its cells are recorded for one period and written
+        again phase by phase, skipping the actions, until something near
+        it leaves the phase. Still tiles already cost nothing, the gain
+        is on the oscillators. The array backends use it only when they
+        update the cells one by one.
+        """
+        if not enabled:
+            self.__freezer = None
+        elif self.__freezer is None:
+            self.__freezer = RegionFreezer(self._grid.viewitems())
+
+    def frozen_tiles(self):
+        """Returns the frozen tiles as (tile_x, tile_y), a tile has the
+        cells from (tile_x * TILE, tile_y * TILE)
+        """
+        if self.__freezer is None:
+            return list()
+        return self.__freezer.frozen_tiles()
+
+    def __write_frozen(self, phases):
+        """Writes the changes of the phases of the frozen tiles, see
+        RegionFreezer.phases
+
+        A cell is written directly on the storage, with only the
+        structures that are kept, when it has its entity before the
+        phase. The cells already written by the actions of the cells
+        around the tiles are left as they are.
+        """
+        grid = self._grid
+        get = grid.get
+        hashes = self.__freezer.hashes
+        changes = self._changes
+        dirty = self.__dirty
+        extents = self.__index is not None or self.__extents is not None
+        if dirty is None:
+            # Every cell is stepped
+            phases = [(phase, False) for phase, _ in phases]
+        for phase, mark in phases:
+            for pos, before, after, delta, tiles, border in phase:
+                current = get(pos, VOID)
+                if current == after:
+                    continue
+                if current != before:
+                    self.__write(pos, current, after)
+                    continue
+                grid[pos] = after
+                for key in tiles:
+                    hashes[key] ^= delta
+                if changes is not None:
+                    changes.setdefault(pos, before)
+                if mark and border:
+                    dirty.add(pos)
+                if self.__hash is not None:
+                    self.__hash ^= zobrist(pos, before) ^ zobrist(pos, after)
+                if after == VOID:
+                    self.__voids += 1
+                    if self.__population is not None:
+                        self.__population -= 1
+                elif before == VOID and self.__population is not None:
+                    self.__population += 1
+                if self.__neighbors is not None:
+                    if after == LIVING:
+                        self.__add_neighbor(pos, 1)
+                    elif before == LIVING:
+                        self.__add_neighbor(pos, -1)
+                if extents:
+                    self.__write_extents(pos, before, after)
+
+    def run_1d(self, generations, rule=None):
+        """Advances a 1D automaton of generations rows
+
+        The rows are made by ca_wolfram, one vectorized operation per
+        row, and written in the grid in bulk. rule is a Wolfram rule
+        number, without it the rows are the ones of MonoOne and MonoZero.
+        The grid can have only mono entities, no links and one row that
+        can grow, the last one; other grids are advanced with run() if
+        no rule is given.
+        """
+        if generations <= 0:
+            return
+        void_id = ENTITIES_NAMES['void']
+        cells = set()
+        for pos, entity_t in self._grid.viewitems():
+            if entity_t == void_id:
+                continue
+            if entity_t not in ENTITY_CODES:
+                cells = None
+                break
+            cells.add(coordinates(pos))
+        if cells and len(self._links) == 0 and len(self._linked_grids) == 0:
+            last_y = max(y for _, y in cells)
+            row = sorted(x for x, y in cells if y == last_y)
+            # The other rows can't grow if they have something under them
+            if all((x, y + 1) in cells for x, y in cells if y != last_y):
+                codes = [ENTITY_CODES[self._grid[pack((x, last_y))]]
+                         for x in range(row[0], row[-1] + 1)]
+
+                rows = list()
+
+                def write(generation, row_codes, start):
+                    # Only the arrays of the cells, written all at the end
+                    columns = np.nonzero(row_codes)[0]
+                    rows.append((columns + (row[0] - start),
+                                 np.full(len(columns), last_y + generation,
+                                         dtype=np.int64),
+                                 row_codes[columns]))
+
+                self.__changing_all()
+                evolve(codes, generations, rule, write)
+                self.__write_rows(*[np.concatenate(arrays)
+                                    for arrays in zip(*rows)])
+                self.__simulating = True
+                self.__changed_all()
+                self.__simulating = False
+                self.__generations += generations
+                self.__update_selection()
+                return
+        if rule is not None:
+            raise ValueError("A rule needs a grid with only a growing row "
+                             "of mono entities and without links")
+        self.run(generations)
+
+    def __write_rows(self, x, y, row_codes):
+        """Writes on the storage the cells of the rows of run_1d, given
+        by the arrays of their coordinates and codes
+        """
+        types = np.take(np.array(CODE_ENTITIES, dtype=np.uint8), row_codes)
+        insert_all = getattr(self._grid, "insert_all", None)
+        if insert_all is None:
+            self._grid.update(dict(zip(keys_list(x, y), types.tolist())))
+            return
+        for type_ in np.unique(types).tolist():
+            mask = types == type_
+            insert_all(keys_list(x[mask], y[mask]), type_)
+
+    def advance(self, generations):
+        """Advances the grid of generations steps
+
+        A grid with only life cells, without links and with a rule
+        without B0 is advanced with HashLife, in jumps of 2**j
+        generations. The entities are rebuilt only when the grid is used
+        again.
+        """
+        if generations <= 0:
+            return
+        if self.__hashlife_base is None:
+            if len(self._links) != 0 or len(self._linked_grids) != 0 or\
+                    self.__rule.births[0] or\
+                    any(entity_t not in LIFE_TYPES
+                        for _, entity_t in self._grid.viewitems()):
+                self.run(generations)
+                return
+            self.__changing_all()
+            # The universe is kept to reuse the results already computed
+            if self.__hashlife is None or self.__hashlife.rule != self.__rule:
+                self.__hashlife = HashLife(rule=self.__rule)
+            living_id = ENTITIES_NAMES['livingcell']
+            self.__hashlife.clear()
+            self.__hashlife.set_cells(
+                coordinates(pos) for pos, entity_t in self._grid.viewitems()
+                if entity_t == living_id)
+            self.__hashlife_base = self._grid
+            # The positions written and the structures kept follow the
+            # entities before the jump, like after __build_from_hashlife
+            simulating, self.__simulating = self.__simulating, True
+            self.__changed_all()
+            self.__simulating = simulating
+            self._grid = PendingGrid(self.__build_from_hashlife)
+        self.__hashlife.advance(generations)
+        self.__generations += generations
         self.__update_selection()
-        del self.__actions['del'][:]
-        del self.__actions['ins'][:]
+
+    def __build_from_hashlife(self):
+        """Returns the entities of the HashLife universe as grid storage
+
+        The living cells are exact. The dead cells are the ones of the
+        grid before advance() and the halo of the living cells, while
+        the per cell update would keep also the halo of the cells
+        living in the generations skipped.
+        """
+        if self.__hashlife_base is None:
+            return self._grid
+        grid = self.__hashlife_base
+        self.__hashlife_base = None
+        living_id = ENTITIES_NAMES['livingcell']
+        dead_id = ENTITIES_NAMES['deadcell']
+        for pos, entity_t in grid.items():
+            if entity_t == living_id:
+                grid[pos] = dead_id
+        living = [pack(pos) for pos in self.__hashlife.cells()]
+        for pos in living:
+            grid[pos] = living_id
+        for key in living:
+            for offset in MOORE_KEYS:
+                pos = key + offset
+                if grid[pos] != living_id:
+                    grid[pos] = dead_id
+        self._grid = grid
+        # Not an edit, the states remembered are still valid
+        simulating, self.__simulating = self.__simulating, True
+        self.__changed_all()
+        self.__simulating = simulating
+        return grid
 
     def insert_action(self, action):
         """Inserts an action that will be processed by the grid
-        action = tuple(command, position)
+        action = tuple(command, key of the position)
         """
-        com, pos = action
-        if com in self.__actions:
-            if pos not in self.__actions[com]:
-                self.__actions[com].append(pos)
+        self.__actions.add(action)
+
+    def set_action_policy(self, policy, priorities=None):
+        """Sets how the conflicts between the actions queued on the same
+        cell are solved, see ActionBuffer: "ordered" (default),
+        "insert", "delete" or "priority", with priorities
+        {type or None for the delete: number}
+        """
+        self.__actions.set_policy(policy, priorities)
 
     def insert(self, pos, type_):
         """Inserts an entity on the grid
         """
         # DEBUG
         #debug("insert", ("pos", pos), ("type", type_))
-        entity_t = None
-        if self._grid[pos] != type_:
-            entity_t = ALL_ENTITIES[type_].type
-        else:
-            return  # Entity already exist
-        self._grid[pos] = entity_t
-        if ALL_ENTITIES[entity_t].neighborhood is not None:
-            if ALL_ENTITIES[entity_t].neighborhood == NEIGHBORHOOD_TYPES["moore"]:
-                x, y = pos
-                for new_x in range(x - 1, x + 2):
-                    for new_y in range(y - 1, y + 2):
-                        pos = Point(new_x, new_y)
-                        if self._grid[pos] != entity_t:
-                            self._grid[pos] = ALL_ENTITIES[entity_t].neighbors
-            elif ALL_ENTITIES[entity_t].neighborhood == NEIGHBORHOOD_TYPES["1D"]:
-                x, y = pos
-                for new_x in range(-1, 2, 2):
-                    pos = Point(x + new_x, y)
-                    if self._grid[pos] != entity_t:
-                        self._grid[pos] = ALL_ENTITIES[entity_t].neighbors
+        self.__insert(pack(pos), type_)
 
     def delete(self, pos):
         """Deletes an entity from the grid
         """
+        self.__delete(pack(pos))
+
+    def __insert(self, pos, type_):
+        """Inserts an entity on the grid by the key of its position
+        """
+        old_t = self._grid[pos]
+        if old_t == type_:
+            return  # Entity already exist
+        entity_t = ENTITY_TYPES[type_]
+        if entity_t is None:
+            raise KeyError(type_)
+        self.__write(pos, old_t, entity_t)
+        neighborhood = ENTITY_NEIGHBORHOODS[entity_t]
+        if neighborhood is not None:
+            halo = ENTITY_HALOS[entity_t]
+            # In a generation the sparks on the grid are the ones just
+            # inserted: the halo doesn't cover them, whatever the order
+            # of the inserts (the array backends put the sparks last)
+            simulating = self.__simulating
+            key = pos
+            for offset in NEIGHBORHOOD_KEYS[neighborhood]:
+                pos = key + offset
+                old_t = self._grid[pos]
+                if old_t != entity_t and (old_t != SPARK or not simulating):
+                    self.__write(pos, old_t, halo)
+
+    def __insert_all(self, keys, type_):
+        """Inserts the entities type_ on the cells of a list of keys,
+        like insert on each of them: the dense backends write them all
+        at once on the array
+        """
+        insert_all = getattr(self._grid, "insert_all", None)
+        if insert_all is None or len(keys) < BULK_CELLS:
+            for pos in keys:
+                self.__insert(pos, type_)
+            return
+        entity_t = ENTITY_TYPES[type_]
+        if entity_t is None:
+            raise KeyError(type_)
+        neighborhood = ENTITY_NEIGHBORHOODS[entity_t]
+        self.__changing_all()
+        if neighborhood is None:
+            insert_all(keys, entity_t)
+        else:
+            insert_all(keys, entity_t, ENTITY_HALOS[entity_t],
+                       NEIGHBORHOOD_OFFSETS[neighborhood])
+        self.__changed_all()
+
+    def __delete(self, pos):
+        """Deletes an entity from the grid by the key of its position
+        """
         # DEBUG
         #debug("delete", ("Delete", pos))
         if pos in self._grid:
             temp_type = self._grid.pop(pos)
-            if temp_type == ENTITIES_NAMES["livingcell"]:
-                self._grid[pos] = ALL_ENTITIES[ENTITIES_NAMES['deadcell']].type
+            if temp_type == LIVING:
+                self.__write(pos, temp_type, DEAD)
             else:
-                self._grid[pos] = VoidEntity().type
+                self.__write(pos, temp_type, VOID)
             del temp_type
             # DEBUG
             # debug("DELETE!!!")
             #debug("delete", ("void", VoidEntity().type), ("entity", self._grid[pos].type))
             # debug("DELETE!!!")
 
+    def _write_cells(self, cells):
+        """Writes the entities of a dict {key: type}, without the
+        neighbors that insert writes around them
+        """
+        void_id = ENTITIES_NAMES['void']
+        for pos, type_ in cells.viewitems():
+            old_t = self._grid.get(pos, void_id)
+            if old_t != type_:
+                self.__write(pos, old_t, type_)
+
+    def __write(self, pos, old_t, type_):
+        """Writes an entity on the storage, keeping track of the change
+        """
+        self._grid[pos] = type_
+        if type_ == VOID:
+            self.__voids += 1
+        if self.__neighbors is not None and old_t != type_:
+            if type_ == LIVING:
+                self.__add_neighbor(pos, 1)
+            elif old_t == LIVING:
+                self.__add_neighbor(pos, -1)
+        if self._changes is not None:
+            self._changes.setdefault(pos, old_t)
+        if self.__dirty is not None:
+            self.__dirty.add(pos)
+        if self.__hash is not None:
+            self.__hash ^= zobrist(pos, old_t) ^ zobrist(pos, type_)
+        if self.__population is not None and old_t != type_:
+            if old_t == VOID:
+                self.__population += 1
+            elif type_ == VOID:
+                self.__population -= 1
+        if old_t != type_ and (self.__index is not None or
+                               self.__extents is not None):
+            self.__write_extents(pos, old_t, type_)
+        if self.__freezer is not None and old_t != type_:
+            if self.__simulating:
+                self.__freezer.writes.append((pos, old_t, type_))
+            else:
+                self.__freezer.edited(pos, old_t, type_)
+        if not self.__simulating and self.__states:
+            self.__reset_states()
+
+    def __write_extents(self, pos, old_t, type_):
+        """Updates the spatial index and the bounding boxes for a change
+        """
+        void_id = ENTITIES_NAMES['void']
+        if self.__index is not None:
+            if type_ == void_id:
+                self.__index.discard(pos)
+            elif old_t == void_id:
+                self.__index.add(pos)
+        if self.__extents is not None:
+            if old_t != void_id:
+                self.__extents.discard(pos, old_t)
+            if type_ != void_id:
+                self.__extents.add(pos, type_)
+
+    def __changing_all(self, positions=None):
+        """Remembers for the history the entities of positions, or of
+        the whole grid, before they are changed without insert and delete
+        """
+        if self._changes is None:
+            return
+        if positions is None:
+            for pos, entity_t in self._grid.viewitems():
+                self._changes.setdefault(pos, entity_t)
+            self._changes_all = True
+        else:
+            void_id = ENTITIES_NAMES['void']
+            for pos in positions:
+                self._changes.setdefault(pos, self._grid.get(pos, void_id))
+
+    def __changed_all(self):
+        """Marks all the entities as changed
+        """
+        if self._changes_all:
+            # The positions recorded by __changing_all are all the ones
+            # that had an entity, the others were void before the change
+            void_id = ENTITIES_NAMES['void']
+            for pos in self._grid.viewkeys():
+                self._changes.setdefault(pos, void_id)
+        self.__dirty = None
+        self.__hash = None
+        self.__index = None
+        self.__extents = None
+        self.__neighbors = None
+        self.__population = None
+        if self.__freezer is not None:
+            self.__freezer.invalidate()
+        if not self.__simulating and self.__states:
+            self.__reset_states()
+
+    def compact(self):
+        """Deletes the void entries of the dict storage, that deletes
+        leave behind. It is done after a generation when they can be
+        more than COMPACT_VOIDS and half of the storage.
+        """
+        self.__voids = 0
+        if self.__backend == "dict":
+            self._grid.compact()
+
     def clear(self):
         """Clears the current grid
         """
+        self.__changing_all()
         self._grid.clear()
+        self.__changed_all()
 
     def clear_sparks(self):
         """Deletes all sparks on the grid
         """
         for pos, entity_t in self._grid.viewitems():
             if entity_t == ENTITIES_NAMES["spark"]:
-                self.delete(pos)
+                self.__delete(pos)
 
     ##
     # Marshalling section -----------------------------------------------------
@@ -643,7 +1652,9 @@ class CellularGrid(object):
         """Saves into a file the current grid
         """
         store_dict = dict()
-        for point, entity_t in self._grid.viewitems():
+        store_dict["rule"] = self.__rule.string
+        for pos, entity_t in self._grid.viewitems():
+            point = coordinates(pos)
             try:
                 store_dict[ENTITIES_IDS[entity_t]].append(point)
             except KeyError:
@@ -683,6 +1694,8 @@ class CellularGrid(object):
         with open(filename, "r") as fp:
             stored_dict = json.load(fp)
 
+        # The files without a rule are of the Game of Life
+        self.set_rule(stored_dict.get("rule", CONWAY.string))
         for type_, list_ in stored_dict.viewitems():
             if type_ == "my_links":
                 for sub_type, sub_list in list_.viewitems():
@@ -702,7 +1715,9 @@ class CellularGrid(object):
                     type_, id_, id_pos = data
                     id_pos = Point(id_pos[0], id_pos[1])
                     if id_ not in added:
-                        new_grid = CellularGrid()
+                        new_grid = CellularGrid(
+                            backend=self.__backend, engine=self.__engine,
+                            workers=self.__workers)
                         new_grid.load(
                             path.join(base_path, stored_dict["linked_names"][str(id_)]))
                         added[id_] = id(new_grid)
@@ -712,6 +1727,5 @@ class CellularGrid(object):
                     self._linked_grids[added[id_]] = grids_container[id_]
                     self._links[pos] = (type_, added[id_], id_pos)
             elif type_ in ENTITIES_NAMES:
-                for pos in list_:
-                    pos = Point(pos[0], pos[1])
-                    self.insert(pos, ENTITIES_NAMES[type_])
+                self.__insert_all([pack(pos) for pos in list_],
+                                  ENTITIES_NAMES[type_])
@@ -0,0 +1,52 @@
+import numpy as np
+
+MASK = 0xFFFFFFFFFFFFFFFF
+GOLDEN = 0x9E3779B97F4A7C15
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+
+
+def mix(value):
+    """Returns the 64 bit value mixed by the splitmix64 finalizer
+    """
+    value = ((value ^ (value >> 30)) * MIX_1) & MASK
+    value = ((value ^ (value >> 27)) * MIX_2) & MASK
+    return value ^ (value >> 31)
+
+
+def zobrist(key, type_):
+    """Returns the Zobrist key of an entity in the cell with key (see
+    utils.pack)
+
+    The keys are computed instead of stored, so they exist for every
+    cell. The void has key 0, so it can't change a hash.
+    """
+    if type_ == 0:
+        return 0
+    return mix(mix(key & MASK) ^ ((type_ * GOLDEN) & MASK))
+
+
+def mix_array(value):
+    """mix on an array of uint64
+    """
+    value = (value ^ (value >> np.uint64(30))) * np.uint64(MIX_1)
+    value = (value ^ (value >> np.uint64(27))) * np.uint64(MIX_2)
+    return value ^ (value >> np.uint64(31))
+
+
+def items_hash(items):
+    """Returns the xor of the Zobrist keys of the items (key, type)
+
+    The keys are computed with NumPy, 64 bit arithmetic wraps like the
+    masks of zobrist.
+    """
+    items = [(key, type_) for key, type_ in items if type_ != 0]
+    if len(items) == 0:
+        return 0
+    keys = np.fromiter((key for key, _ in items), dtype=np.uint64,
+                       count=len(items))
+    types = np.fromiter((type_ for _, type_ in items), dtype=np.uint64,
+                        count=len(items))
+    with np.errstate(over='ignore'):
+        keys = mix_array(mix_array(keys) ^ (types * np.uint64(GOLDEN)))
+    return int(np.bitwise_xor.reduce(keys))
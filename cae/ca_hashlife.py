@@ -0,0 +1,292 @@
+from .ca_base_entity import ENTITIES_NAMES
+from .ca_rules import CONWAY
+
+
+class Node(object):
+
+    """Quadtree node of level k (a square of 2**k cells)
+
+    a, b, c and d are the nw, ne, sw and se quadrants, n is the number
+    of living cells. Nodes are unique: build them only with
+    HashLife.join.
+    """
+
+    __slots__ = ('k', 'a', 'b', 'c', 'd', 'n')
+
+    def __init__(self, k, a, b, c, d, n):
+        self.k = k
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        self.n = n
+
+
+# Level 0 nodes
+ON = Node(0, None, None, None, None, 1)
+OFF = Node(0, None, None, None, None, 0)
+
+
+class HashLife(object):
+
+    """HashLife universe for the Game of Life, or another Life-like rule
+
+    The pattern is a hash-consed quadtree and the results of the nodes
+    are memoized, so advance() can jump 2**j generations in one call.
+    The root is always a square with the top left corner in origin.
+    The empty space has to stay empty, so rule can't have B0.
+    """
+
+    # Number of memoized results that triggers a cleaning of the cache
+    MAX_CACHE = 2 ** 20
+
+    def __init__(self, cells=(), rule=CONWAY):
+        if rule.births[0]:
+            raise ValueError("HashLife can't use the B0 rule %s" % (rule,))
+        self.rule = rule
+        self._nodes = dict()
+        self._results = dict()
+        self._zero = [OFF]
+        self.generation = 0
+        self.clear()
+        for x, y in cells:
+            self.set_cell(x, y)
+
+    ##
+    # Tree construction -------------------------------------------------------
+    def join(self, a, b, c, d):
+        """Returns the unique node with the given quadrants
+        """
+        key = (a, b, c, d)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Node(
+                a.k + 1, a, b, c, d, a.n + b.n + c.n + d.n)
+        return node
+
+    def zero(self, k):
+        """Returns the empty node of level k
+        """
+        while len(self._zero) <= k:
+            last = self._zero[-1]
+            self._zero.append(self.join(last, last, last, last))
+        return self._zero[k]
+
+    def centre(self, node):
+        """Returns the node of level k + 1 with node in the middle
+        """
+        zero = self.zero(node.k - 1)
+        return self.join(
+            self.join(zero, zero, zero, node.a),
+            self.join(zero, zero, node.b, zero),
+            self.join(zero, node.c, zero, zero),
+            self.join(node.d, zero, zero, zero))
+
+    def clear(self):
+        """Deletes all the living cells
+        """
+        self.root = self.zero(3)
+        self.origin = (-4, -4)
+
+    def set_cell(self, x, y):
+        """Sets the cell in (x, y) as living
+        """
+        while True:
+            o_x, o_y = self.origin
+            size = 1 << self.root.k
+            if o_x <= x < o_x + size and o_y <= y < o_y + size:
+                break
+            self.__expand()
+        self.root = self.__set(self.root, x - o_x, y - o_y)
+
+    def set_cells(self, cells):
+        """Sets as living all the cells (x, y) in cells
+
+        The tree of an empty universe is built level by level, that is
+        much faster than setting the cells one by one.
+        """
+        cells = list(cells)
+        if len(cells) == 0:
+            return
+        if self.root.n != 0:
+            for x, y in cells:
+                self.set_cell(x, y)
+            return
+        min_x = min(x for x, _ in cells)
+        min_y = min(y for _, y in cells)
+        size = max(max(x for x, _ in cells) - min_x,
+                   max(y for _, y in cells) - min_y) + 1
+        level = 3
+        while (1 << level) < size:
+            level += 1
+        nodes = dict(((x - min_x, y - min_y), ON) for x, y in cells)
+        for k in range(level):
+            zero = self.zero(k)
+            groups = dict()
+            for (x, y), node in nodes.items():
+                quadrants = groups.get((x >> 1, y >> 1))
+                if quadrants is None:
+                    quadrants = groups[(x >> 1, y >> 1)] = [zero] * 4
+                quadrants[(y & 1) * 2 + (x & 1)] = node
+            nodes = dict((pos, self.join(*quadrants))
+                         for pos, quadrants in groups.items())
+        self.root = nodes[(0, 0)]
+        self.origin = (min_x, min_y)
+
+    def __set(self, node, x, y):
+        if node.k == 0:
+            return ON
+        half = 1 << (node.k - 1)
+        a, b, c, d = node.a, node.b, node.c, node.d
+        if y < half:
+            if x < half:
+                a = self.__set(a, x, y)
+            else:
+                b = self.__set(b, x - half, y)
+        elif x < half:
+            c = self.__set(c, x, y - half)
+        else:
+            d = self.__set(d, x - half, y - half)
+        return self.join(a, b, c, d)
+
+    def __expand(self):
+        """Doubles the root keeping the pattern in the middle
+        """
+        half = 1 << (self.root.k - 1)
+        self.root = self.centre(self.root)
+        self.origin = (self.origin[0] - half, self.origin[1] - half)
+
+    def __padded(self):
+        """True if the pattern is in the inner quarter of the root
+        """
+        root = self.root
+        return root.k >= 3 and\
+            root.a.n == root.a.d.d.n and root.b.n == root.b.c.c.n and\
+            root.c.n == root.c.b.b.n and root.d.n == root.d.a.a.n
+
+    def __crop(self):
+        """Halves the root while the pattern stays in the inner quarter
+        """
+        while self.root.k > 3 and self.__padded():
+            root = self.root
+            quarter = 1 << (root.k - 2)
+            self.root = self.join(root.a.d, root.b.c, root.c.b, root.d.a)
+            self.origin = (self.origin[0] + quarter,
+                           self.origin[1] + quarter)
+
+    ##
+    # Evolution ---------------------------------------------------------------
+    def __life(self, cells):
+        """Next state of the center of a 3x3 list of level 0 nodes
+        """
+        around = sum(cell.n for cell in cells) - cells[4].n
+        if cells[4].n:
+            return ON if self.rule.survivals[around] else OFF
+        return ON if self.rule.births[around] else OFF
+
+    def __life_4x4(self, m):
+        """One generation of the center 2x2 of a level 2 node
+        """
+        a, b, c, d = m.a, m.b, m.c, m.d
+        return self.join(
+            self.__life([a.a, a.b, b.a, a.c, a.d, b.c, c.a, c.b, d.a]),
+            self.__life([a.b, b.a, b.b, a.d, b.c, b.d, c.b, d.a, d.b]),
+            self.__life([a.c, a.d, b.c, c.a, c.b, d.a, c.c, c.d, d.c]),
+            self.__life([a.d, b.c, b.d, c.b, d.a, d.b, c.d, d.c, d.d]))
+
+    def successor(self, m, j):
+        """Returns the center of m (level k - 1) after 2**j generations,
+        with j <= k - 2
+        """
+        if m.n == 0:
+            return m.a
+        key = (m, j)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+        if m.k == 2:
+            result = self.__life_4x4(m)
+        else:
+            join = self.join
+            a, b, c, d = m.a, m.b, m.c, m.d
+            # The nine overlapping sub-squares of level k - 1
+            c1 = self.successor(a, j)
+            c2 = self.successor(join(a.b, b.a, a.d, b.c), j)
+            c3 = self.successor(b, j)
+            c4 = self.successor(join(a.c, a.d, c.a, c.b), j)
+            c5 = self.successor(join(a.d, b.c, c.b, d.a), j)
+            c6 = self.successor(join(b.c, b.d, d.a, d.b), j)
+            c7 = self.successor(c, j)
+            c8 = self.successor(join(c.b, d.a, c.d, d.c), j)
+            c9 = self.successor(d, j)
+            if j < m.k - 2:
+                result = join(
+                    join(c1.d, c2.c, c4.b, c5.a),
+                    join(c2.d, c3.c, c5.b, c6.a),
+                    join(c4.d, c5.c, c7.b, c8.a),
+                    join(c5.d, c6.c, c8.b, c9.a))
+            else:
+                result = join(
+                    self.successor(join(c1, c2, c4, c5), j),
+                    self.successor(join(c2, c3, c5, c6), j),
+                    self.successor(join(c4, c5, c7, c8), j),
+                    self.successor(join(c5, c6, c8, c9), j))
+        if len(self._results) >= self.MAX_CACHE:
+            # Nodes already built keep working, but aren't shared anymore
+            self._results.clear()
+            self._nodes.clear()
+        self._results[key] = result
+        return result
+
+    def advance(self, generations):
+        """Advances the universe of generations steps
+        """
+        if generations <= 0:
+            return
+        while not self.__padded():
+            self.__expand()
+        bits = list()
+        while generations > 0:
+            bits.append(generations & 1)
+            generations >>= 1
+            self.__expand()
+        # Every successor halves the root, keeping the same center
+        for j in reversed(range(len(bits))):
+            if bits[j]:
+                quarter = 1 << (self.root.k - 2)
+                self.root = self.successor(self.root, j)
+                self.origin = (self.origin[0] + quarter,
+                               self.origin[1] + quarter)
+                self.generation += 1 << j
+        self.__crop()
+
+    ##
+    # Get section -------------------------------------------------------------
+    def population(self):
+        """Returns the number of living cells
+        """
+        return self.root.n
+
+    def cells(self):
+        """Returns the list of the positions (x, y) of the living cells
+        """
+        cells = list()
+        stack = [(self.root, self.origin[0], self.origin[1])]
+        while stack:
+            node, x, y = stack.pop()
+            if node.n == 0:
+                continue
+            if node.k == 0:
+                cells.append((x, y))
+                continue
+            half = 1 << (node.k - 1)
+            stack.append((node.a, x, y))
+            stack.append((node.b, x + half, y))
+            stack.append((node.c, x, y + half))
+            stack.append((node.d, x + half, y + half))
+        return cells
+
+
+# Entities that a grid can contain to be updated with HashLife
+LIFE_TYPES = frozenset([ENTITIES_NAMES['void'], ENTITIES_NAMES['livingcell'],
+                        ENTITIES_NAMES['deadcell']])
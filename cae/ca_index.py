@@ -0,0 +1,157 @@
+from .utils import coordinates
+
+# Side of a bucket of the index, in cells
+BUCKET = 32
+
+
+class SpatialIndex(object):
+
+    """Positions of the entities in square buckets of BUCKET cells
+
+    The buckets are sets in a dict with the bucket coordinates as keys,
+    the bucket (b_x, b_y) has the cells from (b_x * BUCKET, b_y * BUCKET).
+    The empty buckets are deleted, so a rectangle query reads only the
+    buckets that intersect it, or all of them when they are fewer. The
+    cells are given by their keys.
+    """
+
+    def __init__(self, positions=()):
+        self._buckets = dict()
+        for pos in positions:
+            self.add(pos)
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def add(self, pos):
+        x, y = coordinates(pos)
+        key = (x // BUCKET, y // BUCKET)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = set()
+        bucket.add(pos)
+
+    def discard(self, pos):
+        x, y = coordinates(pos)
+        key = (x // BUCKET, y // BUCKET)
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.discard(pos)
+            if len(bucket) == 0:
+                del self._buckets[key]
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """Returns the list of the keys of the cells in the rectangle
+        between the two points, borders included
+        """
+        b_min_x, b_max_x = min_x // BUCKET, max_x // BUCKET
+        b_min_y, b_max_y = min_y // BUCKET, max_y // BUCKET
+        if (b_max_x - b_min_x + 1) * (b_max_y - b_min_y + 1) <=\
+                len(self._buckets):
+            keys = [(b_x, b_y) for b_x in range(b_min_x, b_max_x + 1)
+                    for b_y in range(b_min_y, b_max_y + 1)
+                    if (b_x, b_y) in self._buckets]
+        else:
+            keys = [(b_x, b_y) for b_x, b_y in self._buckets
+                    if b_min_x <= b_x <= b_max_x and b_min_y <= b_y <= b_max_y]
+        positions = list()
+        for b_x, b_y in keys:
+            bucket = self._buckets[(b_x, b_y)]
+            if min_x <= b_x * BUCKET and (b_x + 1) * BUCKET - 1 <= max_x and\
+                    min_y <= b_y * BUCKET and (b_y + 1) * BUCKET - 1 <= max_y:
+                positions.extend(bucket)
+            else:
+                for pos in bucket:
+                    x, y = coordinates(pos)
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        positions.append(pos)
+        return positions
+
+
+class Extents(object):
+
+    """Bounding boxes of the entities of each type
+
+    The boxes grow with the entities added. When an entity on the border
+    of its box is removed the box may shrink, so its type is marked and
+    the box is computed again only when it is read. The cells are given
+    by their keys.
+    """
+
+    def __init__(self, items=()):
+        # Type -> [min_x, min_y, max_x, max_y] and number of entities
+        self._boxes = dict()
+        self._counts = dict()
+        self._stale = set()
+        for pos, type_ in items:
+            self.add(pos, type_)
+
+    def add(self, pos, type_):
+        x, y = coordinates(pos)
+        box = self._boxes.get(type_)
+        if box is None:
+            self._boxes[type_] = [x, y, x, y]
+            self._counts[type_] = 1
+            return
+        self._counts[type_] += 1
+        if x < box[0]:
+            box[0] = x
+        elif x > box[2]:
+            box[2] = x
+        if y < box[1]:
+            box[1] = y
+        elif y > box[3]:
+            box[3] = y
+
+    def discard(self, pos, type_):
+        box = self._boxes.get(type_)
+        if box is None:
+            return
+        self._counts[type_] -= 1
+        if self._counts[type_] == 0:
+            del self._boxes[type_]
+            del self._counts[type_]
+            self._stale.discard(type_)
+        else:
+            x, y = coordinates(pos)
+            if x in (box[0], box[2]) or y in (box[1], box[3]):
+                self._stale.add(type_)
+
+    def stale(self):
+        """Returns the set of the types whose box has to be computed
+        """
+        return self._stale
+
+    def shrink(self, items):
+        """Computes the boxes of the stale types from the items (key,
+        type) of the grid
+        """
+        boxes = dict()
+        for pos, type_ in items:
+            if type_ not in self._stale:
+                continue
+            x, y = coordinates(pos)
+            box = boxes.get(type_)
+            if box is None:
+                boxes[type_] = [x, y, x, y]
+            else:
+                box[0] = min(box[0], x)
+                box[1] = min(box[1], y)
+                box[2] = max(box[2], x)
+                box[3] = max(box[3], y)
+        self._boxes.update(boxes)
+        self._stale.clear()
+
+    def box(self, types=None):
+        """Returns (min_x, min_y, max_x, max_y) of the entities of types,
+        of all of them if None, or None if there are no entities
+        """
+        if types is None:
+            boxes = list(self._boxes.values())
+        else:
+            boxes = [self._boxes[type_] for type_ in types
+                     if type_ in self._boxes]
+        if len(boxes) == 0:
+            return None
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
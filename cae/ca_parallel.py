@@ -0,0 +1,121 @@
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from multiprocessing.sharedctypes import RawArray
+from .ca_dense import DenseGrid, step_cells
+from .ca_rules import CONWAY
+
+# Rows read around a band: a birth writes its halo one cell away and it
+# depends on the cells around it
+HALO = 2
+# Minimum number of cells of the array and of rows of a band to step the
+# array in parallel, below them the processes cost more than they give
+MIN_CELLS = 2 ** 18
+MIN_BAND_ROWS = 32
+
+# Shared arrays of the worker processes
+_buffers = None
+
+
+def _init_worker(buffers):
+    """Initializer of the worker processes
+    """
+    global _buffers
+    _buffers = buffers
+
+
+def _view(buffer_, shape):
+    """Returns the first cells of a shared buffer as an array of shape
+    """
+    size = shape[0] * shape[1]
+    return np.frombuffer(buffer_, dtype=np.uint8, count=size).reshape(shape)
+
+
+def _step_band(task):
+    """Writes on the target buffer the next generation of the rows from
+    start to end of the source buffer
+    """
+    source, target, shape, start, end, rule = task
+    cells = _view(_buffers[source], shape)
+    low = max(0, start - HALO)
+    high = min(shape[0], end + HALO)
+    # The rows out of the array are void, the ones out of the band are
+    # read from the source buffer: the errors at the border of the
+    # region don't reach the band
+    band = step_cells(cells[low:high], rule=rule)
+    _view(_buffers[target], shape)[start:end] = band[start - low:end - low]
+
+
+class ParallelGrid(DenseGrid):
+
+    """Dense storage updated by a pool of processes
+
+    The array is split in bands of rows and each process steps its bands
+    reading HALO rows of the bands around them. The two generations are
+    in shared buffers, so only the band limits are sent to the processes
+    and the end of the map is the barrier of the step. The result is the
+    one of DenseGrid.
+    """
+
+    def __init__(self, data=None, workers=None):
+        self.__workers = workers or cpu_count()
+        self.__pool = None
+        self.__buffers = None
+        # Index of the buffer with the current generation and its view
+        self.__current = 0
+        self.__shared = None
+        super(ParallelGrid, self).__init__(data)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes
+        """
+        if self.__pool is not None:
+            self.__pool.terminate()
+            self.__pool = None
+            self.__buffers = None
+            self.__shared = None
+
+    def __share(self):
+        """Moves the cells on the shared buffers if they aren't already
+        there, making the buffers and the pool when they are too small
+        """
+        if self._cells is self.__shared:
+            return
+        shape = self._cells.shape
+        size = shape[0] * shape[1]
+        if self.__buffers is None or len(self.__buffers[0]) < size:
+            self.close()
+            # Room to grow without making a new pool at every reserve
+            self.__buffers = (RawArray('B', size * 2), RawArray('B', size * 2))
+            self.__pool = Pool(self.__workers, _init_worker, (self.__buffers,))
+        shared = _view(self.__buffers[self.__current], shape)
+        shared[:] = self._cells
+        self._cells = self.__shared = shared
+
+    def step(self, rule=CONWAY):
+        """Updates the whole array with step_cells in the worker processes
+
+        Small arrays are updated by DenseGrid.step.
+        """
+        if self.__workers < 2 or self._cells.size < MIN_CELLS:
+            return super(ParallelGrid, self).step(rule)
+        if not self.vectorizable():
+            return False
+        self.ensure_margin()
+        self.__share()
+        shape = self._cells.shape
+        bands = min(self.__workers, max(1, shape[0] // MIN_BAND_ROWS))
+        limits = [shape[0] * index // bands for index in range(bands + 1)]
+        source, target = self.__current, 1 - self.__current
+        self.__pool.map(_step_band, [
+            (source, target, shape, start, end, rule)
+            for start, end in zip(limits[:-1], limits[1:])])
+        self.__current = target
+        self._cells = self.__shared = _view(self.__buffers[target], shape)
+        return True
+
+    def clear(self):
+        super(ParallelGrid, self).clear()
+        self.close()
@@ -0,0 +1,71 @@
+import re
+import numpy as np
+
+# Rule of the Game of Life, the one of LivingCell and DeadCell
+DEFAULT_RULE = "B3/S23"
+
+_NOTATION = re.compile(r"^B([0-8]*)/?S([0-8]*)$", re.IGNORECASE)
+
+
+def parse_rule(rule):
+    """Returns (births, survivals), the frozensets of the numbers of
+    living neighbors of a rule in B/S notation like "B36/S23"
+
+    Raises ValueError if the string is not a rule.
+    """
+    match = _NOTATION.match(rule.strip())
+    if match is None:
+        raise ValueError("Rule %r is not in B/S notation" % (rule,))
+    births, survivals = match.groups()
+    return frozenset(map(int, births)), frozenset(map(int, survivals))
+
+
+class LifeRule(object):
+
+    """Life-like rule of the living and dead cells
+
+    A dead cell is born when its number of living neighbors is in the B
+    digits of the rule, a living cell survives when the number is in
+    the S digits, otherwise it becomes dead. The rule is compiled in
+    lookup tables: births and survivals are indexed by the number of
+    living neighbors. For the array backends box_births and box_deaths
+    have the bit n set when n living cells in the 3x3 box of a cell,
+    that counts also the cell if it is living, give a birth or a death:
+    a shift looks up a whole array at once.
+    """
+
+    def __init__(self, rule=DEFAULT_RULE):
+        births, survivals = parse_rule(rule)
+        self.string = "B%s/S%s" % ("".join(map(str, sorted(births))),
+                                   "".join(map(str, sorted(survivals))))
+        self.births = tuple(count in births for count in range(9))
+        self.survivals = tuple(count in survivals for count in range(9))
+        self.box_births = np.uint16(sum(
+            1 << count for count in range(9) if self.births[count]))
+        self.box_deaths = np.uint16(sum(
+            1 << count + 1 for count in range(9) if not self.survivals[count]))
+
+    def __str__(self):
+        return self.string
+
+    def __repr__(self):
+        return "LifeRule(%r)" % (self.string,)
+
+    def __eq__(self, other):
+        return isinstance(other, LifeRule) and self.string == other.string
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.string)
+
+    @property
+    def default(self):
+        """True for the rule of the Game of Life
+        """
+        return self.string == DEFAULT_RULE
+
+
+# The Game of Life, used when no rule is given
+CONWAY = LifeRule()
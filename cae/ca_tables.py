@@ -0,0 +1,147 @@
+from .ca_base_entity import ENTITIES_IDS, ENTITIES_NAMES
+from .ca_entities import ALL_ENTITIES, MAX_TYPES
+from .utils import pack, unpack, key_offset
+
+VOID = ENTITIES_NAMES['void']
+
+# Entity type -> (positions read by step, groups of entities that step
+# tells apart). All the entities out of the groups have to give the same
+# result, they are one more group.
+TABLE_SPECS = {
+    ENTITIES_NAMES['spark']: ((), ()),
+    ENTITIES_NAMES['arrowup']: (
+        ((0, 1), (1, 0), (-1, 0), (0, -1)),
+        ((ENTITIES_NAMES['spark'],), (VOID,))),
+    ENTITIES_NAMES['arrowdown']: (
+        ((0, -1), (1, 0), (-1, 0), (0, 1)),
+        ((ENTITIES_NAMES['spark'],), (VOID,))),
+    ENTITIES_NAMES['arrowright']: (
+        ((0, -1), (0, 1), (-1, 0), (1, 0)),
+        ((ENTITIES_NAMES['spark'],), (VOID,))),
+    ENTITIES_NAMES['arrowleft']: (
+        ((0, -1), (0, 1), (1, 0), (-1, 0)),
+        ((ENTITIES_NAMES['spark'],), (VOID,))),
+    ENTITIES_NAMES['livingcell']: (
+        tuple((x, y) for x in range(-1, 2) for y in range(-1, 2)
+              if x != 0 or y != 0),
+        ((ENTITIES_NAMES['livingcell'],),)),
+    ENTITIES_NAMES['deadcell']: (
+        tuple((x, y) for x in range(-1, 2) for y in range(-1, 2)
+              if x != 0 or y != 0),
+        ((ENTITIES_NAMES['livingcell'],),)),
+    ENTITIES_NAMES['monoone']: (
+        ((0, 1), (1, 0), (-1, 0)),
+        ((VOID,), (ENTITIES_NAMES['monoone'],),
+         (ENTITIES_NAMES['monozero'],))),
+    ENTITIES_NAMES['monozero']: (
+        ((0, 1), (1, 0), (-1, 0)),
+        ((VOID,), (ENTITIES_NAMES['monoone'],),
+         (ENTITIES_NAMES['monozero'],))),
+}
+
+
+class Neighborhood(object):
+
+    """Fake grid for the compilation of the tables
+
+    It answers with the given entities and records the actions, so the
+    tables are made by the step methods of the entities themselves.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.actions = list()
+
+    def cell(self, key):
+        # A position out of the spec would make a wrong table
+        return self.cells[key]
+
+    def insert_action(self, action):
+        self.actions.append(action)
+
+
+class TransitionTable(object):
+
+    """Behaviour of an entity compiled on its neighborhood
+
+    The code of a neighborhood is the sum of the groups of the entities
+    read, each one multiplied for its weight. actions[code] has the
+    actions of step as (command, dif_x, dif_y, type). key_reads and
+    key_actions have the offsets of the keys instead of dif_x, dif_y.
+    """
+
+    def __init__(self, entity_t, offsets, groups):
+        self.type = entity_t
+        # Every id, also the free ones of register_entity, is in the
+        # group of the other entities if not in one of groups
+        self.classes = [len(groups)] * MAX_TYPES
+        for index, group in enumerate(groups):
+            for member in group:
+                self.classes[member] = index
+        # Representative entity of every group
+        members = [group[0] for group in groups]
+        members.append(next(type_ for type_ in sorted(ENTITIES_IDS)
+                            if self.classes[type_] == len(groups)))
+        base = len(members)
+        self.reads = tuple((dif_x, dif_y, base ** index)
+                           for index, (dif_x, dif_y) in enumerate(offsets))
+        entity = ALL_ENTITIES[entity_t]
+        actions = list()
+        center = pack((0, 0))
+        for code in range(base ** len(offsets)):
+            grid = Neighborhood({center: entity_t})
+            for dif_x, dif_y, weight in self.reads:
+                grid.cells[pack((dif_x, dif_y))] =\
+                    members[(code // weight) % base]
+            entity.step(grid, center)
+            code_actions = list()
+            for com, data in grid.actions:
+                if com == "del":
+                    dif_x, dif_y = unpack(data)
+                    code_actions.append((com, dif_x, dif_y, None))
+                else:
+                    dif_x, dif_y = unpack(data[0])
+                    code_actions.append((com, dif_x, dif_y, data[1]))
+            actions.append(tuple(code_actions))
+        self.actions = tuple(actions)
+        self.key_reads = tuple((key_offset(dif_x, dif_y), weight)
+                               for dif_x, dif_y, weight in self.reads)
+        self.key_actions = tuple(
+            tuple((com, key_offset(dif_x, dif_y), type_)
+                  for com, dif_x, dif_y, type_ in code_actions)
+            for code_actions in self.actions)
+
+    def __repr__(self):
+        return "TransitionTable(%s)" % ENTITIES_IDS[self.type]
+
+
+def step_cells(cells, get, insert_action, fallback):
+    """Queues with insert_action the actions of the cells (key, type)
+
+    get(key, default) reads the grid. It gives the same actions of the
+    step methods of the entities, but with one table lookup per cell.
+    The entities without a table are passed to fallback(pos, type).
+    """
+    void_id = VOID
+    tables = TRANSITION_TABLES
+    for pos, entity_t in cells:
+        if entity_t == void_id:
+            continue
+        table = tables.get(entity_t)
+        if table is None:
+            fallback(pos, entity_t)
+            continue
+        classes = table.classes
+        code = 0
+        for offset, weight in table.key_reads:
+            code += classes[get(pos + offset, void_id)] * weight
+        for com, offset, type_ in table.key_actions[code]:
+            if com == "del":
+                insert_action((com, pos + offset))
+            else:
+                insert_action((com, (pos + offset, type_)))
+
+
+# Entity type -> transition table, compiled at import
+TRANSITION_TABLES = dict((entity_t, TransitionTable(entity_t, *spec))
+                         for entity_t, spec in TABLE_SPECS.items())
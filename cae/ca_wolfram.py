@@ -0,0 +1,104 @@
+import numpy as np
+from .ca_base_entity import ENTITIES_NAMES
+from .ca_tables import TRANSITION_TABLES
+
+VOID = ENTITIES_NAMES['void']
+ONE = ENTITIES_NAMES['monoone']
+ZERO = ENTITIES_NAMES['monozero']
+
+# Codes of the cells in a row and the entity of each code
+V_CODE, ZERO_CODE, ONE_CODE = 0, 1, 2
+CODE_ENTITIES = (VOID, ZERO, ONE)
+ENTITY_CODES = {VOID: V_CODE, ZERO: ZERO_CODE, ONE: ONE_CODE}
+
+
+def legacy_table():
+    """Returns the table of MonoOne and MonoZero
+
+    table[left * 9 + center * 3 + right] is the code written under the
+    center. It is made from their transition tables, so it has also the
+    way they read void neighbors (a rule 30 where a one between void
+    cells gives zero).
+    """
+    table = np.zeros(27, dtype=np.uint8)
+    for left in range(3):
+        for center in (ZERO_CODE, ONE_CODE):
+            for right in range(3):
+                tran = TRANSITION_TABLES[CODE_ENTITIES[center]]
+                cells = {(0, 1): VOID, (1, 0): CODE_ENTITIES[right],
+                         (-1, 0): CODE_ENTITIES[left]}
+                code = sum(tran.classes[cells[(dif_x, dif_y)]] * weight
+                           for dif_x, dif_y, weight in tran.reads)
+                for com, dif_x, dif_y, type_ in tran.actions[code]:
+                    if com == "ins" and (dif_x, dif_y) == (0, 1):
+                        table[left * 9 + center * 3 + right] =\
+                            ENTITY_CODES[type_]
+    return table
+
+
+def rule_table(rule=None):
+    """Returns the table of the Wolfram rule number, from 0 to 255
+
+    The void cells are read as zero. Without a rule number it is the
+    table of the built-in entities.
+    """
+    if rule is None:
+        return legacy_table()
+    if not 0 <= rule <= 255:
+        raise ValueError("Rule number %r not in 0-255" % (rule,))
+    table = np.zeros(27, dtype=np.uint8)
+    for left in range(3):
+        for center in (ZERO_CODE, ONE_CODE):
+            for right in range(3):
+                index = (left == ONE_CODE) << 2 | (center == ONE_CODE) << 1 |\
+                    (right == ONE_CODE)
+                table[left * 9 + center * 3 + right] =\
+                    ONE_CODE if rule >> index & 1 else ZERO_CODE
+    return table
+
+
+def step_row(row, table, out=None):
+    """Returns the next generation of a row of codes
+
+    A code is written under each non void cell and every one is
+    surrounded by zeros on void cells, like the halo of MonoOne. The
+    first and the last two cells of the row have to be void.
+    """
+    if out is None:
+        out = np.zeros_like(row)
+    index = row[:-2] * 9
+    index += row[1:-1] * 3
+    index += row[2:]
+    out[0] = out[-1] = V_CODE
+    np.take(table, index, out=out[1:-1])
+    ones = out == ONE_CODE
+    halo = np.zeros_like(ones)
+    halo[1:] |= ones[:-1]
+    halo[:-1] |= ones[1:]
+    halo &= out == V_CODE
+    out[halo] = ZERO_CODE
+    return out
+
+
+def evolve(row, generations, rule=None, callback=None):
+    """Returns the row of codes after generations steps
+
+    The row is grown to contain the halos of all the generations and
+    the steps use only the part of it that can have cells. If given,
+    callback(generation, row, start) is called with each new row, with
+    start the index where the row given is in the grown ones.
+    """
+    table = rule_table(rule)
+    width = len(row)
+    grow = generations + 2
+    current = np.zeros(width + 2 * grow, dtype=np.uint8)
+    current[grow:grow + width] = row
+    following = np.zeros_like(current)
+    low, high = grow - 2, grow + width + 2
+    for generation in range(1, generations + 1):
+        low, high = max(0, low - 1), min(len(current), high + 1)
+        step_row(current[low:high], table, following[low:high])
+        current, following = following, current
+        if callback is not None:
+            callback(generation, current, grow)
+    return current, grow
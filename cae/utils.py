@@ -7,12 +7,42 @@ __version__ = "1.1.1"
 # Point type
 Point = namedtuple("Point", ('x', 'y'))
 
+# Cells are kept by the grid with packed keys, (y + KEY_BIAS) * 2**32 +
+# x + KEY_BIAS: ints hash and compare faster than Points and take less
+# memory. The coordinates have to be in [-KEY_BIAS, KEY_BIAS).
+KEY_BIAS = 2 ** 30
+KEY_LOW = 2 ** 32 - 1
+
 # Tile size
 TS = 16
 # Smart selection
 SMART_SEL = False
 
 
+def pack(pos):
+    """Returns the key of a position (x, y)
+    """
+    return ((pos[1] + KEY_BIAS) << 32) + pos[0] + KEY_BIAS
+
+
+def unpack(key):
+    """Returns the Point of a key
+    """
+    return Point((key & KEY_LOW) - KEY_BIAS, (key >> 32) - KEY_BIAS)
+
+
+def coordinates(key):
+    """Returns the tuple (x, y) of a key, faster than unpack
+    """
+    return (key & KEY_LOW) - KEY_BIAS, (key >> 32) - KEY_BIAS
+
+
+def key_offset(dif_x, dif_y):
+    """Returns what is added to a key to move it by (dif_x, dif_y)
+    """
+    return (dif_y << 32) + dif_x
+
+
 class Singleton(type):
 
     """Class for the singleton pattern
@@ -3,6 +3,7 @@ import wx
 from .wxui_gl import MyGLCanvas
 from .utils import TS, rotate_point, debug, Point
 from .ca_base_entity import ENTITIES_NAMES, ENTITIES_IDS
+from .ca_entities import ENTITY_DRAWABLE
 from .ca_link import LINK_TYPE_NAMES, LINK_TYPE_IDS
 from .wxui_resman import ResourceManager
 from .wxui_staman import StatusBarManager
@@ -220,8 +221,21 @@ class DrawWindow(MyGLCanvas):
     def search_in_selection(self):
         """Search entities on the current selection
         """
-        items_points = self.__cg.get_selection_entities_points()
         first = last = None
+        items_points = list()
+        dead_id = ENTITIES_NAMES["deadcell"]
+        bounds = self.__cg.bounds(
+            [type_ for type_ in ENTITIES_IDS if type_ != dead_id])
+        if len(self.__selected_cels) > 0 and bounds is not None:
+            # Only the part of the selection with entities is read
+            min_x, min_y = min(self.__selected_cels)
+            max_x, max_y = max(self.__selected_cels)
+            min_x, min_y = max(min_x, bounds[0]), max(min_y, bounds[1])
+            max_x, max_y = min(max_x, bounds[2]), min(max_y, bounds[3])
+            if min_x <= max_x and min_y <= max_y:
+                items_points = [
+                    pos for pos, entity_t in self.__cg.query_rect(
+                        min_x, min_y, max_x, max_y) if entity_t != dead_id]
         if len(items_points) > 0:
             max_x = max([point[0] for point in items_points])
             max_y = max([point[1] for point in items_points])
@@ -503,19 +517,25 @@ class DrawWindow(MyGLCanvas):
 
         ##
         # Draw entities
-        for position, entity in self.__cg.get_entities():
+        # Only the cells in the view, or in the minimap, are read
+        if self.__minimap:
+            area = (-(win_x/TS), -(win_y/TS), (win_x/TS)*2, (win_y/TS)*2)
+        else:
+            area = (-1, -1, win_x/TS + 1, win_y/TS + 1)
+        for position, entity in self.__cg.get_entities(area):
             # debug("FOR", ("entity", entity), ("position", position))
+            if not ENTITY_DRAWABLE[entity]:
+                continue
             x_c, y_c = position
-            if self.__minimap and ENTITIES_IDS[entity] in self.__resman.entity:
+            if self.__minimap:
                 self.__add_on_minimap(win_x, win_y, x_c, y_c, points)
             x_c, y_c = x_c*TS, conv_y(y_c*TS)-TS
             if x_c >= 0 and x_c < win_x and \
                     y_c >= 0 and y_c < win_y:
                 # DEBUG
                 # debug("Draw", ("position", (x_c, y_c)))
-                if ENTITIES_IDS[entity] in self.__resman.entity:
-                    self.draw_image(ENTITIES_IDS[entity], x_c, y_c,
-                                    size=(TS, TS), origin=(0.0, 0.0))
+                self.draw_image(ENTITIES_IDS[entity], x_c, y_c,
+                                size=(TS, TS), origin=(0.0, 0.0))
 
         ##
         # Minimap
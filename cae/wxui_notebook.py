@@ -2,8 +2,7 @@ import wx
 import wx.aui
 from .wxui_draw import DrawWindow
 from .ca_grid import CellularGrid
-from .ca_base_entity import Point
-from .utils import Singleton, debug
+from .utils import Singleton, debug, Point
 from .wxui_staman import StatusBarManager
 from os import path
 from six import add_metaclass
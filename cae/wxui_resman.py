@@ -1,4 +1,5 @@
 import wx
+from .ca_entities import ENTITY_SPRITES
 from .utils import Singleton
 from os import path, walk
 from six import add_metaclass
@@ -43,6 +44,10 @@ class ResourceManager(object):
                     else:
                         self.__resources[type_][name] = wx.Bitmap(
                             path.join(root, file_), wx.BITMAP_TYPE_PNG)
+        # Sprites of the entities added with register_entity
+        for name, sprite in ENTITY_SPRITES.items():
+            self.__resources.setdefault("entity", Container())[name] =\
+                Image.open(sprite)
 
     def __getattr__(self, name):
         return self.__resources[name]
@@ -3,6 +3,7 @@ from .utils import debug, Singleton, Point
 from .ca_link import LINK_TYPE_IDS, LINK_TYPE_NAMES
 from six import add_metaclass
 from random import randint
+from fractions import Fraction
 
 
 def get_random_color():
@@ -49,7 +50,7 @@ class ChangeSpeedDialog(wx.Dialog):
     def OnSet(self, event):
         """Set event
         """
-        self.__parent.SetSpeed(int(self.text.GetValue()), self.__id)
+        self.__parent.SetSpeed(Fraction(self.text.GetValue()), self.__id)
         self.Close()
 
 
@@ -46,6 +46,11 @@ def main():
     except ImportError as err:
         err.msg = "This program requires six"
         raise err
+    try:
+        import numpy
+    except ImportError as err:
+        err.msg = "This program requires NumPy"
+        raise err
 
     setup(
         name='cellular-automata-manager',
@@ -64,6 +69,7 @@ def main():
         ],
         install_requires=[
             'six',
+            'numpy',
             'wxPython',
             'PyOpenGL',
             'PyOpenGL-accelerate',
@@ -0,0 +1,91 @@
+"""Checks of the buffer of the actions queued in a generation
+
+    python -m unittest discover tests
+"""
+import random
+import unittest
+from cae.ca_actions import ActionBuffer
+
+
+def apply_list(actions):
+    """Returns the cells written by the actions applied like the lists
+    the grid used to keep, where an action was added only if it wasn't
+    there yet: all the deletes, then all the inserts
+    """
+    lists = {"del": list(), "ins": list()}
+    for com, pos in actions:
+        if pos not in lists[com]:
+            lists[com].append(pos)
+    cells = dict()
+    for pos in lists["del"]:
+        cells[pos] = None
+    for pos, type_ in lists["ins"]:
+        cells[pos] = type_
+    return cells
+
+
+def apply_buffer(buffer_):
+    cells = dict()
+    dels, inss = buffer_.resolve()
+    for pos in dels:
+        cells[pos] = None
+    for pos, type_ in inss:
+        cells[pos] = type_
+    return cells
+
+
+class ActionBufferTest(unittest.TestCase):
+
+    def filled(self, actions, policy="ordered", priorities=None):
+        buffer_ = ActionBuffer(policy, priorities)
+        for action in actions:
+            buffer_.add(action)
+        return buffer_
+
+    def test_ordered_matches_the_list(self):
+        generator = random.Random(0)
+        for _ in range(50):
+            actions = list()
+            for _ in range(generator.randint(0, 40)):
+                pos = generator.randint(0, 9)
+                if generator.random() < 0.4:
+                    actions.append(("del", pos))
+                else:
+                    actions.append(("ins", (pos, generator.randint(1, 3))))
+            self.assertEqual(apply_buffer(self.filled(actions)),
+                             apply_list(actions))
+
+    def test_repeated_actions_are_kept_once(self):
+        buffer_ = self.filled([("ins", (1, 2)), ("del", 1), ("ins", (1, 2)),
+                               ("del", 1), ("ins", (0, 3))])
+        self.assertEqual(len(buffer_), 3)
+        self.assertEqual(buffer_.resolve(), ([1], [(1, 2), (0, 3)]))
+        buffer_.clear()
+        self.assertEqual(len(buffer_), 0)
+
+    def test_repeated_insert_keeps_its_place(self):
+        # The second A is dropped, B is applied after the first one
+        actions = [("ins", (1, 2)), ("ins", (1, 3)), ("ins", (1, 2))]
+        self.assertEqual(apply_buffer(self.filled(actions)), {1: 3})
+        self.assertEqual(apply_list(actions), {1: 3})
+
+    def test_policies(self):
+        actions = [("del", 1), ("ins", (1, 2)), ("ins", (1, 3)), ("del", 2),
+                   ("ins", (4, 5))]
+        self.assertEqual(self.filled(actions, "insert").resolve(),
+                         ([2], [(1, 2), (1, 3), (4, 5)]))
+        self.assertEqual(self.filled(actions, "delete").resolve(),
+                         ([1, 2], [(4, 5)]))
+        self.assertEqual(self.filled(actions, "priority").resolve(),
+                         ([1, 2], [(4, 5)]))
+        self.assertEqual(
+            self.filled(actions, "priority", {3: 1}).resolve(),
+            ([2], [(1, 3), (4, 5)]))
+        self.assertEqual(
+            self.filled(actions, "priority", {None: -1}).resolve(),
+            ([2], [(1, 2), (4, 5)]))
+        self.assertRaises(ValueError, ActionBuffer, "random")
+
+
+if __name__ == '__main__':
+    unittest.main()
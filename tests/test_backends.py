@@ -0,0 +1,150 @@
+"""Checks that the storage backends give the generations of the dict one
+on the example grids
+
+    python -m unittest discover tests
+"""
+import shutil
+import tempfile
+import unittest
+from os import path
+from cae.ca_grid import CellularGrid, ENGINES
+from cae.ca_bench import example_files
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.utils import Point
+from cae import ca_generate, ca_parallel
+
+# Generations compared on each example
+STEPS = 8
+
+
+def spark_on_halo(backend, engine, dif_x):
+    """Returns the grid where an arrow fires a spark on a cell of the
+    halo of a birth of the blinker on its right
+    """
+    grid = CellularGrid(backend=backend, engine=engine)
+    grid.insert(Point(dif_x - 1, 0), ENTITIES_NAMES['spark'])
+    grid.insert(Point(dif_x, 0), ENTITIES_NAMES['arrowright'])
+    for y in range(3):
+        grid.insert(Point(dif_x + 3, y), ENTITIES_NAMES['livingcell'])
+    return grid
+
+
+def trajectory(filename, steps=STEPS, backend="dict", engine="entity"):
+    """Returns the sorted entities of the grid after each step
+    """
+    grid = CellularGrid(backend=backend, engine=engine)
+    grid.load(filename)
+    states = list()
+    for _ in range(steps):
+        grid.update()
+        states.append(sorted(grid.get_entities()))
+    return states
+
+
+class BackendTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.expected = dict((filename, trajectory(filename))
+                            for filename in example_files())
+        # A soup wider than a word of the bitboards and a chunk
+        cls.directory = tempfile.mkdtemp()
+        cls.soup = path.join(cls.directory, "soup.cg")
+        ca_generate.write(ca_generate.life_soup(150, 70, seed=1), cls.soup)
+        cls.soup_expected = trajectory(cls.soup)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def check(self, backend):
+        for filename, expected in sorted(self.expected.items()):
+            for engine in ENGINES:
+                self.assertEqual(trajectory(filename, STEPS, backend, engine),
+                                 expected, "%s %s %s" % (filename, backend,
+                                                         engine))
+
+    def check_soup(self, backend):
+        for engine in ENGINES:
+            self.assertEqual(trajectory(self.soup, STEPS, backend, engine),
+                             self.soup_expected)
+
+    def test_dense(self):
+        self.check("dense")
+        self.check_soup("dense")
+
+    def test_load(self):
+        # The dense backends write the lists of the file at once
+        expected = CellularGrid()
+        expected.load(self.soup)
+        for backend in ("dense", "parallel"):
+            grid = CellularGrid(backend=backend)
+            grid.load(self.soup)
+            self.assertEqual(sorted(grid.get_entities()),
+                             sorted(expected.get_entities()))
+
+    def test_spark_on_halo(self):
+        # The spark stays, whatever the order the cells are stepped in
+        for dif_x in range(0, 40, 7):
+            states = list()
+            for backend in ("dict", "dense", "bitlife", "chunked"):
+                for engine in ENGINES:
+                    grid = spark_on_halo(backend, engine, dif_x)
+                    grid.update()
+                    self.assertEqual(grid[Point(dif_x + 1, 0)],
+                                     ENTITIES_NAMES['spark'])
+                    grid.update()
+                    states.append(sorted(grid.get_entities()))
+            for state in states[1:]:
+                self.assertEqual(state, states[0])
+
+    def test_bitlife(self):
+        self.check("bitlife")
+        self.check_soup("bitlife")
+
+    def test_chunked(self):
+        self.check("chunked")
+        self.check_soup("chunked")
+
+    def test_parallel(self):
+        self.check("parallel")
+        # The soup is stepped by the pool, in bands of a few rows
+        limits = (ca_parallel.MIN_CELLS, ca_parallel.MIN_BAND_ROWS,
+                  ca_parallel.cpu_count)
+        ca_parallel.MIN_CELLS = 0
+        ca_parallel.MIN_BAND_ROWS = 8
+        ca_parallel.cpu_count = lambda: 3
+        try:
+            self.check_soup("parallel")
+        finally:
+            (ca_parallel.MIN_CELLS, ca_parallel.MIN_BAND_ROWS,
+             ca_parallel.cpu_count) = limits
+
+    def test_workers(self):
+        limits = (ca_parallel.MIN_CELLS, ca_parallel.MIN_BAND_ROWS)
+        ca_parallel.MIN_CELLS = 0
+        ca_parallel.MIN_BAND_ROWS = 8
+        try:
+            grids = list()
+            for workers in (1, 2):
+                grid = CellularGrid(backend="parallel", workers=workers)
+                grid.load(self.soup)
+                grids.append(grid)
+            for _ in range(STEPS):
+                for grid in grids:
+                    grid.update()
+                self.assertEqual(sorted(grids[1].get_entities()),
+                                 sorted(grids[0].get_entities()))
+            # Only the grid with 2 workers made the pool
+            self.assertEqual([grid._grid._ParallelGrid__pool is not None
+                              for grid in grids], [False, True])
+        finally:
+            ca_parallel.MIN_CELLS, ca_parallel.MIN_BAND_ROWS = limits
+        self.assertRaises(ValueError, CellularGrid, backend="parallel",
+                          workers=0)
+        self.assertRaises(ValueError, CellularGrid, backend="dense",
+                          workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Checks of the benchmark suite
+
+    python -m unittest discover tests
+"""
+import os
+import time
+import unittest
+from cae import ca_bench
+from cae.ca_bench import example_files
+
+CYCLE = [filename for filename in example_files()
+         if os.path.basename(filename) == "cycle.cg"][0]
+
+
+def crash(queue, args):
+    # Like a process killed by the system, without a result
+    os._exit(3)
+
+
+def hang(queue, args):
+    time.sleep(60)
+
+
+class BenchTest(unittest.TestCase):
+
+    def check_result(self, result):
+        for metric in ca_bench.METRICS:
+            self.assertIn(metric, result)
+        self.assertTrue(result["cells"] > 0)
+        self.assertTrue(result["steps_per_sec"]["2"] > 0)
+
+    def test_bench_file(self):
+        self.check_result(ca_bench.bench_file(CYCLE, (2,), repeat=1))
+
+    def test_run_benchmarks(self):
+        missing = os.path.join(os.path.dirname(CYCLE), "missing.cg")
+        results = ca_bench.run_benchmarks([CYCLE, missing], (2,), repeat=1)
+        self.assertEqual(sorted(results["grids"]), ["cycle.cg"])
+        self.assertEqual(sorted(results["errors"]), ["missing.cg"])
+        self.check_result(results["grids"]["cycle.cg"])
+
+    def test_isolated_failures(self):
+        child = ca_bench._bench_child
+        try:
+            # The processes are forked, they see the module patched
+            ca_bench._bench_child = crash
+            self.assertRaises(RuntimeError, ca_bench.bench_isolated, CYCLE)
+            ca_bench._bench_child = hang
+            start = time.time()
+            self.assertRaises(RuntimeError, ca_bench.bench_isolated, CYCLE,
+                              timeout=1)
+            self.assertTrue(time.time() - start < 30)
+        finally:
+            ca_bench._bench_child = child
+
+    def test_compare(self):
+        baseline = {"grids": {"a.cg": {"load_s": 1., "peak_bytes": 100,
+                                       "steps_per_sec": {"10": 50.}}}}
+        results = {"grids": {"a.cg": {"load_s": 2., "peak_bytes": 105,
+                                      "steps_per_sec": {"10": 100.}},
+                             "b.cg": {"load_s": 1.}}}
+        self.assertEqual(ca_bench.compare(baseline, results), [
+            ("a.cg", "load_s", 1., 2., 0.5, False),
+            ("a.cg", "steps_per_sec[10]", 50., 100., 2., True)])
+        self.assertEqual(ca_bench.speedup(baseline, results), 2.)
+        self.assertEqual(ca_bench.speedup(baseline, {"grids": dict()}), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
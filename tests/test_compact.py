@@ -0,0 +1,64 @@
+"""Checks of the void entries of the dict storage
+
+    python -m unittest discover tests
+"""
+import unittest
+from cae import ca_grid
+from cae.ca_grid import CellularGrid
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.ca_bench import example_files
+from cae.utils import Point, pack
+
+VOID = ENTITIES_NAMES['void']
+ARROW = ENTITIES_NAMES['arrowright']
+# Generations compared on each example
+STEPS = 10
+
+
+def trajectory(filename, steps=STEPS):
+    """Returns the sorted entities and the population of the grid after
+    each step
+    """
+    grid = CellularGrid()
+    grid.load(filename)
+    states = list()
+    for _ in range(steps):
+        grid.update()
+        states.append((sorted(grid.get_entities()), grid.population()))
+    return states
+
+
+class CompactTest(unittest.TestCase):
+
+    def test_reads_do_not_store(self):
+        grid = CellularGrid()
+        grid.insert(Point(0, 0), ARROW)
+        self.assertEqual(grid[(5, 5)], VOID)
+        self.assertEqual(grid.cell(pack((7, -7))), VOID)
+        self.assertEqual(len(grid._grid), 1)
+
+    def test_compact(self):
+        grid = CellularGrid()
+        grid.insert(Point(0, 0), ARROW)
+        grid.insert(Point(1, 0), ARROW)
+        grid.delete(Point(0, 0))
+        self.assertEqual(grid.population(), 1)
+        grid.compact()
+        self.assertEqual(len(grid._grid), 1)
+        self.assertEqual(grid.population(), 1)
+        self.assertEqual(grid[(0, 0)], VOID)
+
+    def test_compaction_in_generations(self):
+        files = example_files()
+        expected = [trajectory(filename) for filename in files]
+        # Compacted after every generation with a void entry
+        limit, ca_grid.COMPACT_VOIDS = ca_grid.COMPACT_VOIDS, 0
+        try:
+            for filename, states in zip(files, expected):
+                self.assertEqual(trajectory(filename), states, filename)
+        finally:
+            ca_grid.COMPACT_VOIDS = limit
+
+
+if __name__ == '__main__':
+    unittest.main()
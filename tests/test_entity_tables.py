@@ -0,0 +1,50 @@
+"""Checks that the flat tables of the entity properties are the ones the
+entities give
+
+    python -m unittest discover tests
+"""
+import unittest
+from cae.ca_base_entity import BaseEntity
+from cae.ca_entities import (ALL_ENTITIES, ENTITY_TYPES, ENTITY_NEIGHBORHOODS,
+                             ENTITY_HALOS, ENTITY_ROTATIONS, ENTITY_FLIPS_H,
+                             ENTITY_FLIPS_V, ENTITY_DRAWABLE, MAX_TYPES)
+
+
+class EntityTablesTest(unittest.TestCase):
+
+    def test_properties(self):
+        for entity_t, entity in ALL_ENTITIES.items():
+            self.assertEqual(ENTITY_TYPES[entity_t], entity_t)
+            self.assertEqual(ENTITY_ROTATIONS[0][entity_t], entity_t)
+            if not isinstance(entity, BaseEntity):
+                continue
+            self.assertEqual(ENTITY_NEIGHBORHOODS[entity_t],
+                             entity.neighborhood)
+            self.assertEqual(ENTITY_HALOS[entity_t], entity.neighbors)
+            for deg in (90, 180, 270):
+                self.assertEqual(ENTITY_ROTATIONS[deg][entity_t],
+                                 entity.rotate(deg))
+            self.assertEqual(ENTITY_FLIPS_H[entity_t], entity.flip_h())
+            self.assertEqual(ENTITY_FLIPS_V[entity_t], entity.flip_v())
+
+    def test_free_ids(self):
+        for entity_t in range(MAX_TYPES):
+            if entity_t not in ALL_ENTITIES:
+                self.assertEqual(ENTITY_TYPES[entity_t], None)
+                self.assertFalse(ENTITY_DRAWABLE[entity_t])
+
+    def test_rotations_compose(self):
+        rotations = ENTITY_ROTATIONS
+        for entity_t in ALL_ENTITIES:
+            self.assertEqual(rotations[90][rotations[90][entity_t]],
+                             rotations[180][entity_t])
+            self.assertEqual(rotations[90][rotations[270][entity_t]],
+                             entity_t)
+            self.assertEqual(ENTITY_FLIPS_H[ENTITY_FLIPS_H[entity_t]],
+                             entity_t)
+            self.assertEqual(ENTITY_FLIPS_V[ENTITY_FLIPS_V[entity_t]],
+                             entity_t)
+
+
+if __name__ == '__main__':
+    unittest.main()
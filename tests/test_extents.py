@@ -0,0 +1,62 @@
+"""Checks that the bounding boxes kept by the grid are the ones of its
+entities
+
+    python -m unittest discover tests
+"""
+import unittest
+from cae.ca_grid import CellularGrid
+from cae.ca_bench import example_files
+from cae.utils import Point
+
+# Generations checked on each example
+STEPS = 6
+
+
+def box(entities, types=None):
+    """Returns the bounding box of the entities of types, computed again
+    """
+    points = [pos for pos, type_ in entities
+              if types is None or type_ in types]
+    if len(points) == 0:
+        return None
+    return (min(x for x, _ in points), min(y for _, y in points),
+            max(x for x, _ in points), max(y for _, y in points))
+
+
+class BoundsTest(unittest.TestCase):
+
+    def check(self, grid, message):
+        entities = list(grid.get_entities())
+        self.assertEqual(grid.bounds(), box(entities), message)
+        for type_ in set(type_ for _, type_ in entities):
+            self.assertEqual(grid.bounds([type_]), box(entities, [type_]),
+                             message)
+
+    def test_examples(self):
+        for backend in ("dict", "chunked"):
+            for filename in example_files():
+                grid = CellularGrid(backend=backend)
+                grid.load(filename)
+                # The boxes are kept from here on
+                self.check(grid, filename)
+                for _ in range(STEPS):
+                    grid.update()
+                    self.check(grid, filename)
+
+    def test_edits(self):
+        grid = CellularGrid()
+        self.assertEqual(grid.bounds(), None)
+        for pos in ((0, 0), (5, -3), (-2, 7)):
+            grid.insert(Point(*pos), 1)
+        self.check(grid, "insert")
+        grid.delete(Point(5, -3))
+        self.check(grid, "delete on the border")
+        grid.move_all(3, 4)
+        self.check(grid, "move")
+        for pos, _ in list(grid.get_entities()):
+            grid.delete(pos)
+        self.assertEqual(grid.bounds(), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Checks that the frozen regions give the same generations
+
+    python -m unittest discover tests
+"""
+import unittest
+from cae.ca_grid import CellularGrid
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.utils import Point
+
+LIVING = ENTITIES_NAMES['livingcell']
+# Cells of a glider going down and right
+GLIDER = ((1, 0), (2, 1), (0, 2), (1, 2), (2, 2))
+# Cells of the oscillators of period 2, a blinker and a toad
+OSCILLATORS = (((0, 1), (1, 1), (2, 1)),
+               ((1, 1), (2, 1), (3, 1), (0, 2), (1, 2), (2, 2)))
+# Generations of the runs
+STEPS = 60
+
+
+def oscillator_grid(freeze, glider=None):
+    """Returns a grid of 6 x 6 oscillators, one every 8 cells, with a
+    glider at the position glider
+    """
+    grid = CellularGrid()
+    for index in range(36):
+        # Blinkers and toads, horizontal and vertical
+        for x, y in OSCILLATORS[index % 2]:
+            if index % 3 == 0:
+                x, y = y, x
+            grid.insert(Point(index % 6 * 8 + x, index // 6 * 8 + y),
+                        LIVING)
+    if glider is not None:
+        for x, y in GLIDER:
+            grid.insert(Point(glider[0] + x, glider[1] + y), LIVING)
+    grid.freeze_regions(freeze)
+    return grid
+
+
+class FreezeTest(unittest.TestCase):
+
+    def check(self, steps, glider=None, edit=None):
+        """Runs the grid with and without freezing, edit(grid) is
+        called after the first half of the steps
+        """
+        grids = [oscillator_grid(False, glider), oscillator_grid(True, glider)]
+        for step in range(steps):
+            if edit is not None and step == steps // 2:
+                for grid in grids:
+                    edit(grid)
+            for grid in grids:
+                grid.update()
+            self.assertEqual(sorted(grids[1].get_entities()),
+                             sorted(grids[0].get_entities()))
+        return grids[1]
+
+    def test_oscillators_are_frozen(self):
+        grid = self.check(STEPS)
+        self.assertTrue(len(grid.frozen_tiles()) > 0)
+
+    def test_frozen_cells_are_skipped(self):
+        stepped = list()
+        # The function, the grids are made from the dict of the class
+        step_cells = CellularGrid.__dict__["_CellularGrid__step_cells"]
+
+        def counting(grid, cells, target):
+            cells = list(cells)
+            stepped.append(len(cells))
+            return step_cells(grid, cells, target)
+        CellularGrid._CellularGrid__step_cells = counting
+        try:
+            counts = list()
+            for freeze in (False, True):
+                grid = oscillator_grid(freeze)
+                del stepped[:]
+                grid.run(STEPS)
+                counts.append(sum(stepped[-10:]))
+        finally:
+            CellularGrid._CellularGrid__step_cells = step_cells
+        # Once all the tiles are frozen no cell is stepped
+        self.assertTrue(counts[0] > 0)
+        self.assertEqual(counts[1], 0)
+
+    def test_glider_thaws_the_oscillators(self):
+        # It starts far away, and hits the field after they are frozen
+        self.check(120, glider=(-16, -16))
+
+    def test_edit_thaws_the_oscillators(self):
+        def edit(grid):
+            grid.insert(Point(17, 18), LIVING)
+            grid.delete(Point(8, 9))
+        self.check(STEPS, edit=edit)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Checks that stepping only the cells near the ones written gives the
+generations of a scan of the whole grid
+
+    python -m unittest discover tests
+"""
+import unittest
+from cae.ca_grid import CellularGrid, ENGINES
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.ca_bench import example_files
+from cae.ca_generate import life_soup
+from cae.utils import Point
+
+LIVING = ENTITIES_NAMES['livingcell']
+# Cells of a glider going down and right, and of a block
+GLIDER = ((1, 0), (2, 1), (0, 2), (1, 2), (2, 2))
+BLOCK = ((0, 0), (1, 0), (0, 1), (1, 1))
+# Generations compared on each example
+STEPS = 8
+
+
+def dirty(grid):
+    """Returns the positions written in the last step, None if the next
+    one scans the whole grid
+    """
+    return grid._CellularGrid__dirty
+
+
+def full_scan(grid):
+    """Makes the next step of grid scan all its cells
+    """
+    grid._CellularGrid__dirty = None
+
+
+def life_grid(cells, engine):
+    grid = CellularGrid(engine=engine)
+    for x, y in cells:
+        grid.insert(Point(x, y), LIVING)
+    return grid
+
+
+class FrontierTest(unittest.TestCase):
+
+    def check(self, grids, steps):
+        """Steps grids[0] on its frontier and grids[1] with a full scan,
+        they have to stay the same
+        """
+        for step in range(steps):
+            full_scan(grids[1])
+            for grid in grids:
+                grid.update()
+            self.assertEqual(sorted(grids[0].get_entities()),
+                             sorted(grids[1].get_entities()), step)
+
+    def test_examples(self):
+        for filename in example_files():
+            for engine in ENGINES:
+                grids = [CellularGrid(engine=engine) for _ in range(2)]
+                for grid in grids:
+                    grid.load(filename)
+                self.check(grids, STEPS)
+
+    def test_glider_wakes_a_block(self):
+        # The block is still until the glider hits it
+        cells = GLIDER + tuple((x + 12, y + 13) for x, y in BLOCK)
+        for engine in ENGINES:
+            grids = [life_grid(cells, engine) for _ in range(2)]
+            self.check(grids, 1)
+            self.assertFalse(any(pos in dirty(grids[0])
+                                 for pos, _ in grids[0].get_entities()
+                                 if pos.x >= 12 and pos.y >= 13))
+            self.check(grids, 60)
+            # The hit destroys both
+            self.assertFalse(any(type_ == LIVING
+                                 for _, type_ in grids[0].get_entities()))
+
+    def test_soup_goes_dormant(self):
+        cells = life_soup(40, 40, seed=2)["livingcell"]
+        for engine in ENGINES:
+            grids = [life_grid(cells, engine) for _ in range(2)]
+            self.check(grids, 150)
+            # Most of the debris is still, only the oscillators are written
+            self.assertLess(len(dirty(grids[0])) * 4,
+                            len(list(grids[0].get_entities())))
+
+
+if __name__ == '__main__':
+    unittest.main()
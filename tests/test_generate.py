@@ -0,0 +1,92 @@
+"""Checks that the generated grids are reproducible and load in a grid
+
+    python -m unittest discover tests
+"""
+import shutil
+import tempfile
+import unittest
+from os import path
+from cae.ca_grid import CellularGrid
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae import ca_generate
+
+DEAD = ENTITIES_NAMES['deadcell']
+
+
+def generators(directory):
+    """Returns {kind: function(seed) -> {file name: content}} writing in
+    directory
+    """
+    return {
+        "soup": lambda seed: {path.join(directory, "soup.cg"):
+                              ca_generate.life_soup(60, 40, seed=seed)},
+        "mesh": lambda seed: {path.join(directory, "mesh.cg"):
+                              ca_generate.arrow_mesh(3, 2, side=4,
+                                                     seed=seed)},
+        "seed": lambda seed: {path.join(directory, "row.cg"):
+                              ca_generate.automaton_seed(300, seed=seed)},
+        "hierarchy": lambda seed: ca_generate.hierarchy(
+            path.join(directory, "modules.cg"), 5, depth=2, seed=seed),
+    }
+
+
+def write(files):
+    """Writes the files and returns {base name: bytes written}
+    """
+    written = dict()
+    for filename, content in files.items():
+        ca_generate.write(content, filename)
+        with open(filename, "rb") as fp:
+            written[path.basename(filename)] = fp.read()
+    return written
+
+
+class GenerateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directories = [tempfile.mkdtemp() for _ in range(2)]
+
+    def tearDown(self):
+        for directory in self.directories:
+            shutil.rmtree(directory)
+
+    def test_same_seed_same_files(self):
+        first, second = [generators(directory)
+                         for directory in self.directories]
+        for kind in sorted(first):
+            self.assertEqual(write(first[kind](7)), write(second[kind](7)),
+                             kind)
+            self.assertNotEqual(write(first[kind](7)),
+                                write(second[kind](8)), kind)
+
+    def test_files_load(self):
+        for kind, make in sorted(generators(self.directories[0]).items()):
+            files = make(3)
+            write(files)
+            for filename, content in files.items():
+                grid = CellularGrid()
+                grid.load(filename)
+                # The life cells get their halo of dead cells
+                entities = [type_ for _, type_ in grid.get_entities()
+                            if type_ != DEAD]
+                self.assertEqual(len(entities),
+                                 ca_generate.count_cells(content), filename)
+                self.assertEqual(len(grid._linked_grids),
+                                 len(content.get("linked_names", ())))
+                grid.run(3)
+
+    def test_hierarchy_links(self):
+        files = generators(self.directories[0])["hierarchy"](0)
+        write(files)
+        grid = CellularGrid()
+        grid.load(list(files)[0])
+        self.assertEqual(len(grid._linked_grids), 5)
+        # The modules of the lowest level have no linked grids
+        for linked in grid._linked_grids.values():
+            self.assertEqual(len(linked._linked_grids), 1)
+            for module in linked._linked_grids.values():
+                self.assertEqual(len(module._linked_grids), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
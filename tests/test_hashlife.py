@@ -0,0 +1,67 @@
+"""Checks that advance() with HashLife gives the generations of update()
+
+    python -m unittest discover tests
+"""
+import unittest
+from os import path
+from cae.ca_grid import CellularGrid
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.ca_generate import life_soup
+from cae.utils import Point
+
+LIVING = ENTITIES_NAMES['livingcell']
+EXAMPLE = path.join(path.dirname(path.abspath(__file__)), "..", "examples",
+                    "life_examples.cg")
+
+
+def soup_grid(rule=None):
+    """Returns a grid with a small soup of life cells
+    """
+    grid = CellularGrid()
+    if rule is not None:
+        grid.set_rule(rule)
+    for x, y in life_soup(40, 30, seed=2)["livingcell"]:
+        grid.insert(Point(x, y), LIVING)
+    return grid
+
+
+def living(grid):
+    """Returns the sorted positions of the living cells: the dead ones
+    around them depend on the generations done one by one
+    """
+    return sorted(pos for pos, type_ in grid.get_entities()
+                  if type_ == LIVING)
+
+
+class AdvanceTest(unittest.TestCase):
+
+    def check(self, make, generations):
+        expected = make()
+        for _ in range(generations):
+            expected.update()
+        grid = make()
+        grid.advance(generations)
+        self.assertEqual(living(grid), living(expected))
+        # The grid goes on from the generation reached
+        grid.update()
+        expected.update()
+        self.assertEqual(living(grid), living(expected))
+
+    def test_soup(self):
+        for generations in (1, 4, 13, 32):
+            self.check(soup_grid, generations)
+
+    def test_rule(self):
+        for generations in (1, 7, 16):
+            self.check(lambda: soup_grid("B36/S23"), generations)
+
+    def test_example(self):
+        def example():
+            grid = CellularGrid()
+            grid.load(EXAMPLE)
+            return grid
+        self.check(example, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
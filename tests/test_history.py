@@ -0,0 +1,148 @@
+"""Regression checks of the history of actions
+
+    python -m unittest discover tests
+"""
+import unittest
+from os import path
+from cae.ca_grid import CellularGrid
+from cae.ca_bench import example_files
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.utils import Point
+
+LIVING = ENTITIES_NAMES['livingcell']
+COUNTER = [filename for filename in example_files()
+           if path.basename(filename) == "Counter.cg"][0]
+
+
+class TransformThenEditTest(unittest.TestCase):
+
+    """Undo after a transform and an edit in the same action restores
+    the state pushed before them
+    """
+
+    def check(self, transform, backend="dict"):
+        grid = CellularGrid(history=True, backend=backend)
+        grid.insert(Point(0, 0), LIVING)
+        grid.push_actions()
+        state = sorted(grid.get_entities())
+        transform(grid)
+        grid.insert(Point(3, 0), LIVING)
+        grid.push_actions()
+        grid.undo()
+        self.assertEqual(sorted(grid.get_entities()), state)
+        grid.redo()
+        grid.undo()
+        self.assertEqual(sorted(grid.get_entities()), state)
+
+    def test_move_all(self):
+        for backend in ("dict", "dense", "chunked", "bitlife"):
+            self.check(lambda grid: grid.move_all(-5, 0), backend)
+
+    def test_rotate(self):
+        def rotate(grid):
+            grid.select_entities([Point(x, y) for x in range(-1, 3)
+                                  for y in range(-1, 2)])
+            grid.rotate(90)
+            grid.clear_selection()
+        self.check(rotate)
+
+    def test_flips(self):
+        for name in ("flip_h", "flip_v"):
+            def flip(grid):
+                grid.select_entities([Point(x, y) for x in range(-1, 4)
+                                      for y in range(-1, 2)])
+                getattr(grid, name)()
+                grid.clear_selection()
+            self.check(flip)
+
+
+class MoveAllTest(unittest.TestCase):
+
+    """A pan is stored as the move, not as the cells of the grid
+    """
+
+    def grid(self, backend="dict"):
+        grid = CellularGrid(history=True, backend=backend)
+        for x in range(32):
+            for y in range(32):
+                grid.insert(Point(x * 3, y * 3), LIVING)
+        grid.push_actions()
+        return grid
+
+    def test_pans_are_small(self):
+        grid = self.grid()
+        _, size = grid._actions_diffs[-1]
+        for _ in range(10):
+            grid.move_all(1, 2)
+            grid.push_actions()
+        for action, pan_size in list(grid._actions_diffs)[1:]:
+            self.assertEqual([step[0] for step in action], ["move"])
+            self.assertLess(pan_size * 100, size)
+
+    def test_undo_redo_pans_and_edits(self):
+        for backend in ("dict", "dense", "chunked", "bitlife"):
+            grid = self.grid(backend)
+            states = [sorted(grid.get_entities())]
+            grid.insert(Point(-7, 1), LIVING)
+            grid.move_all(5, -3)
+            grid.insert(Point(-7, 1), LIVING)
+            grid.push_actions()
+            states.append(sorted(grid.get_entities()))
+            grid.move_all(-2, 0)
+            grid.push_actions()
+            states.append(sorted(grid.get_entities()))
+            # Not pushed, lost by the undo
+            grid.move_all(4, 4)
+            grid.insert(Point(0, 1), LIVING)
+            grid.undo()
+            self.assertEqual(sorted(grid.get_entities()), states[1])
+            grid.undo()
+            self.assertEqual(sorted(grid.get_entities()), states[0])
+            grid.redo()
+            grid.redo()
+            self.assertEqual(sorted(grid.get_entities()), states[2])
+
+
+class MoveSelectionTest(unittest.TestCase):
+
+    """The entities moved with the clipboard are undone and redone like
+    the other edits
+    """
+
+    def test_move_then_rotate(self):
+        for backend in ("dict", "dense", "chunked"):
+            grid = CellularGrid(history=True, backend=backend)
+            grid.load(COUNTER)
+            grid.push_actions()
+            states = [sorted(grid.get_entities())]
+            moved = grid[Point(4, 4)]
+            # Like the mouse: the clipboard is moved by (4, -1)
+            grid.select_entities([Point(x, y) for x in range(2, 20)
+                                  for y in range(1, 15)])
+            grid.load_selection()
+            grid.move_selected_entities(-4, 1)
+            grid.store_selection()
+            grid.push_actions()
+            states.append(sorted(grid.get_entities()))
+            self.assertEqual(grid[Point(8, 3)], moved)
+            self.assertEqual(grid[Point(4, 4)], ENTITIES_NAMES['void'])
+            grid.clear_selection()
+            grid.select_entities([Point(x, y) for x in range(6, 24)
+                                  for y in range(0, 14)])
+            grid.rotate(180)
+            grid.clear_selection()
+            grid.push_actions()
+            states.append(sorted(grid.get_entities()))
+            grid.undo()
+            self.assertEqual(sorted(grid.get_entities()), states[1])
+            grid.redo()
+            self.assertEqual(sorted(grid.get_entities()), states[2])
+            grid.undo()
+            grid.undo()
+            self.assertEqual(sorted(grid.get_entities()), states[0])
+            grid.redo()
+            self.assertEqual(sorted(grid.get_entities()), states[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
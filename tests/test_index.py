@@ -0,0 +1,109 @@
+"""Checks of the rectangle queries of the spatial index and of the grid
+
+    python -m unittest discover tests
+"""
+import random
+import unittest
+from cae.ca_grid import CellularGrid
+from cae.ca_index import SpatialIndex, BUCKET
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.utils import Point, pack
+
+LIVING = ENTITIES_NAMES['livingcell']
+SPARK = ENTITIES_NAMES['spark']
+# Limits of the rectangles on the borders of the buckets around 0
+EDGES = (-2 * BUCKET - 1, -BUCKET - 1, -BUCKET, -1, 0, BUCKET - 1, BUCKET,
+         2 * BUCKET)
+
+
+def inside(points, min_x, min_y, max_x, max_y):
+    """Returns the sorted points in the rectangle, borders included
+    """
+    return sorted((x, y) for x, y in points
+                  if min_x <= x <= max_x and min_y <= y <= max_y)
+
+
+class SpatialIndexTest(unittest.TestCase):
+
+    def check(self, index, points, rect):
+        self.assertEqual(sorted(pos for pos in index.query(*rect)),
+                         sorted(pack(pos) for pos in inside(points, *rect)),
+                         rect)
+
+    def test_queries(self):
+        generator = random.Random(1)
+        points = set((generator.randint(-100, 100),
+                      generator.randint(-100, 100)) for _ in range(600))
+        index = SpatialIndex(pack(pos) for pos in points)
+        self.assertEqual(len(index), len(points))
+        for min_x in EDGES:
+            for max_x in EDGES:
+                for min_y, max_y in ((-BUCKET, -1), (-1, 0), (0, BUCKET),
+                                     (-100, 100)):
+                    self.check(index, points, (min_x, min_y, max_x, max_y))
+        # A single cell, the whole space and nothing
+        x, y = sorted(points)[0]
+        self.assertEqual(index.query(x, y, x, y), [pack((x, y))])
+        self.check(index, points, (-2 ** 20, -2 ** 20, 2 ** 20, 2 ** 20))
+        self.assertEqual(index.query(5, 5, 4, 5), [])
+        self.assertEqual(SpatialIndex().query(-10, -10, 10, 10), [])
+
+    def test_add_and_discard(self):
+        points = set((x, y) for x in range(-40, 40, 3)
+                     for y in range(-40, 40, 7))
+        index = SpatialIndex(pack(pos) for pos in points)
+        for pos in list(points)[::2]:
+            index.discard(pack(pos))
+            points.discard(pos)
+        # Twice, or never added, does nothing
+        index.discard(pack((-40, -40)))
+        index.discard(pack((1000, 1000)))
+        points.discard((-40, -40))
+        for pos in ((-BUCKET, -BUCKET), (BUCKET - 1, 0), (500, -500)):
+            index.add(pack(pos))
+            points.add(pos)
+        self.assertEqual(len(index), len(points))
+        for rect in ((-40, -40, 40, 40), (-BUCKET, -BUCKET, -1, -1),
+                     (0, 0, BUCKET - 1, BUCKET - 1), (400, -600, 600, -400)):
+            self.check(index, points, rect)
+        # The empty buckets are dropped
+        for pos in list(points):
+            index.discard(pack(pos))
+        self.assertEqual(index._buckets, dict())
+
+
+class QueryRectTest(unittest.TestCase):
+
+    def check(self, grid, rect, types=None):
+        expected = sorted((pos, type_) for pos, type_ in grid.get_entities()
+                          if rect[0] <= pos.x <= rect[2] and
+                          rect[1] <= pos.y <= rect[3] and
+                          (types is None or type_ in types))
+        self.assertEqual(sorted(grid.query_rect(*rect, types=types)),
+                         expected, rect)
+
+    def test_edits(self):
+        for backend in ("dict", "dense", "chunked"):
+            grid = CellularGrid(backend=backend)
+            grid.insert(Point(-BUCKET, -1), LIVING)
+            grid.insert(Point(0, 0), SPARK)
+            rects = ((-BUCKET - 1, -2, -BUCKET + 1, 0), (-1, -1, 1, 1),
+                     (0, 0, 0, 0), (1, 1, 0, 0), (-100, -100, 100, 100))
+            # The index is built by the first query, then kept by the edits
+            for rect in rects:
+                self.check(grid, rect)
+            grid.insert(Point(BUCKET, BUCKET), LIVING)
+            grid.delete(Point(0, 0))
+            grid.delete(Point(-BUCKET, -1))
+            grid.insert(Point(-3 * BUCKET, 5), SPARK)
+            for rect in rects + ((BUCKET - 1, BUCKET - 1, BUCKET + 1,
+                                  BUCKET + 1),):
+                self.check(grid, rect)
+                self.check(grid, rect, [SPARK])
+            self.assertEqual(grid.query_rect(-3 * BUCKET, 5, -3 * BUCKET, 5),
+                             [(Point(-3 * BUCKET, 5), SPARK)])
+            self.assertEqual(grid.query_rect(0, 0, 0, 0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
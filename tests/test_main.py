@@ -0,0 +1,92 @@
+"""Checks of the command line runner
+
+    python -m unittest discover tests
+"""
+import shutil
+import sys
+import tempfile
+import unittest
+from os import path
+from six import StringIO
+from cae.__main__ import main
+from cae.ca_grid import CellularGrid
+from cae.ca_bench import example_files
+
+# Generations of the runs
+STEPS = 7
+# Examples without links: the output is stored away from their modules
+FILES = [filename for filename in example_files()
+         if path.basename(filename) in ("cycle.cg", "encoder_decoder.cg",
+                                        "glider_gun.cg", "life_examples.cg")]
+
+
+def entities(filename):
+    grid = CellularGrid()
+    grid.load(filename)
+    return sorted(grid.get_entities())
+
+
+class RunCommandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.out = path.join(self.directory, "out.cg")
+        self.stdout, self.stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.stdout, self.stderr
+        shutil.rmtree(self.directory)
+
+    def expected(self, filename):
+        """Returns the entities of the grid after STEPS update(), stored
+        and loaded again like the output of the command
+        """
+        grid = CellularGrid()
+        grid.load(filename)
+        for _ in range(STEPS):
+            grid.update()
+        expected = path.join(self.directory, "expected.cg")
+        grid.store(expected)
+        return entities(expected)
+
+    def test_run(self):
+        for filename in FILES:
+            for options in ([], ["--freeze"], ["--backend", "dense"],
+                            ["--every", "3"]):
+                self.assertEqual(main(["run", filename, "--steps",
+                                       str(STEPS), "--out", self.out] +
+                                      options), 0)
+                self.assertEqual(entities(self.out), self.expected(filename),
+                                 "%s %s" % (filename, options))
+
+    def test_every(self):
+        main(["run", FILES[0], "--steps", str(STEPS), "--every", "3"])
+        output = sys.stdout.getvalue()
+        self.assertIn("generation 3:", output)
+        self.assertIn("generation 6:", output)
+        self.assertNotIn("generation 7:", output)
+        self.assertIn("peak cells (every 3):", output)
+
+    def test_population_is_sampled(self):
+        calls = list()
+        # The function, the grids are made from the dict of the class
+        population = CellularGrid.__dict__["population"]
+        CellularGrid.population = lambda grid: (calls.append(grid),
+                                                population(grid))[1]
+        try:
+            main(["run", FILES[0], "--steps", "30", "--every", "10"])
+        finally:
+            CellularGrid.population = population
+        # At the start, at the 3 samples and at the end
+        self.assertEqual(len(calls), 5)
+
+    def test_errors(self):
+        missing = path.join(self.directory, "missing.cg")
+        self.assertEqual(main(["run", missing, "--steps", "1"]), 1)
+        self.assertEqual(main(["run", FILES[0], "--steps", "1",
+                               "--rule", "B9/S"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Checks that the living neighbors counted by the grid follow the edits:
+the table engine reads the cells instead
+
+    python -m unittest discover tests
+"""
+import unittest
+from cae.ca_grid import CellularGrid
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.ca_generate import life_soup
+from cae.utils import Point
+
+LIVING = ENTITIES_NAMES['livingcell']
+# Generations compared after each edit
+STEPS = 3
+
+
+def soup_grids():
+    """Returns the same soup in a grid of each engine, with history
+    """
+    grids = list()
+    for engine in ("entity", "table"):
+        grid = CellularGrid(engine=engine, history=True)
+        for x, y in life_soup(24, 24, seed=4)["livingcell"]:
+            grid.insert(Point(x, y), LIVING)
+        grid.push_actions()
+        grids.append(grid)
+    return grids
+
+
+class NeighborCountsTest(unittest.TestCase):
+
+    def check(self, grids, edit):
+        for grid in grids:
+            edit(grid)
+            grid.push_actions()
+        for _ in range(STEPS):
+            for grid in grids:
+                grid.update()
+            self.assertEqual(sorted(grids[0].get_entities()),
+                             sorted(grids[1].get_entities()))
+
+    def test_edits(self):
+        grids = soup_grids()
+        self.check(grids, lambda grid: grid.insert(Point(30, 30), LIVING))
+        self.check(grids, lambda grid: grid.delete(Point(3, 3)))
+        self.check(grids, lambda grid: grid.move_all(5, -2))
+
+        def select(grid):
+            grid.select_entities([Point(x, y) for x in range(-10, 20)
+                                  for y in range(-10, 20)])
+        self.check(grids, lambda grid: (select(grid), grid.rotate()))
+        self.check(grids, lambda grid: (select(grid), grid.flip_h()))
+        self.check(grids, lambda grid: grid.undo())
+        self.check(grids, lambda grid: grid.redo())
+        self.check(grids, lambda grid: grid.clear_selection())
+
+    def test_rule(self):
+        # Only the counts follow another rule, the tables are of B3/S23
+        grid = soup_grids()[0]
+        grid.set_rule("B36/S23")
+        grid.update()
+        grid.set_rule("B3/S23")
+        expected = CellularGrid(engine="table")
+        for pos, type_ in grid.get_entities():
+            expected.insert(pos, type_)
+        for _ in range(STEPS):
+            grid.update()
+            expected.update()
+        self.assertEqual(sorted(grid.get_entities()),
+                         sorted(expected.get_entities()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Checks of the entities added by register_entity
+
+    python -m unittest discover tests
+"""
+import unittest
+import numpy as np
+from cae.ca_grid import CellularGrid
+from cae.ca_base_entity import BaseEntity, ENTITIES_NAMES
+from cae.ca_entities import register_entity
+from cae.utils import Point
+
+SPARK = ENTITIES_NAMES['spark']
+ARROW_RIGHT = ENTITIES_NAMES['arrowright']
+ARROW_UP = ENTITIES_NAMES['arrowup']
+VOID = ENTITIES_NAMES['void']
+
+
+class Wall(BaseEntity):
+
+    """Does nothing, it is only read by the others
+    """
+
+    def __init__(self):
+        super(Wall, self).__init__(20)
+
+
+class Emitter(BaseEntity):
+
+    """Puts a spark on its east when it is void
+    """
+    reads = ((1, 0),)
+
+    def __init__(self, type_=21):
+        super(Emitter, self).__init__(type_)
+
+    def step(self, grid, pos):
+        if self.get_neighbor(grid, pos, 'E') == VOID:
+            grid.insert_action(("ins", (self.neighbor(pos, 'E'), SPARK)))
+
+
+class BatchEmitter(Emitter):
+
+    """Emitter with a batch kernel
+    """
+    batch = True
+
+    def __init__(self):
+        super(BatchEmitter, self).__init__(22)
+
+    def step_all(self, positions, around):
+        targets = positions[around[:, 0] == VOID] + (1, 0)
+        inserts = np.empty((len(targets), 3), dtype=np.int64)
+        inserts[:, :2] = targets
+        inserts[:, 2] = SPARK
+        return (), inserts
+
+
+for name, entity in (("testwall", Wall()), ("testemitter", Emitter()),
+                     ("testbatchemitter", BatchEmitter())):
+    # The registry is global, the module can be imported more than once
+    if name not in ENTITIES_NAMES:
+        register_entity(name, entity)
+
+
+def trajectory(cells, steps, backend="dict", engine="entity"):
+    """Returns the sorted entities of the grid after each step
+    """
+    grid = CellularGrid(backend=backend, engine=engine)
+    for pos, type_ in cells:
+        grid.insert(Point(*pos), type_)
+    states = list()
+    for _ in range(steps):
+        grid.update()
+        states.append(sorted(grid.get_entities()))
+    return states
+
+
+class RegisteredEntityTest(unittest.TestCase):
+
+    def test_table_engine_reads_registered_types(self):
+        wall = ENTITIES_NAMES["testwall"]
+        # Arrows with a registered entity in each of the cells they read
+        cells = [((-1, 0), SPARK), ((0, 0), ARROW_RIGHT), ((1, 0), wall),
+                 ((0, 3), ARROW_RIGHT), ((0, 2), wall), ((-1, 3), SPARK),
+                 ((5, 5), ARROW_UP), ((5, 6), SPARK), ((4, 5), wall),
+                 ((5, 4), wall)]
+        expected = trajectory(cells, 4)
+        for backend in ("dict", "dense", "chunked"):
+            self.assertEqual(trajectory(cells, 4, backend, "table"),
+                             expected)
+
+    def test_batch_kernel_matches_step(self):
+        cells = [((0, 0), ENTITIES_NAMES["testemitter"]),
+                 ((0, 2), ENTITIES_NAMES["testemitter"]),
+                 ((1, 2), ENTITIES_NAMES["testwall"])]
+        batch_cells = [
+            (pos, ENTITIES_NAMES["testbatchemitter"]
+             if type_ == ENTITIES_NAMES["testemitter"] else type_)
+            for pos, type_ in cells]
+
+        def plain(states):
+            batch_t = ENTITIES_NAMES["testbatchemitter"]
+            return [[(pos, ENTITIES_NAMES["testemitter"]
+                      if type_ == batch_t else type_)
+                     for pos, type_ in state] for state in states]
+        expected = trajectory(cells, 2)
+        for backend in ("dict", "dense", "chunked"):
+            for engine in ("entity", "table"):
+                self.assertEqual(
+                    plain(trajectory(batch_cells, 2, backend, engine)),
+                    expected)
+
+    def test_batch_needs_step_all(self):
+        class Stub(Emitter):
+            batch = True
+
+        self.assertRaises(ValueError, register_entity, "teststub", Stub(23))
+        self.assertNotIn("teststub", ENTITIES_NAMES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Checks of the Life-like rules on every backend
+
+    python -m unittest discover tests
+"""
+import unittest
+from collections import Counter
+from cae.ca_grid import CellularGrid, ENGINES
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.ca_generate import life_soup
+from cae.ca_rules import LifeRule, parse_rule
+from cae.utils import Point
+
+LIVING = ENTITIES_NAMES['livingcell']
+# Rules without B0, the empty space stays empty
+RULES = ("B3/S23", "B36/S23", "B3678/S34678", "B2/S", "B1357/S1357",
+         "B35678/S5678", "B3/S012345678")
+# Generations compared
+STEPS = 6
+
+
+def reference(cells, rule, steps):
+    """Returns the living cells after steps generations of rule, on the
+    set of the living cells
+    """
+    births, survivals = parse_rule(rule)
+    cells = set(cells)
+    for _ in range(steps):
+        counts = Counter((x + dif_x, y + dif_y) for x, y in cells
+                         for dif_x in (-1, 0, 1) for dif_y in (-1, 0, 1)
+                         if dif_x or dif_y)
+        # The cells without living neighbors aren't counted
+        alone = set(pos for pos in cells if pos not in counts)
+        cells = set(pos for pos, count in counts.items()
+                    if count in (survivals if pos in cells else births))
+        if 0 in survivals:
+            cells.update(alone)
+    return sorted(cells)
+
+
+def living(cells, rule, steps, backend="dict", engine="entity"):
+    """Returns the sorted living cells after steps generations
+    """
+    grid = CellularGrid(backend=backend, engine=engine)
+    grid.set_rule(rule)
+    for pos in cells:
+        grid.insert(Point(*pos), LIVING)
+    grid.run(steps)
+    return sorted(tuple(pos) for pos, type_ in grid.get_entities()
+                  if type_ == LIVING)
+
+
+class LifeRuleTest(unittest.TestCase):
+
+    def test_notation(self):
+        self.assertEqual(LifeRule("b63/s32").string, "B36/S23")
+        self.assertEqual(LifeRule("B3S23"), LifeRule("B3/S23"))
+        self.assertTrue(LifeRule().default)
+        for rule in ("", "B9/S23", "S23/B3", "life"):
+            self.assertRaises(ValueError, LifeRule, rule)
+
+    def test_backends(self):
+        cells = [tuple(pos)
+                 for pos in life_soup(30, 20, seed=5)["livingcell"]]
+        for rule in RULES:
+            expected = reference(cells, rule, STEPS)
+            for backend in ("dict", "dense", "bitlife", "chunked",
+                            "parallel"):
+                for engine in ENGINES:
+                    self.assertEqual(living(cells, rule, STEPS, backend,
+                                            engine),
+                                     expected, "%s %s %s" % (rule, backend,
+                                                             engine))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Checks that run() gives the generations of update()
+
+    python -m unittest discover tests
+"""
+import unittest
+from os import path
+from cae.ca_grid import CellularGrid
+from cae.ca_bench import example_files
+
+# Generations compared on each example
+STEPS = 12
+# Generations of the runs that skip the cycles, they have to close some
+CYCLE_STEPS = 203
+
+
+def load(filename):
+    grid = CellularGrid()
+    grid.load(filename)
+    return grid
+
+
+def updated(filename, steps=STEPS):
+    """Returns the sorted entities of the grid after steps update()
+    """
+    grid = load(filename)
+    for _ in range(steps):
+        grid.update()
+    return sorted(grid.get_entities())
+
+
+class RunTest(unittest.TestCase):
+
+    def test_examples(self):
+        for filename in example_files():
+            grid = load(filename)
+            self.assertEqual(grid.run(STEPS), STEPS)
+            self.assertEqual(grid.generation, STEPS)
+            self.assertEqual(sorted(grid.get_entities()), updated(filename),
+                             filename)
+
+    def test_callback(self):
+        filename = example_files()[0]
+        samples = list()
+
+        def sample(generation, grid):
+            samples.append((generation, sorted(grid.get_entities())))
+            return generation < 9
+        self.assertEqual(load(filename).run(STEPS, 3, sample), 9)
+        self.assertEqual(samples, [(generation, updated(filename, generation))
+                                   for generation in (3, 6, 9)])
+
+    def test_skip_cycles(self):
+        for filename in example_files():
+            grid = load(filename)
+            grid.detect_cycles()
+            self.assertEqual(grid.run(CYCLE_STEPS, skip_cycles=True),
+                             CYCLE_STEPS)
+            self.assertEqual(grid.generation, CYCLE_STEPS)
+            expected = load(filename)
+            expected.run(CYCLE_STEPS)
+            self.assertEqual(sorted(grid.get_entities()),
+                             sorted(expected.get_entities()), filename)
+            if path.basename(filename) == "cycle.cg":
+                self.assertEqual(grid.cycle(), (0, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Checks of the rational speeds of the linked grids
+
+    python -m unittest discover tests
+"""
+import shutil
+import tempfile
+import unittest
+from fractions import Fraction
+from os import path
+from cae.ca_grid import CellularGrid, schedule
+from cae import ca_generate
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def test_counts(self):
+        for rate in (Fraction(1, 3), Fraction(3, 2), Fraction(7, 5),
+                     Fraction(2)):
+            counts = [schedule(rate, generation)
+                      for generation in range(4 * rate.denominator)]
+            self.assertEqual(sum(counts), 4 * rate.numerator)
+            self.assertTrue(all(int(rate) <= count <= int(rate) + 1
+                                for count in counts))
+
+    def test_speeds(self):
+        grid = CellularGrid()
+        grid.set_speed("3/2")
+        self.assertEqual(grid.speed, Fraction(3, 2))
+        grid.set_speed(1 / 3.)
+        self.assertEqual(grid.speed, Fraction(1, 3))
+        self.assertRaises(ValueError, grid.set_speed, 0)
+
+
+class LinkedGridsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = path.join(self.directory, "modules.cg")
+        for filename, content in ca_generate.hierarchy(
+                self.filename, 2, depth=2).items():
+            ca_generate.write(content, filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_nested_rates(self):
+        grid = CellularGrid()
+        grid.load(self.filename)
+        # The ids of the linked grids are given when they are loaded
+        first, second = grid._linked_grids.values()
+        module = list(first._linked_grids.values())[0]
+        grid.set_speed(2)
+        first.set_speed(3)
+        second.set_speed(Fraction(1, 3))
+        module.set_speed(Fraction(15, 7))
+        for generations in (1, 5, 12, 30):
+            grid.run(generations - grid.generation)
+            self.assertEqual(first.generation, generations * 3 // 2)
+            self.assertEqual(second.generation, generations // 6)
+            # The rates are relative to the grid that links them
+            self.assertEqual(module.generation, first.generation * 5 // 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
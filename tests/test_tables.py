@@ -0,0 +1,40 @@
+"""Checks that the transition tables step the example grids like the
+step methods of the entities
+
+    python -m unittest discover tests
+"""
+import unittest
+from cae.ca_grid import CellularGrid
+from cae.ca_bench import example_files
+
+# Generations compared on each example
+STEPS = 30
+
+
+def state(grid):
+    """Returns the sorted entities of grid and of its linked grids, these
+    by their file name, as their ids are different in each grid
+    """
+    linked = sorted((grid._linked_names[id_], sorted(linked.get_entities()))
+                    for id_, linked in grid._linked_grids.items())
+    return sorted(grid.get_entities()), linked
+
+
+class TableEngineTest(unittest.TestCase):
+
+    def test_examples(self):
+        for filename in example_files():
+            grids = list()
+            for engine in ("entity", "table"):
+                grid = CellularGrid(engine=engine)
+                grid.load(filename)
+                grids.append(grid)
+            for step in range(STEPS):
+                for grid in grids:
+                    grid.update()
+                self.assertEqual(state(grids[1]), state(grids[0]),
+                                 "%s %d" % (filename, step))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Checks of the packed keys of the positions
+
+    python -m unittest discover tests
+"""
+import random
+import unittest
+import numpy as np
+from cae.ca_dense import keys_list, positions_array
+from cae.utils import (Point, pack, unpack, coordinates, key_offset,
+                       KEY_BIAS)
+
+# Coordinates on the borders of the range of the keys and around 0
+EDGES = (-KEY_BIAS, -KEY_BIAS + 1, -1, 0, 1, KEY_BIAS - 2, KEY_BIAS - 1)
+
+
+class KeysTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        generator = random.Random(2)
+        positions = [(x, y) for x in EDGES for y in EDGES] +\
+            [(generator.randint(-KEY_BIAS, KEY_BIAS - 1),
+              generator.randint(-KEY_BIAS, KEY_BIAS - 1))
+             for _ in range(1000)]
+        for pos in positions:
+            key = pack(pos)
+            self.assertEqual(unpack(key), Point(*pos))
+            self.assertEqual(coordinates(key), pos)
+            self.assertEqual(pack(Point(*pos)), key)
+        # Distinct, in the order of the rows and then of the columns
+        keys = [pack(pos) for pos in sorted(set(positions),
+                                            key=lambda pos: (pos[1], pos[0]))]
+        self.assertEqual(sorted(keys), keys)
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_bounds(self):
+        # The keys of the range fit the int64 arrays of the NumPy paths
+        self.assertEqual(pack((-KEY_BIAS, -KEY_BIAS)), 0)
+        self.assertTrue(pack((KEY_BIAS - 1, KEY_BIAS - 1)) < 2 ** 63)
+        self.assertFalse(pack((0, KEY_BIAS)) < 2 ** 63)
+        # Below the range the x borrows from the row
+        self.assertEqual(pack((-KEY_BIAS - 1, 0)),
+                         pack((3 * KEY_BIAS - 1, -1)))
+
+    def test_arrays(self):
+        x = np.array([x for x in EDGES for _ in EDGES], dtype=np.int64)
+        y = np.array([y for _ in EDGES for y in EDGES], dtype=np.int64)
+        keys = keys_list(x, y)
+        self.assertEqual(keys, [pack(pos) for pos in zip(x.tolist(),
+                                                          y.tolist())])
+        self.assertEqual(positions_array(keys).tolist(),
+                         [list(pos) for pos in zip(x.tolist(), y.tolist())])
+
+    def test_offsets(self):
+        offsets = [(dif_x, dif_y) for dif_x in (-2, -1, 0, 1, 2)
+                   for dif_y in (-2, -1, 0, 1, 2)]
+        for x in EDGES:
+            for y in EDGES:
+                for dif_x, dif_y in offsets:
+                    moved = (x + dif_x, y + dif_y)
+                    if not all(-KEY_BIAS <= value < KEY_BIAS
+                               for value in moved):
+                        continue
+                    self.assertEqual(pack((x, y)) + key_offset(dif_x, dif_y),
+                                     pack(moved), ((x, y), dif_x, dif_y))
+        self.assertEqual(key_offset(0, 0), 0)
+        self.assertEqual(key_offset(-1, 1) + key_offset(1, -1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
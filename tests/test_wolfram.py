@@ -0,0 +1,113 @@
+"""Checks that run_1d() gives the rows of update() and of the Wolfram
+rules
+
+    python -m unittest discover tests
+"""
+import unittest
+from os import path
+from cae.ca_grid import CellularGrid
+from cae.ca_base_entity import ENTITIES_NAMES
+from cae.ca_generate import automaton_seed
+from cae.utils import Point
+
+ONE = ENTITIES_NAMES['monoone']
+ZERO = ENTITIES_NAMES['monozero']
+LIVING = ENTITIES_NAMES['livingcell']
+EXAMPLE = path.join(path.dirname(path.abspath(__file__)), "..", "examples",
+                    "test_1d_automata.cg")
+# Rows compared
+GENERATIONS = 24
+
+
+def seed_grid(backend="dict"):
+    """Returns a grid with a random row of mono entities
+    """
+    grid = CellularGrid(backend=backend)
+    content = automaton_seed(40, seed=3)
+    for name, type_ in (("monoone", ONE), ("monozero", ZERO)):
+        for x, y in content[name]:
+            grid.insert(Point(x, y), type_)
+    return grid
+
+
+def example_grid():
+    grid = CellularGrid()
+    grid.load(EXAMPLE)
+    return grid
+
+
+def wolfram(grid, generations, rule):
+    """Returns the sorted entities of grid after generations rows of the
+    Wolfram rule, written one cell at a time: void reads as zero and
+    the void cells next to a one get a zero
+    """
+    cells = dict(grid.get_entities())
+    last_y = max(y for _, y in cells)
+    row = dict((x, int(type_ == ONE)) for (x, y), type_ in cells.items()
+               if y == last_y)
+    for generation in range(1, generations + 1):
+        following = dict(
+            (x, rule >> (row.get(x - 1, 0) << 2 | value << 1 |
+                         row.get(x + 1, 0)) & 1)
+            for x, value in row.items())
+        for x, value in list(following.items()):
+            if value:
+                following.setdefault(x - 1, 0)
+                following.setdefault(x + 1, 0)
+        row = following
+        for x, value in row.items():
+            cells[(x, last_y + generation)] = ONE if value else ZERO
+    return sorted(cells.items())
+
+
+class Run1DTest(unittest.TestCase):
+
+    def check_update(self, make):
+        grid = make()
+        grid.run_1d(GENERATIONS)
+        expected = make()
+        for _ in range(GENERATIONS):
+            expected.update()
+        self.assertEqual(sorted(grid.get_entities()),
+                         sorted(expected.get_entities()))
+        self.assertEqual(grid.generation, GENERATIONS)
+
+    def test_example(self):
+        self.check_update(example_grid)
+
+    def test_seed(self):
+        self.check_update(seed_grid)
+
+    def test_rules(self):
+        for rule in (30, 90, 110, 150, 255):
+            grid = seed_grid()
+            expected = wolfram(grid, GENERATIONS, rule)
+            grid.run_1d(GENERATIONS, rule)
+            self.assertEqual(sorted(grid.get_entities()), expected, rule)
+
+    def test_backends(self):
+        # The dense ones write the rows on the array at once
+        expected = seed_grid()
+        expected.run_1d(GENERATIONS, 110)
+        for backend in ("dense", "chunked", "bitlife"):
+            grid = seed_grid(backend)
+            grid.run_1d(GENERATIONS, 110)
+            self.assertEqual(sorted(grid.get_entities()),
+                             sorted(expected.get_entities()), backend)
+
+    def test_no_generations(self):
+        for generations in (0, -3):
+            grid = seed_grid()
+            expected = sorted(grid.get_entities())
+            grid.run_1d(generations, 30)
+            self.assertEqual(sorted(grid.get_entities()), expected)
+            self.assertEqual(grid.generation, 0)
+
+    def test_rule_needs_a_row(self):
+        grid = seed_grid()
+        grid.insert(Point(0, 5), LIVING)
+        self.assertRaises(ValueError, grid.run_1d, GENERATIONS, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()